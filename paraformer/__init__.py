@@ -3,28 +3,87 @@
 # @Time      :2023/8/8 17:49
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
-import os
-
-from .runtime.python.asr_all_in_one import AsrAllInOne
-from .runtime.python.cttPunctuator import CttPunctuator
-from .runtime.python.fsmnVadInfer import FSMNVad, FSMNVadOnline
-from .runtime.python.paraformerInfer import ParaformerOffline, ParaformerOnline
-from .runtime.python.svInfer import SpeakerVerificationInfer
-from .runtime.python.utils.audioHelper import AudioReader
-from .runtime.python.utils.logger import (
-    DEFAULT_FILEHANDLER_FORMAT,
-    DEFAULT_STDOUT_FORMAT,
-)
+import importlib
+import sys
+from typing import TYPE_CHECKING
+
+from .runtime.python.utils.startupReport import startup_report, timed
+
+# submodules are imported on first access, so that a process only using vad
+# does not pay for asr, punctuation or speaker verification
+_lazy_imports = {
+    "ParaformerOnline": ".runtime.python.paraformerInfer",
+    "ParaformerOffline": ".runtime.python.paraformerInfer",
+    "ParaformerOnlineMultiplexer": ".runtime.python.paraformerInfer",
+    "AsrAllInOne": ".runtime.python.asr_all_in_one",
+    "FSMNVad": ".runtime.python.fsmnVadInfer",
+    "FSMNVadOnline": ".runtime.python.fsmnVadInfer",
+    "CttPunctuator": ".runtime.python.cttPunctuator",
+    "SpeakerVerificationInfer": ".runtime.python.svInfer",
+    "AudioReader": ".runtime.python.utils.audioHelper",
+    "WavReader": ".runtime.python.utils.audioHelper",
+    "DEFAULT_FILEHANDLER_FORMAT": ".runtime.python.utils.logger",
+    "DEFAULT_STDOUT_FORMAT": ".runtime.python.utils.logger",
+    "configure_threads": ".runtime.python.utils.threadPlanner",
+    "autotune": ".runtime.python.utils.sessionTuner",
+    "AsyncRunner": ".runtime.python.utils.asyncRunner",
+    "configure_async": ".runtime.python.utils.asyncRunner",
+}
+
+if TYPE_CHECKING:
+    from .runtime.python.asr_all_in_one import AsrAllInOne
+    from .runtime.python.cttPunctuator import CttPunctuator
+    from .runtime.python.fsmnVadInfer import FSMNVad, FSMNVadOnline
+    from .runtime.python.paraformerInfer import (
+        ParaformerOffline,
+        ParaformerOnline,
+        ParaformerOnlineMultiplexer,
+    )
+    from .runtime.python.svInfer import SpeakerVerificationInfer
+    from .runtime.python.utils.asyncRunner import AsyncRunner, configure_async
+    from .runtime.python.utils.audioHelper import AudioReader, WavReader
+    from .runtime.python.utils.logger import (
+        DEFAULT_FILEHANDLER_FORMAT,
+        DEFAULT_STDOUT_FORMAT,
+    )
+    from .runtime.python.utils.sessionTuner import autotune
+    from .runtime.python.utils.threadPlanner import configure_threads
+
+
+def __getattr__(name):
+    if name not in _lazy_imports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name = _lazy_imports[name]
+    if f"{__name__}{module_name}" in sys.modules:
+        module = sys.modules[f"{__name__}{module_name}"]
+    else:
+        with timed(module_name.rsplit(".", 1)[-1], "import"):
+            module = importlib.import_module(module_name, __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_lazy_imports))
+
 
 __all__ = [
     "ParaformerOnline",
     "ParaformerOffline",
+    "ParaformerOnlineMultiplexer",
     "AsrAllInOne",
     "FSMNVad",
     "FSMNVadOnline",
     "CttPunctuator",
     "SpeakerVerificationInfer",
     "AudioReader",
+    "WavReader",
     "DEFAULT_FILEHANDLER_FORMAT",
     "DEFAULT_STDOUT_FORMAT",
+    "startup_report",
+    "configure_threads",
+    "autotune",
+    "AsyncRunner",
+    "configure_async",
 ]
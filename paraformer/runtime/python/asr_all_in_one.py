@@ -3,7 +3,14 @@
 # @Time      :2023/8/14 09:31
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
+import functools
+import os
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Callable, Union
 
 import numpy as np
 
@@ -12,14 +19,22 @@ from paraformer.runtime.python.fsmnVadInfer import FSMNVadOnline
 from paraformer.runtime.python.paraformerInfer import (
     ParaformerOffline,
     ParaformerOnline,
+    ParaformerOnlineMultiplexer,
 )
 from paraformer.runtime.python.svInfer import SpeakerVerificationInfer
+from paraformer.runtime.python.utils.asyncRunner import AsyncRunner, get_runner
+from paraformer.runtime.python.utils.audioHelper import (
+    AudioHistory,
+    AudioReader,
+    WavReader,
+)
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.snapshot import Snapshotable
 
 mode_available = ["offline", "file_transcription", "online", "2pass"]
 
 
-class AsrAllInOne:
+class AsrAllInOne(Snapshotable):
     def __init__(
         self,
         mode: str,
@@ -35,12 +50,40 @@ class AsrAllInOne:
         vad_speech_noise_thresh_high=0.3,
         vad_speech_noise_thresh=0.6,
         hot_words="",
+        history_lookback_ms=3000,
+        async_final=False,
+        on_final: Callable[[dict], None] = None,
+        final_executor: Executor = None,
+        asr_online_multiplexer: ParaformerOnlineMultiplexer = None,
+        parallel_load=False,
+        wait_ready=True,
     ):
         """
         Args:
           mode:
           speaker_verification:
           time_stamp:
+          history_lookback_ms: audio kept by 2pass besides the longest vad
+            segment (vad_speech_max_length), it covers the delay of the vad
+            start point and the chunk size
+          async_final: in two_pass_asr, run the offline asr, speaker
+            verification and punctuation of a segment in the background, the
+            call returns the partial and the `final_seqs` of the segments
+            which ended, the finals are delivered to on_final or `finals`
+          on_final: called with each final result on the worker thread, the
+            results go to the queue `finals` when it is None
+          final_executor: executor of the finals, may be shared by many
+            streams, the finals of one stream still run one by one in order.
+            the finals of different streams run at once on the shared models,
+            see test_two_pass_async.test_shared_offline_model
+            a thread of this instance is used when it is None, it stops at
+            the end of the stream or on close()
+          asr_online_multiplexer: batch the online asr chunks of this stream
+            with the other streams of the multiplexer
+          parallel_load: load the asr, vad, punctuation and speaker models
+            concurrently on a thread pool
+          wait_ready: with parallel_load, whether to block until everything
+            is loaded, otherwise use `ready` or `wait_ready()` before inference
         """
         assert (
             mode in mode_available
@@ -54,49 +97,180 @@ class AsrAllInOne:
         self.mode = mode
         self.chunk_interval = chunk_interval
         self.speech_start = False
+        # chunks of two_pass_for_dialogue, all of them and the ones waiting for
+        # the online and the offline asr
         self.frames = []
+        self.frames_asr_online = []
+        self.frames_asr_offline = []
+        # samples of two_pass_asr from the start of the current segment
+        self.audio_history = AudioHistory(
+            (vad_speech_max_length + history_lookback_ms) * 16
+        )
         self.offset = 0
         self.hot_words = hot_words
-
-        if mode == "offline":
-            self.asr_offline = ParaformerOffline()
-        elif mode == "online":
-            self.asr_online = ParaformerOnline()
-        elif mode == "2pass":
-            self.asr_offline = ParaformerOffline()
-            self.asr_online = ParaformerOnline()
-            self.vad = FSMNVadOnline()
-            self.vad.vad.vad_opts.max_single_segment_time = vad_speech_max_length
-            self.vad.vad.vad_opts.max_start_silence_time = sv_max_start_silence_time
-            self.vad.vad.vad_opts.speech_noise_thresh_low = vad_speech_noise_thresh_low
-            self.vad.vad.vad_opts.speech_noise_thresh_high = (
-                vad_speech_noise_thresh_high
+        # sequence number of the next final of two_pass_asr
+        self.final_seq = 0
+        self.async_final = async_final
+        self.on_final = on_final
+        self.finals = queue.Queue()
+        self._final_executor = final_executor
+        # an executor made on the first final is shut down by reset_asr and close
+        self._own_final_executor = False
+        # future of the last final submitted, the next one starts after it
+        self._final_tail = None
+        self._final_lock = threading.Lock()
+
+        def load_vad():
+            vad = FSMNVadOnline()
+            vad.vad.vad_opts.max_single_segment_time = vad_speech_max_length
+            vad.vad.vad_opts.max_start_silence_time = sv_max_start_silence_time
+            vad.vad.vad_opts.speech_noise_thresh_low = vad_speech_noise_thresh_low
+            vad.vad.vad_opts.speech_noise_thresh_high = vad_speech_noise_thresh_high
+            vad.vad.vad_opts.speech_noise_thresh = vad_speech_noise_thresh
+            return vad
+
+        # components of each mode, loaded one by one or on a thread pool
+        components = {}
+        if mode in ("offline", "2pass", "file_transcription"):
+            components["asr_offline"] = ParaformerOffline
+        if mode in ("online", "2pass"):
+            components["asr_online"] = functools.partial(
+                ParaformerOnline, multiplexer=asr_online_multiplexer
+            )
+        if mode in ("2pass", "file_transcription"):
+            components["vad"] = load_vad
+            components["punc"] = functools.partial(
+                CttPunctuator, online=mode == "2pass"
             )
-            self.vad.vad.vad_opts.speech_noise_thresh = vad_speech_noise_thresh
-            self.punc = CttPunctuator(online=True)
+        if mode == "2pass":
             self.text_cache = ""
-
-        elif mode == "file_transcription":
-            self.asr_offline = ParaformerOffline()
-            self.vad = FSMNVadOnline()
-            self.vad.vad.vad_opts.speech_noise_thresh_low = vad_speech_noise_thresh_low
-            self.vad.vad.vad_opts.speech_noise_thresh_high = (
-                vad_speech_noise_thresh_high
+        if speaker_verification:
+            components["sv"] = functools.partial(
+                SpeakerVerificationInfer,
+                model_name=sv_model_name,
+                threshold=sv_threshold,
             )
-            self.vad.vad.vad_opts.speech_noise_thresh = vad_speech_noise_thresh
-            self.vad.vad.vad_opts.max_single_segment_time = vad_speech_max_length
-            self.vad.vad.vad_opts.max_start_silence_time = sv_max_start_silence_time
-            self.punc = CttPunctuator(online=False)
+
+        # seconds spent loading each component
+        self.load_times = {}
+        self.ready = Future()
+        if parallel_load:
+            self._load_parallel(components)
+            if wait_ready:
+                self.wait_ready()
         else:
-            raise ValueError(f"Do not support mode: {mode}")
+            for name, load in components.items():
+                self._load_component(name, load)
+            self.ready.set_result(self)
+
+    def _load_component(self, name, load):
+        time_start = time.perf_counter()
+        setattr(self, name, load())
+        self.load_times[name] = time.perf_counter() - time_start
+        logger.info(f"load {name} use {self.load_times[name]:.3f} s")
+
+    def _load_parallel(self, components):
+        pool = ThreadPoolExecutor(len(components), thread_name_prefix="load")
+        futures = [
+            pool.submit(self._load_component, name, load)
+            for name, load in components.items()
+        ]
+        pool.shutdown(wait=False)
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def on_done(_):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            errors = [f.exception() for f in futures if f.exception() is not None]
+            if errors:
+                self.ready.set_exception(errors[0])
+            else:
+                self.ready.set_result(self)
 
-        if speaker_verification:
-            self.sv = SpeakerVerificationInfer(
-                model_name=sv_model_name, threshold=sv_threshold
+        for future in futures:
+            future.add_done_callback(on_done)
+
+    def wait_ready(self, timeout=None):
+        """block until all components are loaded, raise the first load error"""
+        return self.ready.result(timeout)
+
+    def warmup(self) -> dict:
+        """
+        warm up the loaded components one by one with synthetic inputs, the
+        state of the stream is kept, so it may run during a stream
+
+        Return:
+            the timings of each component, see their warmup()
+        """
+        self.wait_ready()
+        timings = {}
+        for name in ("asr_online", "asr_offline", "vad", "punc", "sv"):
+            component = getattr(self, name, None)
+            if component is not None:
+                timings[name] = component.warmup()
+        return timings
+
+    def state_dict(self) -> dict:
+        """
+        the stream state of the online components and the 2pass buffers. the
+        options and speakers are not included, restore into an instance
+        created with the same mode and options
+        """
+        self.wait_ready()
+        # the punctuation cache is complete once the finals are delivered
+        self.wait_finals()
+        state = {
+            "mode": self.mode,
+            "audio_history": self.audio_history.state_dict(),
+            "start_frame": self.start_frame,
+            "end_frame": self.end_frame,
+            "vad_pre_idx": self.vad_pre_idx,
+            "speech_start": self.speech_start,
+            "offset": self.offset,
+            "text_cache": getattr(self, "text_cache", None),
+            "final_seq": self.final_seq,
+            "frames": [np.array(chunk) for chunk in self.frames],
+            "frames_asr_online": [np.array(chunk) for chunk in self.frames_asr_online],
+            "frames_asr_offline": [
+                np.array(chunk) for chunk in self.frames_asr_offline
+            ],
+        }
+        for name in ("asr_online", "vad", "punc"):
+            component = getattr(self, name, None)
+            if component is not None:
+                state[name] = component.state_dict()
+        return state
+
+    def load_state_dict(self, state: dict):
+        self.wait_ready()
+        if state["mode"] != self.mode:
+            raise ValueError(
+                f"state of mode {state['mode']} can not be loaded in mode {self.mode}"
             )
+        self.audio_history.load_state_dict(state["audio_history"])
+        self.start_frame = state["start_frame"]
+        self.end_frame = state["end_frame"]
+        self.vad_pre_idx = state["vad_pre_idx"]
+        self.speech_start = state["speech_start"]
+        self.offset = state["offset"]
+        self.final_seq = state["final_seq"]
+        for name in ("frames", "frames_asr_online", "frames_asr_offline"):
+            setattr(self, name, [np.array(chunk) for chunk in state[name]])
+        if state["text_cache"] is not None:
+            self.text_cache = state["text_cache"]
+        for name in ("asr_online", "vad", "punc"):
+            component = getattr(self, name, None)
+            if component is not None:
+                component.load_state_dict(state[name])
 
     def reset_asr(self):
         self.frames = []
+        self.frames_asr_online = []
+        self.frames_asr_offline = []
+        self.audio_history.reset()
         self.start_frame = 0
         self.end_frame = 0
         self.vad_pre_idx = 0
@@ -104,11 +278,14 @@ class AsrAllInOne:
             self.asr_online.reset_cache()
         self.vad.in_cache = None
         self.vad.vad.all_reset_detection()
+        self._release_final_executor()
 
     def online(self, chunk: np.ndarray, is_final: bool = False):
+        self.wait_ready()
         return self.asr_online.infer_online(chunk, is_final)
 
     def offline(self, audio_data: np.ndarray):
+        self.wait_ready()
         return self.asr_offline.infer_offline(audio_data, hot_words=self.hot_words)
 
     def extract_endpoint_from_vad_result(self, segments_result):
@@ -125,37 +302,38 @@ class AsrAllInOne:
 
     def one_sentence_asr(self, audio: np.ndarray):
         """asr offline + punc"""
+        self.wait_ready()
         result = self.asr_offline.infer_offline(audio, hot_words=self.hot_words)
         result = self.punc.punctuate(result)[0]
         return result
 
-    def file_transcript(self, audio: np.ndarray, step=9600):
+    def file_transcript(
+        self, audio: Union[np.ndarray, str, os.PathLike, WavReader], step=9600
+    ):
         """
         asr offline + vad + punc
         Args:
-            audio:
-            step:
+            audio: samples, or a wav file (path or WavReader) which is
+                memory-mapped and read block by block
+            step: samples of each block fed to vad
 
         Returns:
 
         """
-        vad_pre_idx = 0
+        self.wait_ready()
+        if isinstance(audio, (str, os.PathLike)):
+            with WavReader(audio) as reader:
+                yield from self.file_transcript(reader, step)
+            return
+
         speech_length = len(audio)
         sample_offset = 0
-        for sample_offset in range(
-            0, speech_length, min(step, speech_length - sample_offset)
-        ):
-            if sample_offset + step >= speech_length - 1:
-                step = speech_length - sample_offset
-                is_final = True
-            else:
-                is_final = False
-            chunk = audio[sample_offset : sample_offset + step]
-            vad_pre_idx += len(chunk)
+        for chunk in AudioReader.iter_blocks(audio, step):
+            sample_offset += len(chunk)
+            is_final = sample_offset >= speech_length
             segments_result = self.vad.segments_online(chunk, is_final=is_final)
             start_frame = 0
             end_frame = 0
-            result = {}
             for start, end in segments_result:
                 if start != -1:
                     start_ms = start
@@ -165,6 +343,7 @@ class AsrAllInOne:
                     end_frame = end * 16
                     end_ms = end
                     data = np.array(audio[start_ms * 16 : end_frame])
+                    result = {}
                     time_start = time.time()
                     asr_offline_final = self.asr_offline.infer_offline(data)
                     logger.debug(
@@ -192,8 +371,142 @@ class AsrAllInOne:
 
                     yield result
 
+    def file_transcript_pipelined(
+        self,
+        audio: Union[np.ndarray, str, os.PathLike, WavReader],
+        step=9600,
+        *,
+        asr_batch_size=8,
+        asr_workers=1,
+        sv_workers=1,
+        punc_workers=1,
+        max_pending_segments=32,
+    ):
+        """
+        the same results as file_transcript, but vad, asr, speaker embedding
+        and punctuation run as overlapping stages: vad runs on the calling
+        thread, segments are recognized in batches with infer_offline_batch
+        and the other stages run on their own thread pools.
+        speaker matching is stateful, so it is done in time order when the
+        results are yielded.
+        Args:
+            audio: samples, or a wav file (path or WavReader)
+            step: samples of each block fed to vad
+            asr_batch_size: segments recognized in one batch
+            asr_workers: threads of each stage
+            sv_workers:
+            punc_workers:
+            max_pending_segments: bound of segments in flight, vad waits for
+                the oldest result when it is reached
+        """
+        self.wait_ready()
+        if isinstance(audio, (str, os.PathLike)):
+            with WavReader(audio) as reader:
+                yield from self.file_transcript_pipelined(
+                    reader,
+                    step,
+                    asr_batch_size=asr_batch_size,
+                    asr_workers=asr_workers,
+                    sv_workers=sv_workers,
+                    punc_workers=punc_workers,
+                    max_pending_segments=max_pending_segments,
+                )
+            return
+
+        asr_pool = ThreadPoolExecutor(asr_workers, thread_name_prefix="asr")
+        punc_pool = ThreadPoolExecutor(punc_workers, thread_name_prefix="punc")
+        sv_pool = (
+            ThreadPoolExecutor(sv_workers, thread_name_prefix="sv")
+            if self.speaker_verification
+            else None
+        )
+
+        def recognize(datas):
+            time_start = time.time()
+            texts = self.asr_offline.infer_offline_batch(datas)
+            logger.debug(
+                f"asr offline inference of {len(datas)} segments "
+                f"use {time.time() - time_start} s"
+            )
+            return [punc_pool.submit(self.punc.punctuate, text) for text in texts]
+
+        # (start_ms, end_ms, batch, index in batch, sv future) in time order
+        pending = deque()
+        batch = []
+        batch_entries = []
+
+        def submit_batch():
+            if batch:
+                future = asr_pool.submit(recognize, list(batch))
+                for entry in batch_entries:
+                    entry[2] = future
+                batch.clear()
+                batch_entries.clear()
+
+        def ready(entry):
+            _, _, future, index, sv_future = entry
+            return (
+                future is not None
+                and future.done()
+                and future.result()[index].done()
+                and (sv_future is None or sv_future.done())
+            )
+
+        def pop_result():
+            start_ms, end_ms, future, index, sv_future = pending.popleft()
+            result = {
+                "text": future.result()[index].result()[0],
+                "time_stamp": {"start": start_ms, "end": end_ms},
+            }
+            if sv_future is not None:
+                result["speaker_id"] = self.sv.recognize_embedding(sv_future.result())
+            return result
+
+        try:
+            speech_length = len(audio)
+            sample_offset = 0
+            start_ms = 0
+            for chunk in AudioReader.iter_blocks(audio, step):
+                sample_offset += len(chunk)
+                is_final = sample_offset >= speech_length
+                for start, end in self.vad.segments_online(chunk, is_final=is_final):
+                    if start != -1:
+                        start_ms = start
+                    if end == -1:
+                        continue
+                    data = np.array(audio[start_ms * 16 : end * 16])
+                    sv_future = sv_pool.submit(self.sv.embed, data) if sv_pool else None
+                    entry = [start_ms, end, None, len(batch), sv_future]
+                    pending.append(entry)
+                    batch.append(data)
+                    batch_entries.append(entry)
+                    if len(batch) >= asr_batch_size:
+                        submit_batch()
+
+                while len(pending) >= max_pending_segments:
+                    submit_batch()
+                    yield pop_result()
+                while pending and ready(pending[0]):
+                    yield pop_result()
+
+            submit_batch()
+            while pending:
+                yield pop_result()
+        finally:
+            self.speech_start = False
+            self.reset_asr()
+            # the generator may be closed early, drop the work nobody waits for
+            for entry in pending:
+                for future in (entry[2], entry[4]):
+                    if future is not None:
+                        future.cancel()
+            for pool in (asr_pool, punc_pool, sv_pool):
+                if pool is not None:
+                    pool.shutdown(wait=False)
+
     def two_pass_asr(self, chunk: np.ndarray, is_final: bool = False, hot_words=None):
-        self.frames.extend(chunk.tolist())
+        self.wait_ready()
+        self.audio_history.append(chunk)
         self.vad_pre_idx += len(chunk)
 
         # paraformer online inference
@@ -215,49 +528,46 @@ class AsrAllInOne:
 
         segments = self.extract_endpoint_from_vad_result(segments_result)
         final = None
-        time_stamp_start = 0
-        time_stamp_end = 0
+        final_seqs = []
         for start, end in segments:
             if start != -1:
                 self.speech_start = True
                 self.start_frame = start * 16
-                start = self.start_frame + len(self.frames) - self.vad_pre_idx
-                self.frames = self.frames[start:]
+                # the segment is kept until its end point
+                self.audio_history.discard_before(self.start_frame)
+                self.audio_history.pin(self.start_frame)
 
             # paraformer offline inference
             if end != -1:
                 self.end_frame = end * 16
-                time_stamp_start = self.start_frame / 16
-                time_stamp_end = end
-                time_start = time.time()
-                end = self.end_frame + len(self.frames) - self.vad_pre_idx
-                data = np.array(self.frames[:end])
-                self.frames = self.frames[end:]
-                asr_offline_final = self.asr_offline.infer_offline(
-                    data, hot_words=(hot_words or self.hot_words)
-                )
-                logger.debug(f"asr offline inference use {time.time() - time_start} s")
-                if self.speaker_verification:
-                    time_start = time.time()
-                    speaker_id = self.sv.recognize(data)
-                    logger.debug(
-                        f"asr offline inference use {time.time() - time_start} s"
-                    )
+                time_stamp = {"start": self.start_frame / 16, "end": end}
+                data = self.audio_history.view(self.audio_history.begin, self.end_frame)
+                self.audio_history.discard_before(self.end_frame)
+                self.audio_history.pin(None)
                 self.speech_start = False
-                time_start = time.time()
-                _final = self.punc.punctuate(asr_offline_final)[0]
-                final = _final
-                logger.debug(f"punc online inference use {time.time() - time_start} s")
+                seq = self.final_seq
+                self.final_seq += 1
+                if self.async_final:
+                    # the view is overwritten by the next chunks
+                    self._submit_final(
+                        np.array(data), hot_words or self.hot_words, time_stamp, seq
+                    )
+                    final_seqs.append(seq)
+                else:
+                    final = self.second_pass(
+                        data, hot_words or self.hot_words, time_stamp, seq
+                    )
 
         result = {
             "partial": self.text_cache,
         }
         if final is not None:
-            result["final"] = final
+            result.update(final)
             result["partial"] = ""
-            result["time_stamp"] = {"start": time_stamp_start, "end": time_stamp_end}
-            if self.speaker_verification:
-                result["speaker_id"] = speaker_id
+            self.text_cache = ""
+        if final_seqs:
+            result["partial"] = ""
+            result["final_seqs"] = final_seqs
             self.text_cache = ""
 
         if is_final:
@@ -265,11 +575,119 @@ class AsrAllInOne:
 
         return result
 
+    async def two_pass_asr_async(
+        self,
+        chunk: np.ndarray,
+        is_final: bool = False,
+        hot_words=None,
+        runner: AsyncRunner = None,
+    ):
+        """
+        two_pass_asr on a thread of the async runner, in the order of the
+        calls. with async_final, deliver the finals to an asyncio.Queue with
+        on_final=lambda r: loop.call_soon_threadsafe(queue.put_nowait, r)
+        """
+        return await (runner or get_runner()).run(
+            self, self.two_pass_asr, chunk, is_final, hot_words
+        )
+
+    def second_pass(
+        self, data: np.ndarray, hot_words: str, time_stamp: dict, seq: int
+    ) -> dict:
+        """offline asr, speaker verification and punctuation of one segment"""
+        time_start = time.time()
+        asr_offline_final = self.asr_offline.infer_offline(data, hot_words=hot_words)
+        logger.debug(f"asr offline inference use {time.time() - time_start} s")
+        result = {"time_stamp": time_stamp, "seq": seq}
+        if self.speaker_verification:
+            time_start = time.time()
+            result["speaker_id"] = self.sv.recognize(data)
+            logger.debug(f"speaker verification use {time.time() - time_start} s")
+        time_start = time.time()
+        result["final"] = self.punc.punctuate(asr_offline_final)[0]
+        logger.debug(f"punc online inference use {time.time() - time_start} s")
+        return result
+
+    def _submit_final(self, data, hot_words, time_stamp, seq):
+        """run second_pass in the background after the previous final"""
+        done = Future()
+        with self._final_lock:
+            if self._final_executor is None:
+                self._final_executor = ThreadPoolExecutor(1, thread_name_prefix="final")
+                self._own_final_executor = True
+            executor = self._final_executor
+            previous, self._final_tail = self._final_tail, done
+
+        def run():
+            try:
+                result = self.second_pass(data, hot_words, time_stamp, seq)
+            except Exception as e:
+                logger.exception(f"second pass of final {seq} failed")
+                result = {"time_stamp": time_stamp, "seq": seq, "error": e}
+            try:
+                if self.on_final is None:
+                    self.finals.put(result)
+                else:
+                    self.on_final(result)
+            except Exception:
+                logger.exception(f"delivering final {seq} failed")
+            finally:
+                done.set_result(seq)
+
+        def start(_=None):
+            try:
+                executor.submit(run)
+            except Exception as e:
+                # e.g. a shared executor shut down, wait_finals raises it
+                logger.error(f"can not run final {seq}: {e}")
+                done.set_exception(e)
+
+        if previous is None:
+            start()
+        else:
+            # the punctuation cache and the speakers depend on the order
+            previous.add_done_callback(start)
+
+    def wait_finals(self, timeout=None):
+        """
+        block until the finals submitted so far are delivered, raises the
+        error of a final which could not be run
+        """
+        with self._final_lock:
+            tail = self._final_tail
+        if tail is not None:
+            tail.result(timeout)
+
+    def _release_final_executor(self):
+        """shut the executor made by this instance down after its last final"""
+        with self._final_lock:
+            if not self._own_final_executor:
+                return
+            executor, self._final_executor = self._final_executor, None
+            self._own_final_executor = False
+            tail = self._final_tail
+        if tail is None:
+            executor.shutdown(wait=False)
+        else:
+            tail.add_done_callback(lambda _: executor.shutdown(wait=False))
+
+    def close(self, wait=True):
+        """
+        end the stream, wait for its finals and stop the thread of the finals
+        unless the executor was given by the caller
+        """
+        try:
+            if wait:
+                self.wait_finals()
+        finally:
+            self._release_final_executor()
+
     def two_pass_for_dialogue(self, chunk, is_final=False):
         """
         asr for dialogue
         :return:
         """
+        self.wait_ready()
         self.frames.append(chunk)
         self.vad_pre_idx += len(chunk) // 16
 
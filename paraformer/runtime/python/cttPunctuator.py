@@ -4,10 +4,14 @@
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
 from paraformer.runtime.python.model.punc.punctuator import CT_Transformer
+from paraformer.runtime.python.utils.asyncRunner import AsyncRunner, get_runner
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.singleton import release_on_collect
+from paraformer.runtime.python.utils.snapshot import Snapshotable
+from paraformer.runtime.python.utils.warmup import synthetic_text, warmup_case
 
 
-class CttPunctuator:
+class CttPunctuator(Snapshotable):
     def __init__(self, online: bool = False):
         """
         punctuator with singleton pattern
@@ -24,6 +28,7 @@ class CttPunctuator:
             logger.info("Initializing punctuator instance with offline mode.")
             self.model = CT_Transformer()
             logger.info("Offline punctuator instance initialized.")
+        release_on_collect(self, self.model)
 
     def punctuate(self, text: str, param_dict=None):
         if self.online:
@@ -31,3 +36,35 @@ class CttPunctuator:
             return self.model.online(text, param_dict)
         else:
             return self.model.offline(text)
+
+    async def punctuate_async(
+        self, text: str, param_dict=None, runner: AsyncRunner = None
+    ):
+        """punctuate on a thread of the async runner, in the order of the calls"""
+        return await (runner or get_runner()).run(
+            self, self.punctuate, text, param_dict
+        )
+
+    def state_dict(self) -> dict:
+        """the text cache of the online mode, the offline mode has no state"""
+        return {"cache": list(self.param_dict["cache"])} if self.online else {}
+
+    def load_state_dict(self, state: dict):
+        if self.online:
+            self.param_dict = {"cache": list(state.get("cache", []))}
+
+    def warmup(self, lengths=(10, 20, 60)) -> dict:
+        """
+        punctuate synthetic texts of typical lengths, the online cache is
+        left unchanged
+
+        Return:
+            seconds of each text length
+        """
+        timings = {}
+        for length in lengths:
+            with warmup_case(timings, "punc", f"{length} chars"):
+                # a throwaway cache keeps the one of the online stream
+                param_dict = {"cache": []} if self.online else None
+                self.punctuate(synthetic_text(length), param_dict)
+        return timings
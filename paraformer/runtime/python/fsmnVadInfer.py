@@ -22,9 +22,12 @@ import numpy as np
 
 from paraformer.runtime.python.model.vad.fsmnvad import E2EVadModel
 from paraformer.runtime.python.utils.asrOrtInferRuntimeSession import read_yaml
-from paraformer.runtime.python.utils.audioHelper import AudioReader
+from paraformer.runtime.python.utils.asyncRunner import AsyncRunner, get_runner
+from paraformer.runtime.python.utils.audioHelper import AudioReader, WavReader
 from paraformer.runtime.python.utils.logger import logger
 from paraformer.runtime.python.utils.preprocess import WavFrontend, WavFrontendOnline
+from paraformer.runtime.python.utils.snapshot import Snapshotable
+from paraformer.runtime.python.utils.warmup import synthetic_audio, warmup_case
 
 root_dir = Path(
     os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -50,27 +53,33 @@ class FSMNVad(object):
     def extract_feature(self, waveform):
         fbank, _ = self.frontend.fbank(waveform)
         feats, feats_len = self.frontend.lfr_cmvn(fbank)
-        return feats.astype(np.float32), feats_len
+        return feats.astype(np.float32, copy=False), feats_len
 
     def is_speech(self, buf, sample_rate=16000):
         assert sample_rate == 16000, "only support 16k sample rate"
 
-    def segments_offline(self, waveform_path: Union[str, Path, np.ndarray]):
-        """get sements of audio"""
+    def segments_offline(
+        self,
+        waveform_path: Union[str, Path, np.ndarray, WavReader],
+        block_size: int = 960000,
+    ):
+        """
+        get sements of audio, a wav file is memory-mapped and processed
+        block by block in bounded memory
+        """
 
         if isinstance(waveform_path, np.ndarray):
             waveform = waveform_path
+        elif isinstance(waveform_path, WavReader):
+            return self.segments_offline_blocks(waveform_path, block_size)
         else:
             if not os.path.exists(waveform_path):
                 raise FileExistsError(f"{waveform_path} is not exist.")
-            if os.path.isfile(waveform_path):
-                logger.info(f"load audio {waveform_path}")
-                waveform, _sample_rate = AudioReader.read_wav_file(waveform_path)
-            else:
+            if not os.path.isfile(waveform_path):
                 raise FileNotFoundError(str(Path))
-            assert (
-                _sample_rate == 16000
-            ), f"only support 16k sample rate, current sample rate is {_sample_rate}"
+            logger.info(f"load audio {waveform_path}")
+            with WavReader(waveform_path) as reader:
+                return self.segments_offline_blocks(reader, block_size)
 
         feats, feats_len = self.extract_feature(waveform)
         waveform = waveform[None, ...]
@@ -79,8 +88,43 @@ class FSMNVad(object):
         )
         return segments_part[0]
 
-
-class FSMNVadOnline:
+    def segments_offline_blocks(self, reader: WavReader, block_size: int = 960000):
+        """
+        offline vad over the blocks of a wav file, the streaming frontend gives
+        the same features as the whole file
+        """
+        assert (
+            reader.sample_rate == 16000
+        ), f"only support 16k sample rate, current sample rate is {reader.sample_rate}"
+        frontend = WavFrontendOnline(
+            cmvn_file=root_dir / "onnx/vad/am.mvn",
+            **self.config["WavFrontend"]["frontend_conf"],
+        )
+        segments = []
+        sample_offset = 0
+        for block in reader.blocks(block_size):
+            sample_offset += len(block)
+            is_final = sample_offset >= len(reader)
+            feats, feats_len = frontend.extract_fbank(
+                block[None, ...], np.array([len(block)]), is_final
+            )
+            if feats.size == 0:
+                continue
+            segments_part, _ = self.vad.infer_offline(
+                feats.astype(np.float32, copy=False),
+                frontend.get_waveforms(),
+                is_final=is_final,
+            )
+            if segments_part:
+                segments.extend(segments_part[0])
+        return segments
+
+
+def copy_cache(in_cache):
+    return None if in_cache is None else [np.array(cache) for cache in in_cache]
+
+
+class FSMNVadOnline(Snapshotable):
     def __init__(self, config_path=None):
         project_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         config_path = config_path or os.path.join(
@@ -107,7 +151,7 @@ class FSMNVadOnline:
         feats, feats_len = self.frontend.extract_fbank(
             waveforms, waveforms_lens, is_final
         )
-        return feats.astype(np.float32), feats_len.astype(np.int32)
+        return feats.astype(np.float32, copy=False), feats_len.astype(np.int32)
 
     def is_speech(self, buf, sample_rate=16000):
         assert sample_rate == 16000, "only support 16k sample rate"
@@ -124,7 +168,10 @@ class FSMNVadOnline:
         return in_cache
 
     def segments_online(
-        self, waveform: Union[str, np.ndarray], sample_rate=16000, is_final=False
+        self,
+        waveform: Union[bytes, bytearray, memoryview, np.ndarray],
+        sample_rate=16000,
+        is_final=False,
     ):
         """
         get sements of audio
@@ -133,7 +180,7 @@ class FSMNVadOnline:
         if self.in_cache is None:
             self.in_cache = []
 
-        if isinstance(waveform, str):
+        if isinstance(waveform, (bytes, bytearray, memoryview)):
             waveform = AudioReader.read_pcm_byte(waveform)
 
         assert (
@@ -148,8 +195,73 @@ class FSMNVadOnline:
         )
         return segments_part
 
+    async def segments_online_async(
+        self,
+        waveform: Union[bytes, bytearray, memoryview, np.ndarray],
+        sample_rate=16000,
+        is_final=False,
+        runner: AsyncRunner = None,
+    ):
+        """segments_online on a thread of the async runner, in the order of the calls"""
+        return await (runner or get_runner()).run(
+            self, self.segments_online, waveform, sample_rate, is_final
+        )
+
+    def reset_cache(self):
+        self.in_cache = None
+        self.vad.all_reset_detection()
+        self.frontend.cache_reset()
+
+    def state_dict(self) -> dict:
+        """
+        the fsmn cache, detection state and frontend of the stream, the vad
+        options are not included, a restored stream keeps its own
+        """
+        return {
+            "in_cache": copy_cache(self.in_cache),
+            "vad": self.vad.state_dict(),
+            "frontend": self.frontend.state_dict(),
+        }
+
+    def load_state_dict(self, state: dict):
+        self.in_cache = copy_cache(state["in_cache"])
+        self.vad.load_state_dict(state["vad"])
+        self.frontend.load_state_dict(state["frontend"])
+
+    def warmup(self, seconds: float = 2.0, chunk_ms: int = 600) -> dict:
+        """
+        run synthetic audio in chunks of chunk_ms through a fresh stream. the
+        state of the stream is saved and restored around it, so a warmup
+        during a stream leaves it unchanged
+
+        Return:
+            seconds of the first and the final chunk, and of the slowest other
+            chunk
+        """
+        stride = chunk_ms * 16
+        audio = synthetic_audio(seconds)
+        state = self.state_dict()
+        timings = {}
+        try:
+            self.reset_cache()
+            for start in range(0, len(audio), stride):
+                is_final = start + stride >= len(audio)
+                case = "final chunk" if is_final else "chunk"
+                case = "first chunk" if start == 0 else case
+                with warmup_case(timings, "vad_online", case):
+                    self.segments_online(
+                        audio[start : start + stride], is_final=is_final
+                    )
+        finally:
+            self.reset_cache()
+            self.load_state_dict(state)
+        return timings
+
     def segments_online_with_speaker_verification(
-        self, waveform: Union[str, np.ndarray], sample_rate=16000, is_final=False
+        self,
+        waveform: Union[bytes, bytearray, memoryview, np.ndarray],
+        sample_rate=16000,
+        is_final=False,
     ):
         """
         get sements of audio with vad and speaker verificaton
@@ -158,7 +270,7 @@ class FSMNVadOnline:
         if self.in_cache is None:
             self.in_cache = []
 
-        if isinstance(waveform, str):
+        if isinstance(waveform, (bytes, bytearray, memoryview)):
             waveform = AudioReader.read_pcm_byte(waveform)
 
         assert (
@@ -3,7 +3,8 @@
 # @Time      :2023/8/8 20:04
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
-import glob
+import copy
+import functools
 import os
 import pickle
 from pathlib import Path
@@ -11,7 +12,6 @@ from typing import List, Tuple, Union
 
 import numpy as np
 
-from paraformer.runtime.python.model.lm.transformer_lm import TransformerLM
 from paraformer.runtime.python.utils.asrOrtInferRuntimeSession import (
     AsrOfflineOrtInferRuntimeSession,
     AsrOnlineDecoderOrtInferRuntimeSession,
@@ -22,13 +22,137 @@ from paraformer.runtime.python.utils.asrOrtInferRuntimeSession import (
 )
 from paraformer.runtime.python.utils.audioHelper import AudioReader
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.modelCache import find_model_shards
 from paraformer.runtime.python.utils.postprocess import sentence_postprocess
 from paraformer.runtime.python.utils.preprocess import (
     SinusoidalPositionEncoderOnline,
     WavFrontend,
     WavFrontendOnline,
 )
-from paraformer.runtime.python.utils.singleton import get_all_instance, singleton
+from paraformer.runtime.python.utils.singleton import release_on_collect, singleton
+
+
+def nbytes_of(value) -> int:
+    """bytes of the numpy arrays held by value, through lists, tuples and dicts"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(nbytes_of(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(nbytes_of(v) for v in value)
+    return 0
+
+
+def update_in_place(buffer, value: np.ndarray):
+    """copy value into buffer if it fits, the buffer that holds value afterwards"""
+    if (
+        isinstance(buffer, np.ndarray)
+        and buffer.shape == value.shape
+        and buffer.dtype == value.dtype
+    ):
+        np.copyto(buffer, value)
+        return buffer
+    return np.array(value)
+
+
+class OnlineStreamState:
+    """
+    streaming state of one online asr stream. the feature overlap, decoder
+    fsmn cache and cif carry-over have fixed sizes and are updated in place,
+    so a stream keeps no view into the outputs of its last chunk. items can
+    also be read and set like the former cache dict.
+    """
+
+    __slots__ = (
+        "chunk_size",
+        "start_idx",
+        "is_final",
+        "last_chunk",
+        "feats",
+        "decoder_fsmn",
+        "cif_hidden",
+        "cif_alphas",
+        "io_buffers",
+    )
+
+    def __init__(
+        self,
+        chunk_size: List[int],
+        feats_dims: int,
+        encoder_output_size: int,
+        fsmn_layer: int,
+        fsmn_dims: int,
+        fsmn_lorder: int,
+    ):
+        self.chunk_size = chunk_size
+        self.start_idx = 0
+        self.is_final = False
+        self.last_chunk = False
+        self.feats = np.zeros(
+            (1, chunk_size[0] + chunk_size[2], feats_dims), dtype=np.float32
+        )
+        self.decoder_fsmn = [
+            np.zeros((1, fsmn_dims, fsmn_lorder), dtype=np.float32)
+            for _ in range(fsmn_layer)
+        ]
+        self.cif_hidden = np.zeros((1, 1, encoder_output_size), dtype=np.float32)
+        self.cif_alphas = np.zeros((1, 1), dtype=np.float32)
+        # io binding buffers of the encoder and decoder, see infer_with_binding
+        self.io_buffers = None
+
+    @property
+    def started(self) -> bool:
+        """whether features of the stream were seen since it was created"""
+        return self.start_idx > 0
+
+    def nbytes(self) -> int:
+        """memory held by the buffers of the stream"""
+        return sum(nbytes_of(getattr(self, name)) for name in self.__slots__)
+
+    def state_dict(self) -> dict:
+        """a copy of the state without the io binding buffers, which are made again"""
+        return {
+            name: copy.deepcopy(getattr(self, name))
+            for name in self.__slots__
+            if name != "io_buffers"
+        }
+
+    def load_state_dict(self, state: dict):
+        """copy state into the buffers of the stream"""
+        if list(state["chunk_size"]) != list(self.chunk_size):
+            raise ValueError(
+                f"state of chunk size {state['chunk_size']} can not be loaded "
+                f"into a stream of chunk size {self.chunk_size}"
+            )
+        for name, value in state.items():
+            if name not in self.__slots__ or name == "io_buffers":
+                raise KeyError(name)
+            if name == "decoder_fsmn" and len(value) == len(self.decoder_fsmn):
+                self.decoder_fsmn = [
+                    update_in_place(buffer, item)
+                    for buffer, item in zip(self.decoder_fsmn, value)
+                ]
+            elif name in ("feats", "cif_hidden", "cif_alphas"):
+                setattr(self, name, update_in_place(getattr(self, name), value))
+            elif name != "chunk_size":
+                setattr(self, name, copy.deepcopy(value))
+        self.io_buffers = None
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
 
 
 class ParaformerOnlineModel:
@@ -39,7 +163,8 @@ class ParaformerOnlineModel:
         chunk_size: List = [5, 10, 5],
         device_id: Union[str, int] = "-1",
         quantize: bool = False,
-        intra_op_num_threads: int = 4,
+        intra_op_num_threads: int = None,
+        io_binding: bool = False,
     ):
         logger.info(f"init online context for client")
         config_file = os.path.join(model_dir, "config.pkl")
@@ -53,41 +178,31 @@ class ParaformerOnlineModel:
             cmvn_file=cmvn_file, **config["frontend_conf"]
         )
 
-        if (
-            "AsrOnlineEncoderOrtInferRuntimeSession" not in get_all_instance()
-            and "AsrOnlineDecoderOrtInferRuntimeSession" not in get_all_instance()
-        ):
-            if not Path(model_dir).exists():
-                raise FileNotFoundError(f"{model_dir} is not exist")
-
-            encoder_model_file = os.path.join(model_dir, "model.onnx")
-            decoder_model_file = os.path.join(model_dir, "decoder.onnx")
-            if quantize:
-                encoder_model_file = glob.glob(
-                    os.path.join(model_dir, "model_quant_*.onnx")
-                )
-                decoder_model_file = os.path.join(model_dir, "decoder_quant.onnx")
+        if not Path(model_dir).exists():
+            raise FileNotFoundError(f"{model_dir} is not exist")
 
-            self.pe = SinusoidalPositionEncoderOnline()
+        encoder_model_file = os.path.join(model_dir, "model.onnx")
+        decoder_model_file = os.path.join(model_dir, "decoder.onnx")
+        if quantize:
+            encoder_model_file = find_model_shards(model_dir)
+            decoder_model_file = os.path.join(model_dir, "decoder_quant.onnx")
 
-            self.ort_encoder_infer = AsrOnlineEncoderOrtInferRuntimeSession(
-                encoder_model_file, device_id, intra_op_num_threads=intra_op_num_threads
-            )
-            self.ort_decoder_infer = AsrOnlineDecoderOrtInferRuntimeSession(
-                decoder_model_file, device_id, intra_op_num_threads=intra_op_num_threads
-            )
-        else:
-            self.pe = SinusoidalPositionEncoderOnline()
+        self.pe = SinusoidalPositionEncoderOnline()
 
-            self.ort_encoder_infer = get_all_instance().get(
-                "AsrOnlineEncoderOrtInferRuntimeSession"
-            )
-            self.ort_decoder_infer = get_all_instance().get(
-                "AsrOnlineDecoderOrtInferRuntimeSession"
-            )
+        # sessions are shared by the clients with the same model and settings
+        self.ort_encoder_infer = AsrOnlineEncoderOrtInferRuntimeSession(
+            encoder_model_file, device_id, intra_op_num_threads=intra_op_num_threads
+        )
+        self.ort_decoder_infer = AsrOnlineDecoderOrtInferRuntimeSession(
+            decoder_model_file, device_id, intra_op_num_threads=intra_op_num_threads
+        )
+        release_on_collect(self, self.ort_encoder_infer, self.ort_decoder_infer)
 
         self.batch_size = batch_size
         self.chunk_size = chunk_size
+        # run the encoder and decoder of `infer` with io binding, outputs go to
+        # buffers kept in the stream cache instead of new arrays every chunk
+        self.io_binding = io_binding
         self.encoder_output_size = config["encoder_conf"]["output_size"]
         self.fsmn_layer = config["decoder_conf"]["num_blocks"]
         self.fsmn_lorder = config["decoder_conf"]["kernel_size"] - 1
@@ -98,114 +213,158 @@ class ParaformerOnlineModel:
         self.cif_threshold = config["predictor_conf"]["threshold"]
         self.tail_threshold = config["predictor_conf"]["tail_threshold"]
 
-    def prepare_cache(self, cache: dict = {}, batch_size=1):
-        if len(cache) > 0:
+    @property
+    def batch_key(self) -> tuple:
+        """
+        streams with equal keys run on the same sessions with the same chunk
+        size, so their chunks can be batched by `infer_batch` of any of them
+        """
+        return (
+            id(self.ort_encoder_infer),
+            id(self.ort_decoder_infer),
+            tuple(self.chunk_size),
+        )
+
+    def new_state(self) -> OnlineStreamState:
+        return OnlineStreamState(
+            self.chunk_size,
+            self.feats_dims,
+            self.encoder_output_size,
+            self.fsmn_layer,
+            self.fsmn_dims,
+            self.fsmn_lorder,
+        )
+
+    def stream_state(self, param_dict: dict) -> OnlineStreamState:
+        """
+        the state in param_dict["cache"]. a missing cache is created, a cache
+        dict passed the former way keeps its state in cache["state"], so the
+        same dict carries the stream across new param_dicts
+        """
+        cache = param_dict.get("cache")
+        if isinstance(cache, OnlineStreamState):
             return cache
-        cache["start_idx"] = 0
-        cache["cif_hidden"] = np.zeros(
-            (batch_size, 1, self.encoder_output_size)
-        ).astype(np.float32)
-        cache["cif_alphas"] = np.zeros((batch_size, 1)).astype(np.float32)
-        cache["chunk_size"] = self.chunk_size
-        cache["last_chunk"] = False
-        cache["feats"] = np.zeros(
-            (batch_size, self.chunk_size[0] + self.chunk_size[2], self.feats_dims)
-        ).astype(np.float32)
-        cache["decoder_fsmn"] = []
-        for i in range(self.fsmn_layer):
-            fsmn_cache = np.zeros(
-                (batch_size, self.fsmn_dims, self.fsmn_lorder)
-            ).astype(np.float32)
-            cache["decoder_fsmn"].append(fsmn_cache)
-        return cache
-
-    def add_overlap_chunk(self, feats: np.ndarray, cache: dict = {}):
-        if len(cache) == 0:
-            return feats
-        # process last chunk
-        overlap_feats = np.concatenate((cache["feats"], feats), axis=1)
-        if cache["is_final"]:
-            cache["feats"] = overlap_feats[:, -self.chunk_size[0] :, :]
-            if not cache["last_chunk"]:
-                padding_length = sum(self.chunk_size) - overlap_feats.shape[1]
-                overlap_feats = np.pad(
-                    overlap_feats, ((0, 0), (0, padding_length), (0, 0))
-                )
+        if cache is None:
+            cache = param_dict["cache"] = self.new_state()
+            return cache
+        if not isinstance(cache, dict):
+            raise TypeError(f"cache must be a dict or OnlineStreamState, got {cache!r}")
+        state = cache.get("state")
+        if not isinstance(state, OnlineStreamState):
+            state = cache["state"] = self.new_state()
+        return state
+
+    def add_overlap_chunk(self, feats: np.ndarray, cache: OnlineStreamState):
+        overlap = cache.feats.shape[1]
+        length = overlap + feats.shape[1]
+        # the last chunk is padded to a full chunk in the same array
+        padded = cache.is_final and not cache.last_chunk
+        dtype = np.result_type(cache.feats, feats)
+        if padded:
+            overlap_feats = np.zeros(
+                (1, max(length, sum(self.chunk_size)), feats.shape[2]), dtype=dtype
+            )
         else:
-            cache["feats"] = overlap_feats[
-                :, -(self.chunk_size[0] + self.chunk_size[2]) :, :
-            ]
+            overlap_feats = np.empty((1, length, feats.shape[2]), dtype=dtype)
+        overlap_feats[:, :overlap] = cache.feats
+        overlap_feats[:, overlap:length] = feats
+
+        keep = self.chunk_size[0]
+        if not cache.is_final:
+            keep += self.chunk_size[2]
+        cache.feats = update_in_place(
+            cache.feats, overlap_feats[:, length - keep : length]
+        )
         return overlap_feats
 
     def __call__(self, audio_in: np.ndarray, **kwargs):
-        waveforms = np.expand_dims(audio_in, axis=0)
         param_dict = kwargs.get("param_dict", dict())
         is_final = param_dict.get("is_final", False)
-        cache = param_dict.get("cache", dict())
-        asr_res = []
+        cache = self.stream_state(param_dict)
 
-        if waveforms.shape[1] < 16 * 60 and is_final and len(cache) > 0:
-            cache["last_chunk"] = True
-            feats = cache["feats"]
+        asr_res_chunks = []
+        for feats, last_chunk in self.prepare_chunks(audio_in, cache, is_final):
+            cache.last_chunk = last_chunk
             feats_len = np.array([feats.shape[1]]).astype(np.int32)
-            asr_res = self.infer(feats, feats_len, cache)
-            return asr_res
+            asr_res_chunks.append(self.infer(feats, feats_len, cache))
+        return self.merge_chunk_results(asr_res_chunks)
 
-        feats, feats_len = self.extract_feat(waveforms, is_final)
-        if feats.ndim > 1 and feats.shape[1] != 0:
-            feats *= self.encoder_output_size**0.5
-            cache = self.prepare_cache(cache)
-            cache["is_final"] = is_final
-
-            # fbank -> position encoding -> overlap chunk
-            feats = self.pe.forward(feats, cache["start_idx"])
-            cache["start_idx"] += feats.shape[1]
-            if is_final:
-                if feats.shape[1] + self.chunk_size[2] <= self.chunk_size[1]:
-                    cache["last_chunk"] = True
-                    feats = self.add_overlap_chunk(feats, cache)
-                else:
-                    # first chunk
-                    feats_chunk1 = self.add_overlap_chunk(
-                        feats[:, : self.chunk_size[1], :], cache
-                    )
-                    feats_len = np.array([feats_chunk1.shape[1]]).astype(np.int32)
-                    asr_res_chunk1 = self.infer(feats_chunk1, feats_len, cache)
-
-                    # last chunk
-                    cache["last_chunk"] = True
-                    feats_chunk2 = self.add_overlap_chunk(
-                        feats[
-                            :,
-                            -(
-                                feats.shape[1] + self.chunk_size[2] - self.chunk_size[1]
-                            ) :,
-                            :,
-                        ],
-                        cache,
-                    )
-                    feats_len = np.array([feats_chunk2.shape[1]]).astype(np.int32)
-                    asr_res_chunk2 = self.infer(feats_chunk2, feats_len, cache)
-
-                    asr_res_chunk = asr_res_chunk1 + asr_res_chunk2
-                    res = {}
-                    for pred in asr_res_chunk:
-                        for key, value in pred.items():
-                            if key in res:
-                                res[key][0] += value[0]
-                                res[key][1].extend(value[1])
-                            else:
-                                res[key] = [value[0], value[1]]
-                    return [res]
-            else:
-                feats = self.add_overlap_chunk(feats, cache)
+    def prepare_chunks(
+        self, audio_in: np.ndarray, cache: OnlineStreamState, is_final: bool = False
+    ) -> List[Tuple[np.ndarray, bool]]:
+        """
+        run the frontend, position encoding and chunk overlap of one stream
 
-            feats_len = np.array([feats.shape[1]]).astype(np.int32)
-            asr_res = self.infer(feats, feats_len, cache)
+        Args:
+            audio_in: waveform of the incoming chunk
+            cache: stream state, see `stream_state`
+            is_final: final flag of chunk
 
-        return asr_res
+        Returns:
+            encoder inputs [1, time, dim] to infer in order, each with the
+            `last_chunk` flag the cache must carry when it is inferred
+        """
+        waveforms = np.expand_dims(audio_in, axis=0)
+
+        if waveforms.shape[1] < 16 * 60 and is_final and cache.started:
+            cache.last_chunk = True
+            return [(cache.feats.copy(), True)]
+
+        feats, feats_len = self.extract_feat(waveforms, is_final)
+        if feats.ndim <= 1 or feats.shape[1] == 0:
+            return []
+
+        feats *= self.encoder_output_size**0.5
+        cache.is_final = is_final
+
+        # fbank -> position encoding -> overlap chunk
+        feats = self.pe.forward(feats, cache.start_idx)
+        cache.start_idx += feats.shape[1]
+        if is_final:
+            if feats.shape[1] + self.chunk_size[2] <= self.chunk_size[1]:
+                cache.last_chunk = True
+                return [(self.add_overlap_chunk(feats, cache), True)]
+
+            # first chunk
+            feats_chunk1 = self.add_overlap_chunk(
+                feats[:, : self.chunk_size[1], :], cache
+            )
+            # last chunk
+            cache.last_chunk = True
+            feats_chunk2 = self.add_overlap_chunk(
+                feats[
+                    :,
+                    -(feats.shape[1] + self.chunk_size[2] - self.chunk_size[1]) :,
+                    :,
+                ],
+                cache,
+            )
+            return [(feats_chunk1, False), (feats_chunk2, True)]
+
+        return [(self.add_overlap_chunk(feats, cache), cache.last_chunk)]
+
+    @staticmethod
+    def merge_chunk_results(asr_res_chunks: List[List[dict]]) -> List[dict]:
+        """merge the results of the chunks inferred for one call"""
+        if len(asr_res_chunks) == 0:
+            return []
+        if len(asr_res_chunks) == 1:
+            return asr_res_chunks[0]
+
+        res = {}
+        for pred in sum(asr_res_chunks, []):
+            for key, value in pred.items():
+                if key in res:
+                    res[key][0] += value[0]
+                    res[key][1].extend(value[1])
+                else:
+                    res[key] = [value[0], value[1]]
+        return [res]
 
     def infer(self, feats: np.ndarray, feats_len: np.ndarray, cache):
+        if self.io_binding:
+            return self.infer_with_binding(feats, feats_len, cache)
+
         # encoder forward
         enc_input = [feats, feats_len]
         enc, enc_lens, cif_alphas = self.ort_encoder_infer(enc_input)
@@ -216,16 +375,11 @@ class ParaformerOnlineModel:
         asr_res = []
         if acoustic_embeds.shape[1] > 0:
             dec_input = [enc, enc_lens, acoustic_embeds, acoustic_embeds_len]
-            dec_input.extend(cache["decoder_fsmn"])
+            dec_input.extend(cache.decoder_fsmn)
             dec_output = self.ort_decoder_infer(dec_input)
-            logits, _, cache["decoder_fsmn"] = (
-                dec_output[0],
-                dec_output[1],
-                dec_output[2:],
-            )
-            cache["decoder_fsmn"] = [
-                item[:, :, -self.fsmn_lorder :] for item in cache["decoder_fsmn"]
-            ]
+            logits = dec_output[0]
+            for fsmn_cache, item in zip(cache.decoder_fsmn, dec_output[2:]):
+                np.copyto(fsmn_cache, item[:, :, -self.fsmn_lorder :])
 
             preds = self.decode(logits, acoustic_embeds_len)
 
@@ -235,6 +389,111 @@ class ParaformerOnlineModel:
 
         return asr_res
 
+    def infer_with_binding(self, feats: np.ndarray, feats_len: np.ndarray, cache):
+        """same as `infer`, the outputs are written into the stream's buffers"""
+        if cache.io_buffers is None:
+            cache.io_buffers = {"encoder": {}, "decoder": {}}
+        buffers = cache.io_buffers
+        enc, enc_lens, cif_alphas = self.ort_encoder_infer.run_with_binding(
+            [feats, feats_len], buffers["encoder"]
+        )
+
+        acoustic_embeds, acoustic_embeds_len = self.cif_search(enc, cif_alphas, cache)
+        asr_res = []
+        if acoustic_embeds.shape[1] > 0:
+            dec_input = [enc, enc_lens, acoustic_embeds, acoustic_embeds_len]
+            dec_input.extend(cache.decoder_fsmn)
+            dec_output = self.ort_decoder_infer.run_with_binding(
+                dec_input, buffers["decoder"]
+            )
+            # the fsmn cache is an input of the next run, copy it out of the
+            # output buffers which that run overwrites
+            for fsmn_cache, item in zip(cache.decoder_fsmn, dec_output[2:]):
+                np.copyto(fsmn_cache, item[:, :, -self.fsmn_lorder :])
+
+            preds = self.decode(dec_output[0], acoustic_embeds_len)
+            for pred in preds:
+                asr_res.append({"preds": sentence_postprocess(pred)})
+
+        return asr_res
+
+    def infer_batch(
+        self, feats_list: List[np.ndarray], caches: List[OnlineStreamState]
+    ) -> List[List[dict]]:
+        """
+        infer the ready chunks of many streams in one encoder and decoder run
+
+        Args:
+            feats_list: encoder inputs [1, time, dim] of each stream, see
+                `prepare_chunks`, they are zero padded to the longest one
+            caches: state of each stream, its `last_chunk` flag must be set
+                for the chunk, decoder fsmn cache and cif carry-over are
+                updated in place
+
+        Returns:
+            results of every stream in input order, same as `infer`
+        """
+        batch_size = len(feats_list)
+        feats_len = np.array([i.shape[1] for i in feats_list], dtype=np.int32)
+        feats = np.zeros(
+            (batch_size, feats_len.max(), self.feats_dims), dtype=np.float32
+        )
+        for b, item in enumerate(feats_list):
+            feats[b, : feats_len[b]] = item[0]
+
+        # encoder forward
+        enc, enc_lens, cif_alphas = self.ort_encoder_infer([feats, feats_len])
+
+        # predictor forward over the stacked cif carry-over
+        cif_cache = {
+            "cif_alphas": np.concatenate([c.cif_alphas for c in caches], axis=0),
+            "cif_hidden": np.concatenate([c.cif_hidden for c in caches], axis=0),
+            "last_chunk": np.array([c.last_chunk for c in caches]),
+        }
+        acoustic_embeds, acoustic_embeds_len = self.cif_search(
+            enc, cif_alphas, cif_cache
+        )
+        for b, cache in enumerate(caches):
+            cache.cif_alphas = update_in_place(
+                cache.cif_alphas, cif_cache["cif_alphas"][b : b + 1]
+            )
+            cache.cif_hidden = update_in_place(
+                cache.cif_hidden, cif_cache["cif_hidden"][b : b + 1]
+            )
+
+        # decoder forward, only for the streams that fired tokens
+        asr_res = [[] for _ in range(batch_size)]
+        active = np.nonzero(acoustic_embeds_len > 0)[0]
+        if len(active) == 0:
+            return asr_res
+
+        token_len = acoustic_embeds_len[active]
+        dec_input = [
+            enc[active],
+            enc_lens[active],
+            acoustic_embeds[active, : token_len.max()],
+            token_len,
+        ]
+        for layer in range(self.fsmn_layer):
+            dec_input.append(
+                np.concatenate([caches[b].decoder_fsmn[layer] for b in active], axis=0)
+            )
+        dec_output = self.ort_decoder_infer(dec_input)
+        logits = dec_output[0]
+
+        # the fsmn cache of a padded stream ends at its last token
+        padding = token_len.max() - token_len
+        for i, b in enumerate(active):
+            end = dec_output[2].shape[-1] - padding[i]
+            for fsmn_cache, item in zip(caches[b].decoder_fsmn, dec_output[2:]):
+                np.copyto(fsmn_cache, item[i : i + 1, :, end - self.fsmn_lorder : end])
+
+        preds = self.decode(logits, token_len)
+        for i, b in enumerate(active):
+            asr_res[b].append({"preds": sentence_postprocess(preds[i])})
+
+        return asr_res
+
     def load_data(self, wav_content: Union[str, np.ndarray, List[str]]) -> List:
         def load_wav(path: str) -> np.ndarray:
             waveform, _ = AudioReader.read_wav_file(path)
@@ -261,7 +520,7 @@ class ParaformerOnlineModel:
         feats, feats_len = self.frontend.extract_fbank(
             waveforms, waveforms_lens, is_final
         )
-        return feats.astype(np.float32), feats_len.astype(np.int32)
+        return feats.astype(np.float32, copy=False), feats_len.astype(np.int32)
 
     def decode(self, am_scores: np.ndarray, token_nums: int):
         return [
@@ -293,85 +552,133 @@ class ParaformerOnlineModel:
         return token
 
     def cif_search(self, hidden, alphas, cache=None):
+        """continuous integrate-and-fire over a whole batch
+
+        Only the scalar integrate recurrence runs frame by frame. The hidden
+        vectors of the whole batch are weighted in one pass and summed per fired
+        token in the same order as the frame by frame implementation
+        (kept in test/test_cif_search.py), so the result is bit-compatible.
+
+        Args:
+            hidden: numpy.ndarray, [batch size, time, dim] encoder output
+            alphas: numpy.ndarray, [batch size, time] cif weights
+            cache: stream state or a dict, the carry-over `cif_alphas`
+                [batch size, 1] and `cif_hidden` [batch size, 1, dim] are
+                updated in place, `last_chunk` is a flag or an array of flags
+                per stream
+
+        Returns:
+            acoustic embeds [batch size, max token length, dim], token lengths
+        """
         batch_size, len_time, hidden_size = hidden.shape
-        token_length = []
-        list_fires = []
-        list_frames = []
-        cache_alphas = []
-        cache_hiddens = []
         alphas[:, : self.chunk_size[0]] = 0.0
         alphas[:, sum(self.chunk_size[:2]) :] = 0.0
         if cache is not None and "cif_alphas" in cache and "cif_hidden" in cache:
             hidden = np.concatenate((cache["cif_hidden"], hidden), axis=1)
             alphas = np.concatenate((cache["cif_alphas"], alphas), axis=1)
-        if cache is not None and "last_chunk" in cache and cache["last_chunk"]:
+        if cache is not None and np.any(cache.get("last_chunk", False)):
+            # `last_chunk` may be set per stream, a zero tail leaves the
+            # integration of the other streams unchanged
+            last_chunk = np.broadcast_to(cache["last_chunk"], (batch_size,))
             tail_hidden = np.zeros((batch_size, 1, hidden_size)).astype(np.float32)
-            tail_alphas = np.array([[self.tail_threshold]]).astype(np.float32)
-            tail_alphas = np.tile(tail_alphas, (batch_size, 1))
+            tail_alphas = np.where(last_chunk, self.tail_threshold, 0.0)[:, None]
+            tail_alphas = tail_alphas.astype(np.float32)
             hidden = np.concatenate((hidden, tail_hidden), axis=1)
             alphas = np.concatenate((alphas, tail_alphas), axis=1)
 
         len_time = alphas.shape[1]
+        # the integrate recurrence only touches scalars. It keeps the exact
+        # scalar arithmetic of the frame by frame loop, a cumsum over alphas
+        # would round differently and move fire positions near the threshold
+        fire_frames = []
+        fire_weights = []
+        carry_weights = []
+        integrates = []
         for b in range(batch_size):
             integrate = 0.0
-            frames = np.zeros(hidden_size).astype(np.float32)
-            list_frame = []
-            list_fire = []
-            for t in range(len_time):
-                alpha = alphas[b][t]
+            fire_frame = []
+            for t, alpha in enumerate(alphas[b]):
                 if alpha + integrate < self.cif_threshold:
                     integrate += alpha
-                    list_fire.append(integrate)
-                    frames += alpha * hidden[b][t]
                 else:
-                    frames += (self.cif_threshold - integrate) * hidden[b][t]
-                    list_frame.append(frames)
+                    fire_weights.append(self.cif_threshold - integrate)
                     integrate += alpha
-                    list_fire.append(integrate)
                     integrate -= self.cif_threshold
-                    frames = integrate * hidden[b][t]
+                    carry_weights.append(integrate)
+                    fire_frame.append(t)
+            fire_frames.append(fire_frame)
+            integrates.append(integrate)
+
+        # weight every frame with its share of the token being integrated, a
+        # fired frame also opens the next token with the weight it carries over
+        token_length = np.array([len(i) for i in fire_frames], dtype=np.int32)
+        fires = np.zeros((batch_size, len_time), dtype=bool)
+        for b, fire_frame in enumerate(fire_frames):
+            fires[b, fire_frame] = True
+        weights = alphas.astype(np.float32)
+        weights[fires] = np.array(fire_weights).astype(np.float32)
+        weighted = hidden * weights[:, :, None]
+        carried = hidden[fires] * np.array(carry_weights).astype(np.float32)[:, None]
+
+        # sum each token row by row in the order the frame by frame loop adds
+        # them, the carried over part of the previous token goes first
+        acoustic_embeds = np.zeros(
+            (batch_size, token_length.max(), hidden_size), dtype=np.float32
+        )
+        buffer = np.empty((len_time + 1, hidden_size), dtype=np.float32)
+        cache_hiddens = []
+        carry_idx = 0
+        for b in range(batch_size):
+            start = 0
+            for k, end in enumerate(fire_frames[b] + [len_time - 1]):
+                if k == 0:
+                    rows = weighted[b, start : end + 1]
+                else:
+                    length = end - start + 2
+                    buffer[0] = carried[carry_idx]
+                    buffer[1:length] = weighted[b, start : end + 1]
+                    rows = buffer[:length]
+                    carry_idx += 1
+                if k < token_length[b]:
+                    rows.sum(axis=0, out=acoustic_embeds[b, k])
+                else:
+                    frames = rows.sum(axis=0)
+                start = end + 1
 
-            cache_alphas.append(integrate)
-            if integrate > 0.0:
-                cache_hiddens.append(frames / integrate)
+            if integrates[b] > 0.0:
+                cache_hiddens.append(frames / integrates[b])
             else:
                 cache_hiddens.append(frames)
 
-            token_length.append(len(list_frame))
-            list_fires.append(list_fire)
-            list_frames.append(list_frame)
-
-        max_token_len = max(token_length)
-        list_ls = []
-        for b in range(batch_size):
-            pad_frames = np.zeros(
-                (max_token_len - token_length[b], hidden_size)
-            ).astype(np.float32)
-            if token_length[b] == 0:
-                list_ls.append(pad_frames)
-            else:
-                list_ls.append(np.concatenate((list_frames[b], pad_frames), axis=0))
-
-        cache["cif_alphas"] = np.stack(cache_alphas, axis=0)
-        cache["cif_alphas"] = np.expand_dims(cache["cif_alphas"], axis=0)
-        cache["cif_hidden"] = np.stack(cache_hiddens, axis=0)
-        cache["cif_hidden"] = np.expand_dims(cache["cif_hidden"], axis=0)
+        cache["cif_alphas"] = update_in_place(
+            cache.get("cif_alphas"), np.stack(integrates, axis=0)[:, None]
+        )
+        cache["cif_hidden"] = update_in_place(
+            cache.get("cif_hidden"), np.stack(cache_hiddens, axis=0)[:, None, :]
+        )
 
-        return np.stack(list_ls, axis=0).astype(np.float32), np.stack(
-            token_length, axis=0
-        ).astype(np.int32)
+        return acoustic_embeds, token_length
 
 
 @singleton
 class ParaformerOfflineModel:
     def __init__(
-        self, model_dir: str = None, use_lm=False, intra_op_num_threads=4
+        self,
+        model_dir: str = None,
+        use_lm=False,
+        intra_op_num_threads=None,
+        hot_words_cache_size=64,
+        max_batch_frames=6000,
+        max_batch_size=16,
     ) -> None:
         config_path = os.path.join(model_dir, "config.pkl")
         with open(config_path, "rb") as file:
             config = pickle.load(file)
 
         self.use_lm = use_lm
+        # limits of the padded batches of infer_batch, in lfr frames and utterances
+        self.max_batch_frames = max_batch_frames
+        self.max_batch_size = max_batch_size
         self.converter = TokenIDConverter(config["token_list"])
         self.tokenizer = CharTokenizer(**config["CharTokenizer"])
         self.frontend = WavFrontend(
@@ -380,11 +687,13 @@ class ParaformerOfflineModel:
         if os.path.exists(os.path.join(model_dir, "model_quant.onnx")):
             model_file = os.path.join(model_dir, "model_quant.onnx")
         else:
-            model_file = glob.glob(os.path.join(model_dir, "model_quant_*.onnx"))
+            model_file = find_model_shards(model_dir)
 
         contextual_model = os.path.join(model_dir, "model_eb.onnx")
 
         if use_lm:
+            from paraformer.runtime.python.model.lm.transformer_lm import TransformerLM
+
             lm_model_path = os.path.join(model_dir, "lm")
             self.lm = TransformerLM(lm_model_path, intra_op_num_threads)
 
@@ -394,11 +703,14 @@ class ParaformerOfflineModel:
             intra_op_num_threads=intra_op_num_threads,
         )
 
+        self.reset_bias_embed_cache(hot_words_cache_size)
+
     def extract_feat(self, waveforms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """features of one utterance, keeps no state so threads may share the model"""
         fbank, fbank_len = self.frontend.fbank(waveforms)
         feats, feats_len = self.frontend.lfr_cmvn(fbank)
 
-        return feats.astype(np.float32), feats_len.astype(np.int32)
+        return feats.astype(np.float32, copy=False), feats_len.astype(np.int32)
 
     def decoder_with_greedy_search(self, am_score):
         yseq = am_score.argmax(axis=-1)
@@ -487,7 +799,7 @@ class ParaformerOfflineModel:
 
     def infer(
         self,
-        audio: Union[str, np.ndarray, bytes],
+        audio: Union[str, np.ndarray, bytes, bytearray, memoryview],
         hot_words: str = None,
         beam_search=False,
         beam_size=5,
@@ -495,26 +807,16 @@ class ParaformerOfflineModel:
     ):
         if isinstance(audio, str):
             audio, _ = AudioReader.read_wav_file(audio)
-        elif isinstance(audio, bytes):
+        elif isinstance(audio, (bytes, bytearray, memoryview)):
             audio, _ = AudioReader.read_wav_bytes(audio)
 
         feats, feats_len = self.extract_feat(audio)
         feats = feats[None, ...]
         feats_len = feats_len[None, ...]
 
-        hot_words, hot_words_length = self.proc_hot_words(hot_words)
-
-        input_dict = dict(
-            zip(self.ort_infer.get_contextual_model_input_names(), (hot_words,))
-        )
-        [bias_embed] = self.ort_infer.contextual_model.run(None, input_dict)
-
-        # index from bias_embed
-        bias_embed = bias_embed.transpose(1, 0, 2)
-        _ind = np.arange(0, len(hot_words)).tolist()
-        bias_embed = bias_embed[_ind, hot_words_length]
-        bias_embed = np.expand_dims(bias_embed, axis=0)
-        bias_embed = np.repeat(bias_embed, feats.shape[0], axis=0)
+        bias_embed = self.get_bias_embed(hot_words)
+        if feats.shape[0] > 1:
+            bias_embed = np.repeat(bias_embed, feats.shape[0], axis=0)
 
         if feats_len > 0:
             am_scores = self.ort_infer(
@@ -534,8 +836,148 @@ class ParaformerOfflineModel:
             results.append(pred_res)
         return results if len(results) != 0 else [[""]]
 
-    def proc_hot_words(self, hot_words: str):
-        hot_words = hot_words.strip().split(" ")
+    def infer_batch(
+        self,
+        audios: List[Union[str, np.ndarray, bytes, bytearray, memoryview]],
+        hot_words: str = None,
+        beam_search=False,
+        beam_size=5,
+        lm_weight=0.15,
+        max_batch_frames: int = None,
+        max_batch_size: int = None,
+    ) -> List:
+        """
+        infer many utterances, features of similar length are batched together
+        to limit the padding
+
+        Args:
+            audios: waveforms, wav paths or wav bytes
+            max_batch_frames: max lfr frames of a padded batch, batch size * max length
+            max_batch_size: max utterances of a batch
+
+        Returns:
+            results in the order of audios, [""] for an utterance without speech
+        """
+        max_batch_frames = max_batch_frames or self.max_batch_frames
+        max_batch_size = max_batch_size or self.max_batch_size
+        feats_list = []
+        for audio in audios:
+            if isinstance(audio, str):
+                audio, _ = AudioReader.read_wav_file(audio)
+            elif isinstance(audio, (bytes, bytearray, memoryview)):
+                audio, _ = AudioReader.read_wav_bytes(audio)
+            feats_list.append(self.extract_feat(audio)[0])
+
+        results = [[""]] * len(audios)
+        for batch in self.bucket_by_length(
+            [len(feats) for feats in feats_list], max_batch_frames, max_batch_size
+        ):
+            feats_len = np.array([len(feats_list[i]) for i in batch], dtype=np.int32)
+            feats = np.zeros(
+                (len(batch), feats_len[0], feats_list[batch[0]].shape[1]),
+                dtype=np.float32,
+            )
+            for row, i in enumerate(batch):
+                feats[row, : feats_len[row]] = feats_list[i]
+
+            bias_embed = self.get_bias_embed(hot_words)
+            bias_embed = np.repeat(bias_embed, len(batch), axis=0)
+            outputs = self.ort_infer.run(
+                feats=feats, feats_length=feats_len, bias_embed=bias_embed
+            )
+            am_scores = outputs[0]
+            # the am scores are padded to the longest token sequence of the batch
+            if (
+                len(outputs) > 1
+                and np.issubdtype(outputs[1].dtype, np.integer)
+                and outputs[1].size == len(batch)
+            ):
+                token_nums = outputs[1].reshape(-1)
+            else:
+                token_nums = [am_scores.shape[1]] * len(batch)
+
+            for row, i in enumerate(batch):
+                am_score = am_scores[row, : token_nums[row]]
+                if beam_search:
+                    results[i] = self.decoder_with_beam_search(
+                        am_score, beam_size=beam_size, lm_weight=lm_weight
+                    )
+                else:
+                    results[i] = self.decoder_with_greedy_search(am_score)
+        return results
+
+    @staticmethod
+    def bucket_by_length(
+        lengths: List[int], max_batch_frames: int, max_batch_size: int
+    ) -> List[List[int]]:
+        """
+        group the indexes of non-empty utterances, longest first, so that each
+        padded batch stays within max_batch_frames and max_batch_size
+        """
+        batches = []
+        batch = []
+        for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+            if lengths[i] == 0:
+                break
+            # the first utterance of a batch is the longest one
+            if batch and (
+                len(batch) >= max_batch_size
+                or (len(batch) + 1) * lengths[batch[0]] > max_batch_frames
+            ):
+                batches.append(batch)
+                batch = []
+            batch.append(i)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def normalize_hot_words(hot_words: str) -> Tuple[str, ...]:
+        return tuple((hot_words or "").strip().split(" "))
+
+    def reset_bias_embed_cache(self, maxsize: int = 64):
+        """
+        bias embeddings of the maxsize recently used hot words, the one
+        without hot words is computed once and never evicted
+        """
+        self.bias_embed_cache = functools.lru_cache(maxsize=maxsize)(
+            self.compute_bias_embed
+        )
+        self.no_hot_words_bias_embed = self.compute_bias_embed(
+            self.normalize_hot_words("")
+        )
+
+    def get_bias_embed(self, hot_words: str) -> np.ndarray:
+        """
+        cached bias embedding of the hot words split by space,
+        read only, [1, number of hot words + 1, dim]
+        """
+        hot_words = self.normalize_hot_words(hot_words)
+        if hot_words == ("",):
+            return self.no_hot_words_bias_embed
+        return self.bias_embed_cache(hot_words)
+
+    def compute_bias_embed(self, hot_words: Tuple[str, ...]) -> np.ndarray:
+        hot_words, hot_words_length = self.proc_hot_words(hot_words)
+
+        input_dict = dict(
+            zip(self.ort_infer.get_contextual_model_input_names(), (hot_words,))
+        )
+        [bias_embed] = self.ort_infer.contextual_model.run(None, input_dict)
+
+        # index from bias_embed
+        bias_embed = bias_embed.transpose(1, 0, 2)
+        _ind = np.arange(0, len(hot_words)).tolist()
+        bias_embed = bias_embed[_ind, hot_words_length]
+        bias_embed = np.expand_dims(bias_embed, axis=0)
+        # shared by every call with the same hot words
+        bias_embed.flags.writeable = False
+        return bias_embed
+
+    def proc_hot_words(self, hot_words: Union[str, Tuple[str, ...]]):
+        if isinstance(hot_words, str):
+            hot_words = self.normalize_hot_words(hot_words)
+        hot_words = list(hot_words)
         hot_words_length = [len(i) - 1 for i in hot_words]
         hot_words_length.append(0)
         hot_words_length = np.array(hot_words_length).astype("int32")
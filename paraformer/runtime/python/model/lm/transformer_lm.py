@@ -20,7 +20,7 @@ from paraformer.runtime.python.utils.singleton import singleton
 
 @singleton
 class TransformerLM:
-    def __init__(self, model_dir: str = None, intra_op_num_threads=4):
+    def __init__(self, model_dir: str = None, intra_op_num_threads=None):
         tokens_list_path = os.path.join(model_dir, "tokens.txt")
         segment_dict_path = os.path.join(model_dir, "seg_dict")
         self.tokens_list = []
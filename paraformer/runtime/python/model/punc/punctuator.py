@@ -1,4 +1,3 @@
-import glob
 import logging
 import os.path
 import pickle
@@ -15,6 +14,7 @@ from paraformer.runtime.python.utils.asrOrtInferRuntimeSession import (
     split_to_mini_sentence,
 )
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.modelCache import find_model_shards
 from paraformer.runtime.python.utils.puncOrtInferRuntimeSession import (
     ONNXRuntimeError,
     PuncOrtInferRuntimeSession,
@@ -37,7 +37,7 @@ class CT_Transformer:
         batch_size: int = 1,
         device_id: Union[str, int] = "-1",
         quantize: bool = True,
-        intra_op_num_threads: int = 4,
+        intra_op_num_threads: int = None,
     ):
         project_dir = os.path.dirname(
             os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -48,7 +48,7 @@ class CT_Transformer:
             raise FileNotFoundError(f"{model_dir} does not exist.")
 
         if not os.path.exists(os.path.join(model_dir, "model_quant.onnx")):
-            model_file = glob.glob(os.path.join(model_dir, "model_quant_*.onnx"))
+            model_file = find_model_shards(model_dir)
 
         else:
             model_file = os.path.join(model_dir, "model_quant.onnx")
@@ -62,7 +62,9 @@ class CT_Transformer:
             f"Loading config file {config_file} finished, takes {time.time() - start} s"
         )
         self.converter = TokenIDConverter(config["token_list"])
-        self.ort_infer = PuncOrtInferRuntimeSession(model_file, device_id)
+        self.ort_infer = PuncOrtInferRuntimeSession(
+            model_file, device_id, intra_op_num_threads=intra_op_num_threads
+        )
         self.batch_size = 1
         self.punc_list = config["punc_list"]
         self.period = 0
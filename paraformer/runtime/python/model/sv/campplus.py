@@ -4,10 +4,12 @@ from typing import Union
 
 import kaldi_native_fbank as knf
 import numpy as np
-import onnxruntime
+from onnxruntime import SessionOptions
 
 from paraformer.runtime.python.utils.audioHelper import AudioReader
+from paraformer.runtime.python.utils.modelCache import create_session
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
 
 
 @singleton
@@ -30,8 +32,9 @@ class Campplus:
             "arena_extend_strategy": "kSameAsRequested",
         }
 
-        self.sess = onnxruntime.InferenceSession(
+        self.sess = create_session(
             self.onnx,
+            planner.apply(SessionOptions(), "sv"),
             providers=[
                 (cpu_ep, cpu_provider_options),
             ],
@@ -98,9 +101,18 @@ class Campplus:
         :param waveform:
         :return index: if max similarity less than threshold, it will add current emb into memory
         """
+        return self.recognize_embedding(self.embed(waveform), threshold)
+
+    def embed(self, waveform: Union[str, Path, np.ndarray]) -> np.ndarray:
+        """speaker embedding of the waveform, safe to call from several threads"""
         feature = self.extract_feature(waveform)
-        emb = self.embedding(feature)[0]
+        return self.embedding(feature)[0]
 
+    def recognize_embedding(self, emb: np.ndarray, threshold=0.65):
+        """
+        match the embedding against the registered speakers and register it if
+        none is similar enough, call it in time order
+        """
         if self.memory is None:
             self.memory = emb / np.linalg.norm(emb)
             return 0
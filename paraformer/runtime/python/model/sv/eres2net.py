@@ -6,12 +6,15 @@
 import os
 
 import numpy as np
-import onnxruntime
+from onnxruntime import SessionOptions
 
 from paraformer.runtime.python.model.sv.campplus import Campplus
+from paraformer.runtime.python.utils.modelCache import create_session
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
 
-campplus_class = Campplus().__class__
+# the class behind the singleton decorator, no instance is created at import
+campplus_class = Campplus.__wrapped__
 
 
 @singleton
@@ -20,7 +23,7 @@ class Eres2net(campplus_class):
         self.onnx = onnx_path or os.path.join(
             os.path.dirname(os.path.dirname(__file__)), "onnx/campplus.onnx"
         )
-        self.sess = onnxruntime.InferenceSession(self.onnx)
+        self.sess = create_session(self.onnx, planner.apply(SessionOptions(), "sv"))
         self.output_name = [nd.name for nd in self.sess.get_outputs()]
         self.threshhold = threshold
         self.memory: np.ndarray = None
@@ -3,6 +3,7 @@
 # @Time      :2023/4/3 17:02
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
+import copy
 import logging
 import math
 from enum import Enum
@@ -12,17 +13,21 @@ from typing import Any, Dict, List, Tuple
 import numpy as np
 
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.singleton import release_on_collect
+from paraformer.runtime.python.utils.snapshot import register
 from paraformer.runtime.python.utils.vadOrtInferRuntimeSession import (
     VadOrtInferRuntimeSession,
 )
 
 
+@register
 class VadStateMachine(Enum):
     kVadInStateStartPointNotDetected = 1
     kVadInStateInSpeechSegment = 2
     kVadInStateEndPointDetected = 3
 
 
+@register
 class FrameState(Enum):
     kFrameStateInvalid = -1
     kFrameStateSpeech = 1
@@ -30,6 +35,7 @@ class FrameState(Enum):
 
 
 # final voice/unvoice state per frame
+@register
 class AudioChangeState(Enum):
     kChangeStateSpeech2Speech = 0
     kChangeStateSpeech2Sil = 1
@@ -108,6 +114,7 @@ class VADXOptions:
         self.frame_length_ms = frame_length_ms
 
 
+@register
 class E2EVadSpeechBufWithDoa(object):
     def __init__(self):
         self.start_ms = 0
@@ -126,6 +133,7 @@ class E2EVadSpeechBufWithDoa(object):
         self.doa = 0
 
 
+@register
 class E2EVadFrameProb(object):
     def __init__(self):
         self.noise_prob = 0.0
@@ -135,6 +143,7 @@ class E2EVadFrameProb(object):
         self.frm_state = 0
 
 
+@register
 class WindowDetector(object):
     def __init__(
         self,
@@ -225,6 +234,7 @@ class E2EVadModel:
             self.vad_opts.frame_in_ms,
         )
         self.model = VadOrtInferRuntimeSession(config, root_dir)
+        release_on_collect(self, self.model)
         self.all_reset_detection()
 
     def all_reset_detection(self):
@@ -262,6 +272,23 @@ class E2EVadModel:
         self.waveform = None
         self.reset_detection()
 
+    def state_dict(self) -> dict:
+        """
+        a copy of the detection state, without the session, the options and
+        the last chunk
+        """
+        return copy.deepcopy(
+            {
+                name: value
+                for name, value in vars(self).items()
+                if name not in ("model", "vad_opts", "waveform")
+            }
+        )
+
+    def load_state_dict(self, state: dict):
+        self.all_reset_detection()
+        self.__dict__.update(copy.deepcopy(state))
+
     def reset_detection(self):
         self.continous_silence_frame_count = 0
         self.latest_confirmed_speech_frame = 0
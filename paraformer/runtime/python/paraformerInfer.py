@@ -4,18 +4,190 @@
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
 import os.path
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple, Union
 
 import numpy as np
 
 from paraformer.runtime.python.model.asr.paraformer import (
+    OnlineStreamState,
     ParaformerOfflineModel,
     ParaformerOnlineModel,
+    nbytes_of,
 )
+from paraformer.runtime.python.utils.asyncRunner import AsyncRunner, get_runner
+from paraformer.runtime.python.utils.audioHelper import AudioReader
 from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.singleton import release_on_collect
+from paraformer.runtime.python.utils.snapshot import Snapshotable
+from paraformer.runtime.python.utils.warmup import synthetic_audio, warmup_case
 
 
-class ParaformerOnline:
-    def __init__(self, model_dir=None, *, chunk_size=None, intra_op_num_threads=4):
+class ParaformerOnlineMultiplexer:
+    """
+    batch the ready chunks of many online streams into one encoder/decoder run
+
+    Streams keep their own frontend and cache, only the onnx inference is
+    shared. A chunk waits at most `max_wait_ms` for other streams before its
+    batch is run, bigger windows give bigger batches at the cost of latency.
+    Streams of different models or chunk sizes are run in separate batches.
+    """
+
+    def __init__(self, max_batch_size: int = 32, max_wait_ms: float = 10):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def __call__(self, model, audio_in: np.ndarray, param_dict: dict):
+        """infer one chunk of a stream, blocks until its batch has been run"""
+        is_final = param_dict.get("is_final", False)
+        cache = model.stream_state(param_dict)
+
+        asr_res_chunks = []
+        for job in model.prepare_chunks(audio_in, cache, is_final):
+            asr_res_chunks.append(self.submit(model, job, cache).result())
+        return model.merge_chunk_results(asr_res_chunks)
+
+    def submit(
+        self, model, job: Tuple[np.ndarray, bool], cache: OnlineStreamState
+    ) -> Future:
+        """
+        queue one (feats, last_chunk) job prepared by `model.prepare_chunks`,
+        the next job of the same stream must wait for this future
+        """
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((model, job, cache, future))
+        return future
+
+    def infer_online_batch(
+        self, streams: List["ParaformerOnline"], chunks: List[np.ndarray], is_final
+    ) -> List[str]:
+        """
+        infer one chunk for each stream from the calling thread without waiting
+
+        Args:
+            streams: online streams, each appears at most once
+            chunks: waveform chunk of every stream
+            is_final: final flag of every stream, or one flag for all
+
+        Return:
+            transcript of every stream
+        """
+        is_final = np.broadcast_to(is_final, (len(streams),))
+        pending = []
+        for stream, chunk, final in zip(streams, chunks, is_final):
+            stream.param_dict["is_final"] = bool(final)
+            cache = stream.model.stream_state(stream.param_dict)
+            jobs = stream.model.prepare_chunks(chunk, cache, bool(final))
+            pending.append((stream, cache, jobs, []))
+
+        # a stream can have two chunks on its final call, the second one depends
+        # on the cache left by the first, so they go to consecutive batches
+        step = 0
+        while True:
+            batch = [
+                (stream.model, jobs[step], cache, results)
+                for stream, cache, jobs, results in pending
+                if step < len(jobs)
+            ]
+            if len(batch) == 0:
+                break
+            for group in self._group_by_model(batch):
+                for i in range(0, len(group), self.max_batch_size):
+                    self._run_batch(group[i : i + self.max_batch_size])
+            step += 1
+
+        return [
+            ParaformerOnline.get_text(stream.model.merge_chunk_results(results))
+            for stream, _, _, results in pending
+        ]
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._loop, name="paraformer-online-mux", daemon=True
+                )
+                self._worker.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            # a failing model only fails the streams of its own group
+            for group in self._group_by_model(batch):
+                results = [[] for _ in group]
+                try:
+                    self._run_batch(
+                        [
+                            (model, job, cache, result)
+                            for (model, job, cache, _), result in zip(group, results)
+                        ]
+                    )
+                except Exception as e:
+                    for *_, future in group:
+                        future.set_exception(e)
+                    continue
+                for (*_, future), result in zip(group, results):
+                    future.set_result(result[0])
+
+    @staticmethod
+    def _group_by_model(batch) -> List[list]:
+        """split the entries of a batch by `model.batch_key`, in arrival order"""
+        groups = {}
+        for entry in batch:
+            groups.setdefault(entry[0].batch_key, []).append(entry)
+        return list(groups.values())
+
+    @staticmethod
+    def _run_batch(batch):
+        """batch: (model, (feats, last_chunk), cache, results) of each stream"""
+        key = batch[0][0].batch_key
+        if any(model.batch_key != key for model, *_ in batch[1:]):
+            raise ValueError(
+                "streams of a batch must share the model and chunk size, "
+                "group them with _group_by_model"
+            )
+        start = time.time()
+        for _, (_, last_chunk), cache, _ in batch:
+            cache.last_chunk = last_chunk
+        asr_res = batch[0][0].infer_batch(
+            [job[1][0] for job in batch], [job[2] for job in batch]
+        )
+        for (_, _, _, results), res in zip(batch, asr_res):
+            results.append(res)
+        logger.debug(
+            f"online batch of {len(batch)} streams use {time.time() - start} s"
+        )
+
+
+class ParaformerOnline(Snapshotable):
+    def __init__(
+        self,
+        model_dir=None,
+        *,
+        chunk_size=None,
+        intra_op_num_threads=None,
+        multiplexer: ParaformerOnlineMultiplexer = None,
+        io_binding=False,
+    ):
         self.chunk_size = chunk_size or [5, 10, 5]
         project_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         model_dir = model_dir or os.path.join(project_dir, "onnx", "asr_online")
@@ -26,35 +198,132 @@ class ParaformerOnline:
             quantize=True,
             chunk_size=self.chunk_size,
             intra_op_num_threads=intra_op_num_threads,
+            io_binding=io_binding,
         )
-        self.param_dict = {"cache": dict()}
+        self.multiplexer = multiplexer
+        self.param_dict = {"cache": self.model.new_state()}
 
-    def infer_online(self, chunk: np.ndarray, is_final=False):
+    def infer_online(
+        self, chunk: Union[np.ndarray, bytes, bytearray, memoryview], is_final=False
+    ):
         """
         Args:
-            chunk: 300ms is best
+            chunk: 300ms is best, samples or pcm_s16le bytes
             is_final: final flag of chunk
 
         Return:
             transcript of audio
         """
+        if isinstance(chunk, (bytes, bytearray, memoryview)):
+            chunk = AudioReader.read_pcm_byte(chunk)
         self.param_dict["is_final"] = is_final
-        result = self.model(audio_in=chunk, param_dict=self.param_dict)
+        if self.multiplexer is None:
+            result = self.model(audio_in=chunk, param_dict=self.param_dict)
+        else:
+            result = self.multiplexer(self.model, chunk, self.param_dict)
+
+        return self.get_text(result)
+
+    async def infer_online_async(
+        self,
+        chunk: Union[np.ndarray, bytes, bytearray, memoryview],
+        is_final=False,
+        runner: AsyncRunner = None,
+    ):
+        """infer_online on a thread of the async runner, in the order of the calls"""
+        return await (runner or get_runner()).run(
+            self, self.infer_online, chunk, is_final
+        )
+
+    def warmup(self, seconds: float = 2.0) -> dict:
+        """
+        stream synthetic audio in chunks of the configured size through a
+        throwaway cache, so that the first real chunk does not pay the lazy
+        initialization of the sessions. the frontend of the stream is saved
+        and restored around it, so the stream state is left unchanged
 
-        return result[0]["preds"][0] if len(result) > 0 else ""
+        Return:
+            seconds of the first and the final chunk, and of the slowest other
+            chunk
+        """
+        stride = self.chunk_size[1] * 960
+        audio = synthetic_audio(seconds)
+        param_dict = {"cache": self.model.new_state()}
+        frontend_state = self.model.frontend.state_dict()
+        timings = {}
+        try:
+            for start in range(0, len(audio), stride):
+                is_final = start + stride >= len(audio)
+                case = "final chunk" if is_final else "chunk"
+                case = "first chunk" if start == 0 else case
+                param_dict["is_final"] = is_final
+                with warmup_case(timings, "asr_online", case):
+                    self.model(
+                        audio_in=audio[start : start + stride], param_dict=param_dict
+                    )
+        finally:
+            self.model.frontend.load_state_dict(frontend_state)
+        return timings
+
+    @staticmethod
+    def get_text(result):
+        return result[0]["preds"][0] if len(result) > 0 and result[0] else ""
 
     def reset_cache(self):
-        self.param_dict = {"cache": dict()}
+        self.param_dict = {"cache": self.model.new_state()}
+
+    def memory_footprint(self) -> dict:
+        """bytes of the numpy buffers of this stream, the sessions are shared"""
+        return {
+            "state": self.model.stream_state(self.param_dict).nbytes(),
+            "frontend": nbytes_of(vars(self.model.frontend)),
+        }
+
+    def state_dict(self) -> dict:
+        """the model cache and the frontend of the stream, see snapshot()"""
+        return {
+            "cache": self.model.stream_state(self.param_dict).state_dict(),
+            "frontend": self.model.frontend.state_dict(),
+        }
+
+    def load_state_dict(self, state: dict):
+        cache = self.model.new_state()
+        cache.load_state_dict(state["cache"])
+        self.model.frontend.load_state_dict(state["frontend"])
+        self.param_dict = {"cache": cache}
 
 
 class ParaformerOffline:
-    def __init__(self, model_dir=None, *, use_lm=False, intra_op_num_threads=4):
+    def __init__(
+        self,
+        model_dir=None,
+        *,
+        use_lm=False,
+        intra_op_num_threads=None,
+        hot_words_cache_size=64,
+        max_batch_frames=6000,
+        max_batch_size=16,
+    ):
+        """
+        Args:
+            hot_words_cache_size: number of hot word lists whose bias embedding
+                is cached, the empty hot words are always cached
+            max_batch_frames: max lfr frames (batch size * max length) of a
+                padded batch in infer_offline_batch
+            max_batch_size: max utterances of a batch in infer_offline_batch
+        """
         project_dir = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         model_dir = model_dir or os.path.join(project_dir, "onnx", "asr_offline")
         logger.info(f"Load onnx model dir at {model_dir}")
         self.model = ParaformerOfflineModel(
-            model_dir, intra_op_num_threads=intra_op_num_threads, use_lm=use_lm
+            model_dir,
+            intra_op_num_threads=intra_op_num_threads,
+            use_lm=use_lm,
+            hot_words_cache_size=hot_words_cache_size,
+            max_batch_frames=max_batch_frames,
+            max_batch_size=max_batch_size,
         )
+        release_on_collect(self, self.model)
         self.param_dict = {"cache": dict()}
 
     def infer_offline(
@@ -84,3 +353,52 @@ class ParaformerOffline:
         )
 
         return result[0][0]
+
+    def warmup(self, durations=(1.0, 5.0, 10.0)) -> dict:
+        """
+        recognize synthetic segments of typical lengths one by one and as a
+        batch, so that the first real request does not pay the lazy
+        initialization of the sessions
+
+        Return:
+            seconds of each segment length and of the batch
+        """
+        audios = [synthetic_audio(seconds) for seconds in durations]
+        timings = {}
+        for seconds, audio in zip(durations, audios):
+            with warmup_case(timings, "asr_offline", f"{seconds:g}s segment"):
+                self.infer_offline(audio)
+        with warmup_case(timings, "asr_offline", "batch"):
+            self.infer_offline_batch(audios)
+        return timings
+
+    def infer_offline_batch(
+        self,
+        audios: List[np.ndarray],
+        hot_words: str = "",
+        beam_search=False,
+        beam_size=5,
+        lm_weight=0.15,
+        max_batch_frames: int = None,
+        max_batch_size: int = None,
+    ) -> List[str]:
+        """
+        Args:
+            audios: utterances, e.g. the vad segments of a file
+            hot_words: hot words split by space . eg `a b cc`
+            max_batch_frames: override the max lfr frames of a padded batch
+            max_batch_size: override the max utterances of a batch
+
+        Return:
+            transcripts in the order of audios
+        """
+        results = self.model.infer_batch(
+            audios,
+            hot_words,
+            beam_search=beam_search,
+            beam_size=beam_size,
+            lm_weight=lm_weight,
+            max_batch_frames=max_batch_frames,
+            max_batch_size=max_batch_size,
+        )
+        return [result[0] for result in results]
@@ -0,0 +1,218 @@
+# -*- coding:utf-8 -*-
+# @FileName  :streamClient.py
+# @Time      :2026/10/18 21:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+"""
+client of streamServer and a load test, which streams a wav file over many
+connections at once and reports the latency of the partials and finals:
+
+    python -m paraformer.runtime.python.streamClient test/P9_0002.wav -c 32
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, List
+
+import numpy as np
+
+from paraformer.runtime.python.streamServer import (
+    AUDIO,
+    END,
+    ERROR,
+    RESULT,
+    START,
+    encode_frame,
+    read_frame,
+)
+from paraformer.runtime.python.utils.audioHelper import AudioReader
+
+
+class StreamClient:
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=10095, path=None):
+        """connect to host:port, or to the unix socket path"""
+        if path is None:
+            reader, writer = await asyncio.open_connection(host, port)
+        else:
+            reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def start(self, hot_words: str = None):
+        options = {} if hot_words is None else {"hot_words": hot_words}
+        self.writer.write(encode_frame(START, json.dumps(options).encode("utf-8")))
+        await self.writer.drain()
+
+    async def send_audio(self, samples: np.ndarray):
+        """float32 samples in [-1, 1) or int16 pcm, waits while the server is behind"""
+        if samples.dtype != np.int16:
+            samples = np.clip(samples * (1 << 15), -(1 << 15), (1 << 15) - 1)
+        self.writer.write(encode_frame(AUDIO, samples.astype("<i2").tobytes()))
+        await self.writer.drain()
+
+    async def end(self):
+        self.writer.write(encode_frame(END))
+        await self.writer.drain()
+
+    async def results(self) -> AsyncIterator[dict]:
+        """the results until the last final, RuntimeError on a server error"""
+        while True:
+            kind, payload = await read_frame(self.reader)
+            message = json.loads(payload)
+            if kind == ERROR:
+                raise RuntimeError(message["error"])
+            if kind != RESULT:
+                continue
+            if message.get("done"):
+                return
+            yield message
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def stream_audio(
+    speech: np.ndarray,
+    chunk_ms=600,
+    realtime=True,
+    host="127.0.0.1",
+    port=10095,
+    path=None,
+) -> dict:
+    """
+    stream speech over one connection
+
+    Return:
+        finals, latency of each partial from the send of its last sample, and
+        latency of each final from the send of its end point, in seconds
+    """
+    client = await StreamClient.connect(host, port, path)
+    step = chunk_ms * 16
+    # time each sample offset was sent
+    sent_at = {}
+    partial_latency = []
+    final_latency = []
+    finals = []
+
+    async def send():
+        await client.start()
+        start = time.perf_counter()
+        for offset in range(0, len(speech), step):
+            if realtime:
+                await asyncio.sleep(
+                    max(0, start + offset / 16000 - time.perf_counter())
+                )
+            await client.send_audio(speech[offset : offset + step])
+            sent_at[min(offset + step, len(speech))] = time.perf_counter()
+        await client.end()
+
+    def sent_time(samples):
+        # the first send which contains the sample
+        return min(t for offset, t in sent_at.items() if offset >= samples)
+
+    sender = asyncio.ensure_future(send())
+    try:
+        async for result in client.results():
+            now = time.perf_counter()
+            if "samples" in result:
+                partial_latency.append(now - sent_time(result["samples"]))
+            if "final" in result:
+                finals.append(result)
+                end = int(result["time_stamp"]["end"] * 16)
+                final_latency.append(now - sent_time(min(end, len(speech))))
+        await sender
+    finally:
+        sender.cancel()
+        await client.close()
+    finals.sort(key=lambda r: r["seq"])
+    return {
+        "finals": finals,
+        "partial_latency": partial_latency,
+        "final_latency": final_latency,
+    }
+
+
+def percentiles(values: List[float]) -> str:
+    if not values:
+        return "-"
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return f"p50 {p50:.0f} ms, p95 {p95:.0f} ms, p99 {p99:.0f} ms"
+
+
+async def load_test(
+    speech: np.ndarray,
+    connections=8,
+    chunk_ms=600,
+    realtime=True,
+    host="127.0.0.1",
+    port=10095,
+    path=None,
+) -> dict:
+    """stream speech over many connections at once, return the latencies"""
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            stream_audio(speech, chunk_ms, realtime, host, port, path)
+            for _ in range(connections)
+        ]
+    )
+    seconds = time.perf_counter() - start
+    return {
+        "connections": connections,
+        "seconds": seconds,
+        "audio_seconds": connections * len(speech) / 16000,
+        "partial_latency": [t for r in results for t in r["partial_latency"]],
+        "final_latency": [t for r in results for t in r["final_latency"]],
+        "finals": [r["finals"] for r in results],
+    }
+
+
+def load_test_report(report: dict) -> str:
+    return "\n".join(
+        [
+            f"{report['connections']} connections, {report['audio_seconds']:.1f}s "
+            f"of audio in {report['seconds']:.1f}s",
+            f"partial latency: {percentiles(report['partial_latency'])}",
+            f"final latency: {percentiles(report['final_latency'])}",
+        ]
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="load test of the stream server")
+    parser.add_argument("wav")
+    parser.add_argument("-c", "--connections", type=int, default=8)
+    parser.add_argument("--chunk-ms", type=int, default=600)
+    parser.add_argument(
+        "--no-realtime", action="store_true", help="send as fast as possible"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10095)
+    parser.add_argument("--unix", default=None, help="unix socket path")
+    args = parser.parse_args()
+    speech, _ = AudioReader.read_wav_file(args.wav)
+    print(
+        load_test_report(
+            asyncio.run(
+                load_test(
+                    speech,
+                    args.connections,
+                    args.chunk_ms,
+                    not args.no_realtime,
+                    args.host,
+                    args.port,
+                    args.unix,
+                )
+            )
+        )
+    )
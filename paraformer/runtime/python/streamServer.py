@@ -0,0 +1,297 @@
+# -*- coding:utf-8 -*-
+# @FileName  :streamServer.py
+# @Time      :2026/10/18 20:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+"""
+asyncio server of 2pass streams over tcp or unix sockets.
+
+every frame is a header of <type: uint8, length: uint32 little endian>
+followed by length bytes of payload.
+
+client -> server
+    START  json options of the stream, {"hot_words": "a b"}
+    AUDIO  pcm_s16le mono 16k samples
+    END    the stream ends, the last results follow
+server -> client
+    RESULT json, {"partial": ..., "samples": received samples recognized}
+           or a final {"final": ..., "seq": ..., "time_stamp": {...}}
+           and {"done": true} after the last final
+    ERROR  json {"error": message}, the connection is closed afterwards
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+
+from paraformer.runtime.python.asr_all_in_one import AsrAllInOne
+from paraformer.runtime.python.paraformerInfer import ParaformerOnlineMultiplexer
+from paraformer.runtime.python.utils.asyncRunner import AsyncRunner
+from paraformer.runtime.python.utils.audioHelper import AudioReader
+from paraformer.runtime.python.utils.logger import logger
+
+FRAME_HEADER = struct.Struct("<BI")
+START, AUDIO, END = 1, 2, 3
+RESULT, ERROR = 16, 17
+# 10 s of audio
+MAX_FRAME_SIZE = 320000
+# one vad frame, the models need at least one frame of a chunk
+MIN_CHUNK_SAMPLES = 400
+
+
+def encode_frame(kind: int, payload: bytes = b"") -> bytes:
+    return FRAME_HEADER.pack(kind, len(payload)) + payload
+
+
+def encode_json(kind: int, value: dict) -> bytes:
+    payload = json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+    return encode_frame(kind, payload)
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, bytes]:
+    """the next frame, IncompleteReadError when the peer is gone"""
+    kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"frame of {length} bytes exceeds {MAX_FRAME_SIZE}")
+    return kind, await reader.readexactly(length)
+
+
+class StreamServer:
+    """
+    one AsrAllInOne 2pass session per connection. the online asr chunks of
+    all connections are batched by one multiplexer, the blocking calls run on
+    one AsyncRunner and the finals on one thread pool.
+
+    backpressure: each connection buffers at most max_pending_chunks audio
+    frames, then the socket is not read any more and tcp slows the client
+    down. the audio frames buffered while a session was busy are recognized
+    in one call, so a session behind catches up with fewer calls.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_sessions=256,
+        max_pending_chunks=8,
+        max_concurrency=64,
+        batch_size=32,
+        batch_wait_ms=10,
+        final_workers=2,
+        min_chunk_ms=100,
+        warmup=True,
+        **asr_options,
+    ):
+        """
+        Args:
+            max_sessions: connections served at once, the others get an error
+            max_pending_chunks: audio frames buffered per connection
+            max_concurrency: blocking calls running at once, the streams
+                waiting for their online batch hold one each
+            batch_size: max streams of an online asr batch
+            batch_wait_ms: max wait of a chunk for the other streams
+            final_workers: threads of the offline asr and punctuation, the
+                finals of several connections run at once on the shared models
+            min_chunk_ms: shorter audio is buffered until more arrives
+            warmup: warm up the models before the first connection
+            asr_options: options of AsrAllInOne, e.g. hot_words
+        """
+        self.max_sessions = max_sessions
+        self.max_pending_chunks = max_pending_chunks
+        self.multiplexer = ParaformerOnlineMultiplexer(batch_size, batch_wait_ms)
+        self.runner = AsyncRunner(max_concurrency, max_concurrency)
+        self.final_executor = ThreadPoolExecutor(
+            final_workers, thread_name_prefix="final"
+        )
+        self.min_chunk_samples = max(int(min_chunk_ms * 16), MIN_CHUNK_SAMPLES)
+        self.warmup = warmup
+        self.asr_options = asr_options
+        self.sessions = 0
+        # sessions served, audio frames received, asr calls, finals sent
+        self.stats = {"sessions": 0, "frames": 0, "calls": 0, "finals": 0}
+        self._server = None
+
+    def new_session(self, on_final, hot_words=None) -> AsrAllInOne:
+        options = dict(self.asr_options)
+        if hot_words is not None:
+            options["hot_words"] = hot_words
+        return AsrAllInOne(
+            "2pass",
+            async_final=True,
+            on_final=on_final,
+            final_executor=self.final_executor,
+            asr_online_multiplexer=self.multiplexer,
+            **options,
+        )
+
+    async def start(self, host="127.0.0.1", port=10095, path=None):
+        """listen on host:port, or on the unix socket path"""
+        loop = asyncio.get_running_loop()
+        if self.warmup:
+            # the sessions are created on demand, the models are shared
+            session = await loop.run_in_executor(None, self.new_session, lambda _: None)
+            await loop.run_in_executor(None, session.warmup)
+        if path is None:
+            self._server = await asyncio.start_server(self.handle, host, port)
+        else:
+            self._server = await asyncio.start_unix_server(self.handle, path)
+        logger.info(f"stream server listening on {path or f'{host}:{port}'}")
+        return self._server
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.runner.close(wait=False)
+        self.final_executor.shutdown(wait=False)
+
+    async def handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        peer = writer.get_extra_info("peername") or "unix socket"
+        if self.sessions >= self.max_sessions:
+            writer.write(encode_json(ERROR, {"error": "server is busy"}))
+            await self._close_writer(writer)
+            return
+        self.sessions += 1
+        self.stats["sessions"] += 1
+        pending = asyncio.Queue(self.max_pending_chunks)
+        receiver = None
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != START:
+                raise ValueError("the first frame must be START")
+            options = json.loads(payload or b"{}")
+
+            def on_final(result):
+                # runs on a final thread, the loop may be gone at shutdown
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(self._send_final, writer, result)
+
+            session = await loop.run_in_executor(
+                None,
+                functools.partial(self.new_session, on_final, options.get("hot_words")),
+            )
+            logger.debug(f"session of {peer} started")
+            receiver = asyncio.ensure_future(self._receive(reader, pending))
+            await self._recognize(session, pending, writer)
+            await loop.run_in_executor(None, session.wait_finals)
+            writer.write(encode_json(RESULT, {"done": True}))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.debug(f"{peer} disconnected")
+        except Exception as e:
+            logger.warning(f"session of {peer} failed: {e}")
+            writer.write(encode_json(ERROR, {"error": str(e)}))
+        finally:
+            self.sessions -= 1
+            if receiver is not None:
+                receiver.cancel()
+            await self._close_writer(writer)
+
+    async def _receive(self, reader, pending: asyncio.Queue):
+        """put the frames in pending, waits while it is full"""
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind not in (AUDIO, END):
+                    raise ValueError(f"unexpected frame type {kind}")
+                await pending.put((kind, payload))
+                if kind == END:
+                    return
+        except Exception as e:
+            # the recognizer stops at the error
+            await pending.put((ERROR, e))
+
+    async def _recognize(self, session, pending: asyncio.Queue, writer):
+        samples = 0
+        buffered = []
+        while True:
+            # the frames which arrived while the last call ran go together
+            frames = [await pending.get()]
+            while not pending.empty() and frames[-1][0] == AUDIO:
+                frames.append(pending.get_nowait())
+            kind, payload = frames[-1]
+            if kind == ERROR:
+                raise payload
+            is_final = kind == END
+            self.stats["frames"] += len(frames)
+            buffered.extend(p for k, p in frames if k == AUDIO)
+            chunk = b"".join(buffered)
+            if len(chunk) < self.min_chunk_samples * 2 and not is_final:
+                continue
+            buffered = []
+            audio = AudioReader.read_pcm_byte(chunk)
+            samples += len(audio)
+            if len(audio) < MIN_CHUNK_SAMPLES:
+                # a short or empty end, padded with silence
+                audio = np.pad(audio, (0, MIN_CHUNK_SAMPLES - len(audio)))
+            result = await session.two_pass_asr_async(
+                audio, is_final, runner=self.runner
+            )
+            result["samples"] = samples
+            writer.write(encode_json(RESULT, result))
+            await writer.drain()
+            self.stats["calls"] += 1
+            if is_final:
+                return
+
+    def _send_final(self, writer, result: dict):
+        self.stats["finals"] += 1
+        if not writer.is_closing():
+            writer.write(encode_json(RESULT, result))
+
+    @staticmethod
+    async def _close_writer(writer):
+        try:
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+async def serve(host="127.0.0.1", port=10095, path=None, **options):
+    server = StreamServer(**options)
+    await server.start(host, port, path)
+    try:
+        await server.serve_forever()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="2pass streaming asr server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10095)
+    parser.add_argument("--unix", default=None, help="unix socket path")
+    parser.add_argument("--max-sessions", type=int, default=256)
+    parser.add_argument("--max-pending-chunks", type=int, default=8)
+    parser.add_argument("--max-concurrency", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--batch-wait-ms", type=float, default=10)
+    parser.add_argument("--final-workers", type=int, default=2)
+    parser.add_argument("--hot-words", default="")
+    args = parser.parse_args()
+    asyncio.run(
+        serve(
+            args.host,
+            args.port,
+            args.unix,
+            max_sessions=args.max_sessions,
+            max_pending_chunks=args.max_pending_chunks,
+            max_concurrency=args.max_concurrency,
+            batch_size=args.batch_size,
+            batch_wait_ms=args.batch_wait_ms,
+            final_workers=args.final_workers,
+            hot_words=args.hot_words,
+        )
+    )
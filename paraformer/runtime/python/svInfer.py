@@ -11,6 +11,8 @@ import numpy as np
 
 from paraformer.runtime.python.model.sv.campplus import Campplus
 from paraformer.runtime.python.model.sv.eres2net import Eres2net
+from paraformer.runtime.python.utils.singleton import release_on_collect
+from paraformer.runtime.python.utils.warmup import synthetic_audio, warmup_case
 
 model_names = {
     "cam++": (Campplus, "campplus.onnx"),
@@ -28,9 +30,29 @@ class SpeakerVerificationInfer:
         model_path = model_path or os.path.join(model_dir, model_names[model_name][1])
         self.threshold = threshold
         self.model = model_names[model_name][0](model_path, threshold)
+        release_on_collect(self, self.model)
 
     def register_speaker(self, emb: np.ndarray):
         self.model.register_speaker(emb)
 
     def recognize(self, waveform: Union[str, Path, bytes]):
         return self.model.recognize(waveform, self.threshold)
+
+    def embed(self, waveform: Union[str, Path, np.ndarray]) -> np.ndarray:
+        return self.model.embed(waveform)
+
+    def recognize_embedding(self, emb: np.ndarray):
+        return self.model.recognize_embedding(emb, self.threshold)
+
+    def warmup(self, durations=(1.0, 3.0)) -> dict:
+        """
+        embed synthetic audio of typical lengths, no speaker is registered
+
+        Return:
+            seconds of each length
+        """
+        timings = {}
+        for seconds in durations:
+            with warmup_case(timings, "sv", f"{seconds:g}s audio"):
+                self.embed(synthetic_audio(seconds))
+        return timings
@@ -7,21 +7,29 @@
 import logging
 import re
 import warnings
+from collections import OrderedDict
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, NamedTuple, Set, Union
 
-import jieba
 import numpy as np
 import yaml
 from onnxruntime import (
     GraphOptimizationLevel,
-    InferenceSession,
     SessionOptions,
     get_available_providers,
     get_device,
 )
 
+from paraformer.runtime.python.utils.modelCache import (
+    create_session,
+    merge_model_shards,
+)
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
+
+# output buffers kept per stream and session by run_with_binding, the decoder
+# outputs change shape with the token count of the chunk
+_MAX_BINDING_SIGNATURES = 4
 
 root_dir = Path(__file__).resolve().parent
 
@@ -133,10 +141,10 @@ class ONNXRuntimeError(Exception):
 
 
 class AsrOnlineBaseOrtInferRuntimeSession:
-    def __init__(self, model_file, device_id=-1, intra_op_num_threads=4):
+    def __init__(self, model_file, device_id=-1, intra_op_num_threads=None):
         device_id = str(device_id)
         sess_opt = SessionOptions()
-        sess_opt.intra_op_num_threads = intra_op_num_threads
+        planner.apply(sess_opt, "asr", intra_op_num_threads)
         sess_opt.log_severity_level = 4
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
@@ -163,17 +171,13 @@ class AsrOnlineBaseOrtInferRuntimeSession:
         EP_list.append((cpu_ep, cpu_provider_options))
 
         if isinstance(model_file, list):
-            merged_model_file = b""
-            for file in sorted(model_file):
-                with open(file, "rb") as onnx_file:
-                    merged_model_file += onnx_file.read()
-
-            model_file = merged_model_file
+            # split shards are merged once into a cached file
+            model_file = merge_model_shards(model_file)
         else:
             self._verify_model(model_file)
-        self.session = InferenceSession(
-            model_file, sess_options=sess_opt, providers=EP_list
-        )
+        self.session = create_session(model_file, sess_opt, EP_list)
+        self.input_names = [v.name for v in self.session.get_inputs()]
+        self.output_names = [v.name for v in self.session.get_outputs()]
 
         # delete binary of model file to save memory
         del model_file
@@ -190,22 +194,86 @@ class AsrOnlineBaseOrtInferRuntimeSession:
     def __call__(
         self, input_content: List[Union[np.ndarray, np.ndarray]]
     ) -> np.ndarray:
-        input_dict = dict(zip(self.get_input_names(), input_content))
+        input_dict = dict(zip(self.input_names, input_content))
         try:
-            result = self.session.run(self.get_output_names(), input_dict)
+            result = self.session.run(self.output_names, input_dict)
             return result
         except Exception as e:
             raise ONNXRuntimeError("ONNXRuntime inferece failed.") from e
 
+    def run_with_binding(
+        self,
+        input_content: List[np.ndarray],
+        buffers: dict,
+        max_signatures: int = _MAX_BINDING_SIGNATURES,
+    ) -> List[np.ndarray]:
+        """
+        run with io binding, the outputs are written into arrays preallocated
+        for each signature of input shapes and reused by the later calls
+
+        Args:
+            input_content: inputs in the order of the model inputs
+            buffers: io binding and output buffers of one stream, an empty
+                dict at first, do not share it between threads
+            max_signatures: output buffers kept, the least recently used
+                signatures are dropped and allocated again when they return
+
+        Returns:
+            the output buffers, overwritten by the next call with same shapes
+        """
+        binding = buffers.get("binding")
+        if binding is None:
+            binding = buffers["binding"] = self.session.io_binding()
+            buffers["outputs"] = OrderedDict()
+        for name, value in zip(self.input_names, input_content):
+            binding.bind_cpu_input(name, np.ascontiguousarray(value))
+
+        signature = tuple(value.shape for value in input_content)
+        cached = buffers["outputs"]
+        outputs = cached.get(signature)
+        try:
+            if outputs is not None and buffers.get("bound") == signature:
+                # the binding still points at the buffers of this signature
+                cached.move_to_end(signature)
+                self.session.run_with_iobinding(binding)
+                return outputs
+            if outputs is not None:
+                cached.move_to_end(signature)
+                for name, output in zip(self.output_names, outputs):
+                    binding.bind_output(
+                        name,
+                        "cpu",
+                        0,
+                        output.dtype.type,
+                        output.shape,
+                        output.ctypes.data,
+                    )
+                buffers["bound"] = signature
+                self.session.run_with_iobinding(binding)
+                return outputs
+
+            # first call with these shapes, let onnxruntime allocate the
+            # outputs and keep them as the buffers of the signature
+            for name in self.output_names:
+                binding.bind_output(name, "cpu")
+            buffers.pop("bound", None)
+            self.session.run_with_iobinding(binding)
+            outputs = cached[signature] = binding.copy_outputs_to_cpu()
+            while len(cached) > max_signatures:
+                cached.popitem(last=False)
+            return outputs
+        except Exception as e:
+            raise ONNXRuntimeError("ONNXRuntime inferece failed.") from e
+
     def get_input_names(
         self,
     ):
-        return [v.name for v in self.session.get_inputs()]
+        return self.input_names
 
     def get_output_names(
         self,
     ):
-        return [v.name for v in self.session.get_outputs()]
+        return self.output_names
 
     def get_character_list(self, key: str = "character"):
         return self.meta_dict[key].splitlines()
@@ -240,11 +308,11 @@ class AsrOnlineDecoderOrtInferRuntimeSession(AsrOnlineBaseOrtInferRuntimeSession
 @singleton
 class AsrOfflineOrtInferRuntimeSession:
     def __init__(
-        self, model_file, contextual_model, device_id=-1, intra_op_num_threads=4
+        self, model_file, contextual_model, device_id=-1, intra_op_num_threads=None
     ):
         sess_opt = SessionOptions()
         sess_opt.log_severity_level = 4
-        sess_opt.intra_op_num_threads = intra_op_num_threads
+        planner.apply(sess_opt, "asr", intra_op_num_threads)
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
 
@@ -270,24 +338,16 @@ class AsrOfflineOrtInferRuntimeSession:
         EP_list.append((cpu_ep, cpu_provider_options))
 
         if isinstance(model_file, list):
-            merged_model_file = b""
-            for file in sorted(model_file):
-                with open(file, "rb") as onnx_file:
-                    merged_model_file += onnx_file.read()
-
-            model_file = merged_model_file
+            # split shards are merged once into a cached file
+            model_file = merge_model_shards(model_file)
         else:
             self._verify_model(model_file)
-        self.session = InferenceSession(
-            model_file, sess_options=sess_opt, providers=EP_list
-        )
+        self.session = create_session(model_file, sess_opt, EP_list)
 
         # delete binary of model file to save memory
         del model_file
 
-        self.contextual_model = InferenceSession(
-            contextual_model, sess_options=sess_opt, providers=EP_list
-        )
+        self.contextual_model = create_session(contextual_model, sess_opt, EP_list)
 
         if device_id != "-1" and cuda_ep not in self.session.get_providers():
             logging.warning(
@@ -305,19 +365,27 @@ class AsrOfflineOrtInferRuntimeSession:
     ) -> np.ndarray:
         """
         Args:
-            feats: numpy.ndarray , [batch size , feats length, dim ] batch only support 1, dim is 560
-            feats_length:  numpy.ndarray, [feats length]
+            feats: numpy.ndarray , [batch size , feats length, dim ], dim is 560
+            feats_length:  numpy.ndarray, [batch size]
             bias_embed: numpy.ndarray, [batch size, max string length, dim]
-                batch only support 1, max string length is 10, dim is 512
+                max string length is 10, dim is 512
 
         Returns:
-
+            am scores, [batch size, token length, vocab size]
         """
+        return self.run(feats, feats_length, bias_embed)[0]
 
+    def run(
+        self,
+        feats: np.ndarray,
+        feats_length: np.ndarray,
+        bias_embed: np.ndarray = None,
+    ) -> List[np.ndarray]:
+        """all outputs of the model, am scores and the valid token numbers"""
         input_dict = dict(
             zip(self.get_asr_input_names(), (feats, feats_length, bias_embed))
         )
-        return self.session.run(None, input_dict)[0]
+        return self.session.run(None, input_dict)
 
     def get_hot_words_embedding(self):
         pass
@@ -431,6 +499,9 @@ def join_chinese_and_english(input_list):
 
 
 def code_mix_split_words_jieba(seg_dict_file: str):
+    # jieba takes hundreds of milliseconds to import, only load it when needed
+    import jieba
+
     jieba.load_userdict(seg_dict_file)
 
     def _fn(text: str):
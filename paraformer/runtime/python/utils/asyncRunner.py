@@ -0,0 +1,110 @@
+# -*- coding:utf-8 -*-
+# @FileName  :asyncRunner.py
+# @Time      :2026/10/18 20:00
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import asyncio
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.threadPlanner import available_cores
+
+
+class AsyncRunner:
+    """
+    runs the blocking calls of many streams from an event loop on a thread
+    pool. the calls of one stream run one by one in the order they were
+    awaited, and at most max_concurrency calls run at once, the others wait
+    on the event loop without holding a thread.
+    """
+
+    def __init__(self, max_workers: int = None, max_concurrency: int = None):
+        """
+        Args:
+            max_workers: threads of the pool, defaults to the cores of the
+                process, onnxruntime releases the gil while it runs
+            max_concurrency: calls running at once, defaults to max_workers
+        """
+        self.max_workers = max_workers or available_cores()
+        self.max_concurrency = max_concurrency or self.max_workers
+        self._executor = None
+        self._lock = threading.Lock()
+        # per event loop semaphore and per stream lock, made in their loop
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._stream_locks = weakref.WeakKeyDictionary()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self.max_workers, thread_name_prefix="paraformer-async"
+                )
+            return self._executor
+
+    async def run(self, stream, func, *args, **kwargs):
+        """
+        await func(*args, **kwargs) of stream on the pool. a cancelled call
+        still runs to its end, the next call of the stream waits for it
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        stream_lock = self._stream_locks.get(stream)
+        if stream_lock is None:
+            stream_lock = self._stream_locks[stream] = asyncio.Lock()
+
+        await stream_lock.acquire()
+        try:
+            await semaphore.acquire()
+        except BaseException:
+            stream_lock.release()
+            raise
+        try:
+            future = loop.run_in_executor(
+                self.executor, functools.partial(func, *args, **kwargs)
+            )
+        except BaseException:
+            semaphore.release()
+            stream_lock.release()
+            raise
+
+        def release(_):
+            semaphore.release()
+            stream_lock.release()
+
+        future.add_done_callback(release)
+        return await asyncio.shield(future)
+
+    def close(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+runner = AsyncRunner()
+
+
+def configure_async(max_workers: int = None, max_concurrency: int = None):
+    """
+    replace the default runner of the async methods, call it before the
+    first of them
+    """
+    global runner
+    previous = runner
+    runner = AsyncRunner(max_workers, max_concurrency)
+    previous.close(wait=False)
+    logger.info(
+        f"async runner with {runner.max_workers} threads, "
+        f"{runner.max_concurrency} concurrent calls"
+    )
+    return runner
+
+
+def get_runner() -> AsyncRunner:
+    return runner
@@ -4,12 +4,17 @@
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
 
-import array
+import mmap
+import os
 import struct
 import time
+from typing import Iterator, Tuple, Union
 
 import numpy as np
 
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
 
 class AudioReader:
     """
@@ -43,47 +48,106 @@ class AudioReader:
         return nframes
 
     @staticmethod
-    def read_wav_bytes(data: bytes):
+    def parse_wav_header(
+        data: Union[bytes, bytearray, memoryview, mmap.mmap],
+    ) -> Tuple[int, int, int, int]:
+        """
+        walk the RIFF chunks of a pcm_s16le wav
+        :param data: wav file content
+        :return: sample rate, channels, offset and length in bytes of the data chunk
+        """
+        data = memoryview(data)
+        if len(data) < 12 or data[:4] != b"RIFF" or data[8:12] != b"WAVE":
+            raise ValueError("not a RIFF WAVE file")
+
+        fmt = None
+        offset = 12
+        while offset + 8 <= len(data):
+            chunk_id, chunk_size = struct.unpack_from("<4sL", data, offset)
+            offset += 8
+            if chunk_id == b"fmt ":
+                (
+                    audio_format,
+                    channels,
+                    sample_rate,
+                    _,
+                    _,
+                    sample_bit,
+                ) = struct.unpack_from("<HHLLHH", data, offset)
+                if audio_format == WAVE_FORMAT_EXTENSIBLE:
+                    # the sub format guid starts with the format code
+                    (audio_format,) = struct.unpack_from("<H", data, offset + 24)
+                if audio_format != WAVE_FORMAT_PCM or sample_bit != 16:
+                    raise ValueError(
+                        f"only support pcm_s16le wav, got format {audio_format} "
+                        f"with {sample_bit} bits"
+                    )
+                fmt = sample_rate, channels
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError("data chunk comes before fmt chunk")
+                # streamed wav files may leave the data size unset
+                chunk_size = min(chunk_size, len(data) - offset)
+                return fmt[0], fmt[1], offset, chunk_size
+            # chunks are word aligned
+            offset += chunk_size + (chunk_size & 1)
+        raise ValueError("no data chunk found in wav")
+
+    @staticmethod
+    def read_wav_bytes(data: Union[bytes, bytearray, memoryview]):
         """
         convert bytes into array of pcm_s16le data
-        :param data: PCM format bytes
+        :param data: wav file content
         :return:
         """
-
-        # header of wav file
-        info = data[:44]
-        frames = data[44:]
-        (
-            name,
-            data_lengths,
-            _,
-            _,
-            _,
-            _,
-            channels,
-            sample_rate,
-            bit_rate,
-            block_length,
-            sample_bit,
-            _,
-            pcm_length,
-        ) = struct.unpack_from("<4sL4s4sLHHLLHH4sL", info)
-        # shortArray each element is 16bit
-        data = AudioReader.read_pcm_byte(frames)
-        return data, sample_rate
+        sample_rate, channels, offset, length = AudioReader.parse_wav_header(data)
+        frames = memoryview(data)[offset : offset + length]
+        if channels == 1:
+            return AudioReader.read_pcm_byte(frames), sample_rate
+        pcm = AudioReader.read_pcm_int16(frames)
+        pcm = pcm[: len(pcm) // channels * channels].reshape(-1, channels)
+        return AudioReader.downmix(pcm), sample_rate
 
     @staticmethod
     def read_wav_file(audio_path: str):
-        with open(audio_path, "rb") as f:
-            data = f.read()
-        return AudioReader.read_wav_bytes(data)
+        with WavReader(audio_path) as reader:
+            return reader[:], reader.sample_rate
 
     @staticmethod
-    def read_pcm_byte(data: bytes):
-        short_array = array.array("h")
-        short_array.frombytes(data)
-        data = np.array(short_array, dtype="float16") / (1 << 15)
-        return data
+    def downmix(pcm: np.ndarray) -> np.ndarray:
+        """
+        average int16 pcm of shape [samples, channels] into float32 mono samples
+        """
+        return np.true_divide(
+            pcm.sum(axis=1, dtype=np.float32), pcm.shape[1] << 15, dtype=np.float32
+        )
+
+    @staticmethod
+    def iter_blocks(audio, block_size: int = 9600) -> Iterator[np.ndarray]:
+        """
+        fixed-size float32 blocks of an array or a WavReader, the last one may be
+        shorter
+        """
+        for offset in range(0, len(audio), block_size):
+            yield np.asarray(audio[offset : offset + block_size], dtype=np.float32)
+
+    @staticmethod
+    def read_pcm_int16(data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """
+        view pcm_s16le bytes as int16 samples without copying,
+        a trailing odd byte is dropped
+        """
+        data = memoryview(data).cast("B")
+        return np.frombuffer(data[: len(data) // 2 * 2], dtype="<i2")
+
+    @staticmethod
+    def read_pcm_byte(data: Union[bytes, bytearray, memoryview]) -> np.ndarray:
+        """
+        convert pcm_s16le bytes into float32 samples in [-1, 1)
+        """
+        return np.true_divide(
+            AudioReader.read_pcm_int16(data), 1 << 15, dtype=np.float32
+        )
 
     @staticmethod
     def export_pcm_to_wav(
@@ -119,3 +183,157 @@ class AudioReader:
             f.write(head)
             f.write(data)
         return file_path
+
+
+class WavReader:
+    """
+    memory-mapped pcm_s16le wav file, samples are converted to float32 only when
+    they are sliced, so long recordings are read in bounded memory
+
+    with WavReader("long.wav") as reader:
+        for block in reader.blocks(9600):
+            ...
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            self.sample_rate,
+            self.channels,
+            offset,
+            length,
+        ) = AudioReader.parse_wav_header(self._mmap)
+        self.pcm = np.frombuffer(
+            self._mmap,
+            dtype="<i2",
+            count=length // (2 * self.channels) * self.channels,
+            offset=offset,
+        ).reshape(-1, self.channels)
+
+    def __len__(self) -> int:
+        return self.pcm.shape[0]
+
+    def __getitem__(self, item: slice) -> np.ndarray:
+        pcm = self.pcm[item]
+        if self.channels == 1:
+            return np.true_divide(pcm[:, 0], 1 << 15, dtype=np.float32)
+        return AudioReader.downmix(pcm)
+
+    def blocks(self, block_size: int = 9600) -> Iterator[np.ndarray]:
+        return AudioReader.iter_blocks(self, block_size)
+
+    @property
+    def duration(self) -> float:
+        return len(self) / self.sample_rate
+
+    def close(self):
+        if self._mmap is not None:
+            self.pcm = None
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class AudioHistory:
+    """
+    the last samples of a stream in a float32 buffer, indexed by absolute
+    sample offset. at most `capacity` samples are kept, the older ones are
+    dropped unless they are pinned, e.g. from the start of a speech segment.
+    new samples are appended behind the kept ones, the kept samples move to
+    the front of the buffer only when it is full, and segments are views.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buffer = np.empty(0, dtype=np.float32)
+        # absolute index of buffer[0], of the first kept sample, of the end
+        self.offset = 0
+        self.begin = 0
+        self.end = 0
+        self.pinned = None
+
+    def __len__(self) -> int:
+        return self.end - self.begin
+
+    def append(self, samples: np.ndarray):
+        """append float32 samples in [-1, 1) or int16 pcm"""
+        samples = np.asarray(samples).reshape(-1)
+        num_samples = samples.shape[0]
+        # drop the samples beyond the capacity, a chunk itself is always kept
+        begin = max(self.begin, min(self.end, self.end + num_samples - self.capacity))
+        if self.pinned is not None:
+            begin = min(begin, max(self.pinned, self.begin))
+        self.begin = begin
+        keep_len = self.end - self.begin
+        if self.end - self.offset + num_samples > self.buffer.shape[0]:
+            needed = keep_len + num_samples
+            if 2 * needed > self.buffer.shape[0] and (
+                needed > self.buffer.shape[0]
+                or self.buffer.shape[0] < 2 * self.capacity
+            ):
+                # half of the buffer stays free after the kept samples moved to
+                # the front, it grows up to twice the capacity
+                size = max(needed, min(2 * needed, 2 * self.capacity))
+                buffer = np.empty(size, dtype=np.float32)
+            else:
+                buffer = self.buffer
+            if keep_len:
+                buffer[:keep_len] = self.view(self.begin, self.end)
+            self.buffer = buffer
+            self.offset = self.begin
+        beg = self.end - self.offset
+        out = self.buffer[beg : beg + num_samples]
+        if samples.dtype == np.int16:
+            np.true_divide(samples, 1 << 15, out=out)
+        else:
+            out[:] = samples
+        self.end += num_samples
+
+    def view(self, beg: int, end: int) -> np.ndarray:
+        """
+        kept samples [beg, end) clipped to the kept range, a view valid until
+        the next append
+        """
+        beg = min(max(beg, self.begin), self.end)
+        end = min(max(end, beg), self.end)
+        return self.buffer[beg - self.offset : end - self.offset]
+
+    def discard_before(self, index: int):
+        """drop the samples before index"""
+        self.begin = min(max(self.begin, index), self.end)
+        if self.pinned is not None and self.pinned < self.begin:
+            self.pinned = self.begin
+
+    def pin(self, index: int = None):
+        """keep the samples from index until unpinned, None unpins"""
+        self.pinned = index
+
+    def reset(self):
+        """forget the samples, the buffer is kept for the next stream"""
+        self.offset = 0
+        self.begin = 0
+        self.end = 0
+        self.pinned = None
+
+    def nbytes(self) -> int:
+        return self.buffer.nbytes
+
+    def state_dict(self) -> dict:
+        return {
+            "begin": self.begin,
+            "pinned": self.pinned,
+            "samples": self.view(self.begin, self.end).copy(),
+        }
+
+    def load_state_dict(self, state: dict):
+        self.reset()
+        self.offset = self.begin = self.end = state["begin"]
+        self.append(state["samples"])
+        self.pinned = state["pinned"]
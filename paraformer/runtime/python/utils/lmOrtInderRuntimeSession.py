@@ -9,21 +9,22 @@ from pathlib import Path
 import numpy as np
 from onnxruntime import (
     GraphOptimizationLevel,
-    InferenceSession,
     SessionOptions,
     get_available_providers,
     get_device,
 )
 
+from paraformer.runtime.python.utils.modelCache import create_session
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
 
 
 @singleton
 class LMOrtInferRuntimeSession:
-    def __init__(self, model_file, device_id=-1, intra_op_num_threads=4):
+    def __init__(self, model_file, device_id=-1, intra_op_num_threads=None):
         sess_opt = SessionOptions()
         sess_opt.log_severity_level = 4
-        sess_opt.intra_op_num_threads = intra_op_num_threads
+        planner.apply(sess_opt, "lm", intra_op_num_threads)
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
 
@@ -49,9 +50,7 @@ class LMOrtInferRuntimeSession:
         EP_list.append((cpu_ep, cpu_provider_options))
 
         self._verify_model(model_file)
-        self.session = InferenceSession(
-            model_file, sess_options=sess_opt, providers=EP_list
-        )
+        self.session = create_session(model_file, sess_opt, EP_list)
 
         if device_id != "-1" and cuda_ep not in self.session.get_providers():
             logging.warning(
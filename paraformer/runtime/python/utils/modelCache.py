@@ -0,0 +1,376 @@
+# -*- coding:utf-8 -*-
+# @FileName  :modelCache.py
+# @Time      :2026/10/18 13:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import functools
+import glob
+import hashlib
+import os
+import platform
+import tempfile
+from pathlib import Path
+from typing import List, Union
+
+import onnxruntime
+from onnxruntime import GraphOptimizationLevel, InferenceSession, SessionOptions
+
+from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.threadPlanner import planner
+
+# set PARAFORMER_CACHE_DIR to move the cache, e.g. to a volume shared by workers,
+# the optimized graphs are keyed by the cpu features of each host
+_DEFAULT_CACHE_DIR = os.path.join(Path.home(), ".cache", "paraformer")
+_COPY_BUFFER_SIZE = 1 << 20
+# set PARAFORMER_DISABLE_SESSION_CACHE=1 to always optimize the graph at startup
+_SESSION_CACHE_ENABLED = os.getenv("PARAFORMER_DISABLE_SESSION_CACHE", "0") != "1"
+# optimized graphs kept in the cache, the least recently used are removed
+_MAX_OPTIMIZED_MODELS = int(os.getenv("PARAFORMER_SESSION_CACHE_SIZE", "32"))
+# merged models kept in the cache, each is as large as the model itself
+_MAX_MERGED_MODELS = int(os.getenv("PARAFORMER_MERGED_CACHE_SIZE", "8"))
+# every session option except the logging ones may change the optimized graph
+_KEYED_OPTIONS = (
+    "graph_optimization_level",
+    "enable_cpu_mem_arena",
+    "enable_mem_pattern",
+    "enable_mem_reuse",
+    "execution_mode",
+    "execution_order",
+    "intra_op_num_threads",
+    "inter_op_num_threads",
+    "use_per_session_threads",
+    "use_deterministic_compute",
+)
+_KEYED_CONFIG_ENTRIES = ("session.intra_op.allow_spinning",)
+
+
+def get_cache_dir() -> str:
+    return os.getenv("PARAFORMER_CACHE_DIR", _DEFAULT_CACHE_DIR)
+
+
+def shards_fingerprint(shard_files: List[Union[str, os.PathLike]]) -> str:
+    """cheap key of the shards from their names, sizes and mtimes"""
+    digest = hashlib.sha256()
+    for file in shard_files:
+        stat = os.stat(file)
+        digest.update(
+            f"{os.path.abspath(file)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode()
+        )
+    return digest.hexdigest()
+
+
+def file_sha256(path: Union[str, os.PathLike]) -> str:
+    digest = hashlib.sha256()
+    buffer = bytearray(_COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def find_model_shards(
+    model_dir: Union[str, os.PathLike], pattern: str = "model_quant_*.onnx"
+) -> List[str]:
+    """the sorted shards of the split model in model_dir"""
+    shard_files = sorted(glob.glob(os.path.join(model_dir, pattern)))
+    if len(shard_files) == 0:
+        raise FileNotFoundError(f"no model shards {pattern} in {model_dir}")
+    return shard_files
+
+
+def read_model_shards(shard_files: List[Union[str, os.PathLike]]) -> bytes:
+    """concatenate the shards in memory with one preallocated buffer"""
+    shard_files = sorted(shard_files)
+    merged = bytearray(sum(os.path.getsize(file) for file in shard_files))
+    view = memoryview(merged)
+    offset = 0
+    for file in shard_files:
+        with open(file, "rb", buffering=0) as f:
+            while offset < len(merged):
+                n = f.readinto(view[offset:])
+                if not n:
+                    break
+                offset += n
+    if offset != len(merged):
+        raise IOError("model shards changed while being read")
+    return bytes(merged)
+
+
+def _write_merged_model(shard_files, cache_dir, prefix, total_size) -> str:
+    """stream the shards into a preallocated temporary file, return its final name"""
+    digest = hashlib.sha256()
+    buffer = bytearray(_COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=prefix, suffix=".tmp")
+    try:
+        with open(fd, "wb", buffering=0) as out:
+            if hasattr(os, "posix_fallocate") and total_size > 0:
+                os.posix_fallocate(out.fileno(), 0, total_size)
+            else:
+                out.truncate(total_size)
+            for file in shard_files:
+                with open(file, "rb", buffering=0) as f:
+                    while True:
+                        n = f.readinto(buffer)
+                        if not n:
+                            break
+                        digest.update(view[:n])
+                        out.write(view[:n])
+            written = out.tell()
+            os.fsync(out.fileno())
+
+        content_hash = digest.hexdigest()
+        if written != total_size or file_sha256(tmp_path) != content_hash:
+            raise IOError(f"failed to verify merged model {tmp_path}")
+
+        merged_path = os.path.join(cache_dir, f"{prefix}{content_hash[:32]}.onnx")
+        # atomic, so concurrent workers merging the same shards do not conflict
+        os.replace(tmp_path, merged_path)
+        return merged_path
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def merge_model_shards(
+    shard_files: List[Union[str, os.PathLike]], cache_dir: str = None
+) -> Union[str, bytes]:
+    """
+    merge the split onnx shards into a file of the cache directory named by
+    the hash of its content, the file is reused as long as the shards do not
+    change. falls back to merging in memory if the cache is not writable.
+    Args:
+        shard_files: the shards, merged in sorted order
+        cache_dir: defaults to $PARAFORMER_CACHE_DIR or ~/.cache/paraformer
+
+    Returns:
+        path of the merged model, or its bytes if it could not be cached
+    """
+    if len(shard_files) == 0:
+        raise FileNotFoundError("no model shards to merge")
+    shard_files = sorted(shard_files)
+    cache_dir = os.path.join(cache_dir or get_cache_dir(), "merged")
+    prefix = f"{Path(shard_files[0]).stem}-"
+    total_size = sum(os.path.getsize(file) for file in shard_files)
+    ref_path = os.path.join(cache_dir, f"{shards_fingerprint(shard_files)}.ref")
+
+    try:
+        with open(ref_path, "r", encoding="utf-8") as f:
+            merged_path = os.path.join(cache_dir, f.read().strip())
+        if os.path.getsize(merged_path) == total_size:
+            logger.info(f"load merged model from cache {merged_path}")
+            touch(merged_path, ref_path)
+            return merged_path
+    except OSError:
+        pass
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        merged_path = _write_merged_model(shard_files, cache_dir, prefix, total_size)
+        fd, tmp_ref = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with open(fd, "w", encoding="utf-8") as f:
+            f.write(os.path.basename(merged_path))
+        os.replace(tmp_ref, ref_path)
+    except OSError as e:
+        logger.warning(f"can not cache the merged model in {cache_dir}: {e}")
+        return read_model_shards(shard_files)
+
+    logger.info(f"merged {len(shard_files)} model shards into {merged_path}")
+    # merged files of changed shards and their refs are never read again
+    prune_cache(cache_dir, ".onnx", _MAX_MERGED_MODELS)
+    prune_cache(cache_dir, ".ref", _MAX_MERGED_MODELS)
+    return merged_path
+
+
+def model_sha256(model_path: Union[str, os.PathLike], cache_dir: str) -> str:
+    """content hash of the model, memoized by the fingerprint of the file"""
+    ref_path = os.path.join(cache_dir, f"{shards_fingerprint([model_path])}.sha256")
+    try:
+        with open(ref_path, "r", encoding="utf-8") as f:
+            content_hash = f.read().strip()
+        touch(ref_path)
+        return content_hash
+    except OSError:
+        pass
+    content_hash = file_sha256(model_path)
+    fd, tmp_ref = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with open(fd, "w", encoding="utf-8") as f:
+        f.write(content_hash)
+    os.replace(tmp_ref, ref_path)
+    return content_hash
+
+
+@functools.lru_cache(maxsize=None)
+def cpu_signature() -> str:
+    """
+    the instruction sets of the cpu, graphs optimized with ORT_ENABLE_ALL
+    (e.g. NchwcTransformer) only run on hosts with the same ones
+    """
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                # x86 lists flags, arm lists features
+                if name.strip() in ("flags", "Features"):
+                    return " ".join(sorted(value.split()))
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def session_options_key(sess_opt: SessionOptions) -> str:
+    values = [f"{name}={getattr(sess_opt, name)}" for name in _KEYED_OPTIONS]
+    for entry in _KEYED_CONFIG_ENTRIES:
+        try:
+            values.append(f"{entry}={sess_opt.get_session_config_entry(entry)}")
+        except RuntimeError:
+            pass
+    return ",".join(values)
+
+
+def optimized_model_key(content_hash: str, sess_opt: SessionOptions, providers) -> str:
+    """the optimized graph depends on the model, onnxruntime, options and hardware"""
+    provider_names = [p[0] if isinstance(p, tuple) else p for p in providers]
+    key = "\n".join(
+        [
+            content_hash,
+            onnxruntime.__version__,
+            session_options_key(sess_opt),
+            ",".join(provider_names),
+            onnxruntime.get_device(),
+            platform.machine(),
+            cpu_signature(),
+        ]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def touch(*paths):
+    """mark cache entries as used, the mtime orders them for prune_cache"""
+    for path in paths:
+        try:
+            os.utime(path)
+        except OSError:
+            # read only cache, or removed by another worker
+            pass
+
+
+def prune_cache(cache_dir: str, suffix: str, max_entries: int):
+    """remove the least recently used files ending with suffix beyond max_entries"""
+    entries = []
+    try:
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(suffix):
+                entries.append((entry.stat().st_mtime, entry.path))
+    except OSError:
+        return
+    entries.sort(reverse=True)
+    for _, path in entries[max_entries:]:
+        try:
+            os.remove(path)
+            logger.info(f"removed {path} from cache")
+        except OSError:
+            # removed by another worker, or still in use on windows
+            pass
+
+
+def create_session(
+    model: Union[str, os.PathLike, bytes],
+    sess_opt: SessionOptions = None,
+    providers=None,
+    cache_dir: str = None,
+    use_tuned_profile: bool = True,
+) -> InferenceSession:
+    """
+    create an InferenceSession, the graph optimized at the first start is
+    saved to the cache directory and loaded without optimizing on later
+    starts. falls back to an uncached session if the cache is not usable.
+    Args:
+        model: onnx file path or model bytes
+        sess_opt: left unchanged after the call
+        providers: execution providers passed to onnxruntime
+        cache_dir: defaults to $PARAFORMER_CACHE_DIR or ~/.cache/paraformer
+        use_tuned_profile: apply the options saved by the session tuner
+    """
+    sess_opt = sess_opt or SessionOptions()
+    providers = providers or ["CPUExecutionProvider"]
+    if isinstance(model, os.PathLike):
+        model = str(model)
+    if use_tuned_profile and isinstance(model, str):
+        from paraformer.runtime.python.utils.sessionTuner import (
+            apply_profile,
+            tuned_profile,
+        )
+
+        profile = tuned_profile(model, providers, sess_opt)
+        if profile is not None:
+            logger.info(f"load {os.path.basename(model)} with the tuned profile")
+            sess_opt = apply_profile(sess_opt, profile)
+    sess_opt = planner.conform(sess_opt)
+    if (
+        not _SESSION_CACHE_ENABLED
+        or sess_opt.graph_optimization_level == GraphOptimizationLevel.ORT_DISABLE_ALL
+    ):
+        return InferenceSession(model, sess_options=sess_opt, providers=providers)
+
+    cache_dir = os.path.join(cache_dir or get_cache_dir(), "optimized")
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        if isinstance(model, (bytes, bytearray)):
+            content_hash = hashlib.sha256(model).hexdigest()
+        else:
+            content_hash = model_sha256(model, cache_dir)
+    except OSError as e:
+        logger.warning(f"can not use the session cache in {cache_dir}: {e}")
+        return InferenceSession(model, sess_options=sess_opt, providers=providers)
+
+    optimized_path = os.path.join(
+        cache_dir, f"{optimized_model_key(content_hash, sess_opt, providers)}.onnx"
+    )
+    level = sess_opt.graph_optimization_level
+    if os.path.exists(optimized_path):
+        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_DISABLE_ALL
+        try:
+            session = InferenceSession(
+                optimized_path, sess_options=sess_opt, providers=providers
+            )
+            logger.info(f"load optimized model from cache {optimized_path}")
+            touch(optimized_path)
+            return session
+        except Exception as e:
+            logger.warning(f"drop broken optimized model {optimized_path}: {e}")
+            try:
+                os.remove(optimized_path)
+            except FileNotFoundError:
+                # another worker dropped it first
+                pass
+        finally:
+            sess_opt.graph_optimization_level = level
+
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix=".onnx.tmp")
+    os.close(fd)
+    sess_opt.optimized_model_filepath = tmp_path
+    try:
+        session = InferenceSession(model, sess_options=sess_opt, providers=providers)
+        if os.path.getsize(tmp_path) > 0:
+            os.replace(tmp_path, optimized_path)
+            logger.info(f"saved optimized model to cache {optimized_path}")
+            prune_cache(cache_dir, ".onnx", _MAX_OPTIMIZED_MODELS)
+            prune_cache(cache_dir, ".sha256", _MAX_OPTIMIZED_MODELS)
+    except Exception as e:
+        # e.g. models too large to be saved without external data
+        logger.warning(f"can not save the optimized model: {e}")
+        session = None
+    finally:
+        sess_opt.optimized_model_filepath = ""
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    if session is None:
+        session = InferenceSession(model, sess_options=sess_opt, providers=providers)
+    return session
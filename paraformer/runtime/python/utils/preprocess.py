@@ -4,6 +4,7 @@
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
 import copy
+import threading
 from typing import List, Tuple
 
 import kaldi_native_fbank as knf
@@ -44,26 +45,41 @@ class WavFrontend:
 
         if self.cmvn_file:
             self.cmvn = self.load_cmvn()
+            self.cmvn_f32 = self.cmvn.astype(np.float32)
         self.fbank_fn = None
         self.fbank_beg_idx = 0
         self.reset_status()
 
+    @staticmethod
+    def fbank_samples(waveform: np.ndarray) -> list:
+        """
+        samples in the int16 range as knf expects, its binding copies sequences
+        element-wise so a list is faster than an ndarray
+        """
+        if waveform.dtype == np.int16:
+            return waveform.tolist()
+        return (waveform * (1 << 15)).tolist()
+
     def fbank(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
-        self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
-        frames = self.fbank_fn.num_frames_ready
+        """fbank of a whole utterance, safe to call from several threads"""
+        # a new extractor per call, the one of fbank_online belongs to a stream
+        fbank_fn = knf.OnlineFbank(self.opts)
+        fbank_fn.accept_waveform(
+            self.opts.frame_opts.samp_freq, self.fbank_samples(waveform)
+        )
+        frames = fbank_fn.num_frames_ready
         mat = np.empty([frames, self.opts.mel_opts.num_bins])
         for i in range(frames):
-            mat[i, :] = self.fbank_fn.get_frame(i)
+            mat[i, :] = fbank_fn.get_frame(i)
         feat = mat.astype(np.float32)
         feat_len = np.array(mat.shape[0]).astype(np.int32)
         return feat, feat_len
 
     def fbank_online(self, waveform: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        waveform = waveform * (1 << 15)
         # self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.fbank_fn.accept_waveform(self.opts.frame_opts.samp_freq, waveform.tolist())
+        self.fbank_fn.accept_waveform(
+            self.opts.frame_opts.samp_freq, self.fbank_samples(waveform)
+        )
         frames = self.fbank_fn.num_frames_ready
         mat = np.empty([frames, self.opts.mel_opts.num_bins])
         for i in range(self.fbank_beg_idx, frames):
@@ -77,50 +93,70 @@ class WavFrontend:
         self.fbank_fn = knf.OnlineFbank(self.opts)
         self.fbank_beg_idx = 0
 
-    def lfr_cmvn(self, feat: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        if self.lfr_m != 1 or self.lfr_n != 1:
-            feat = self.apply_lfr(feat, self.lfr_m, self.lfr_n)
-
-        if self.cmvn_file:
-            feat = self.apply_cmvn(feat)
-
+    def lfr_cmvn(
+        self, feat: np.ndarray, out: np.ndarray = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        T_lfr = int(np.ceil(feat.shape[0] / self.lfr_n))
+        feat = self.apply_lfr_cmvn(feat, T_lfr, (self.lfr_m - 1) // 2, out)
         feat_len = np.array(feat.shape[0]).astype(np.int32)
         return feat, feat_len
 
     @staticmethod
-    def apply_lfr(inputs: np.ndarray, lfr_m: int, lfr_n: int) -> np.ndarray:
-        LFR_inputs = []
-
-        T = inputs.shape[0]
-        T_lfr = int(np.ceil(T / lfr_n))
-        left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
-        inputs = np.vstack((left_padding, inputs))
-        T = T + (lfr_m - 1) // 2
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append(
-                    (inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1)
-                )
-            else:
-                # process last LFR frame
-                num_padding = lfr_m - (T - i * lfr_n)
-                frame = inputs[i * lfr_n :].reshape(-1)
-                for _ in range(num_padding):
-                    frame = np.hstack((frame, inputs[-1]))
+    def lfr_windows(
+        inputs: np.ndarray, lfr_m: int, lfr_n: int, T_lfr: int, left_padding: int
+    ) -> np.ndarray:
+        """
+        strided [T_lfr, lfr_m * dim] view of the lfr frames, the edges are padded
+        with the first and the last frame
+        """
+        T, dim = inputs.shape
+        right_padding = max(0, (T_lfr - 1) * lfr_n + lfr_m - left_padding - T)
+        if T and (left_padding or right_padding):
+            inputs = np.pad(inputs, ((left_padding, right_padding), (0, 0)), "edge")
+        inputs = np.ascontiguousarray(inputs, dtype=np.float32)
+        return np.lib.stride_tricks.as_strided(
+            inputs,
+            shape=(max(T_lfr, 0), lfr_m * dim),
+            strides=(lfr_n * dim * inputs.itemsize, inputs.itemsize),
+            writeable=False,
+        )
 
-                LFR_inputs.append(frame)
-        LFR_outputs = np.vstack(LFR_inputs).astype(np.float32)
-        return LFR_outputs
+    def apply_lfr_cmvn(
+        self,
+        inputs: np.ndarray,
+        T_lfr: int,
+        left_padding: int,
+        out: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Apply lfr and cmvn in one pass in float32, write into out if given
+        """
+        windows = self.lfr_windows(inputs, self.lfr_m, self.lfr_n, T_lfr, left_padding)
+        if out is None:
+            out = np.empty(windows.shape, dtype=np.float32)
+        else:
+            out = out[: windows.shape[0]]
+        if self.cmvn_file:
+            dim = windows.shape[1]
+            np.add(windows, self.cmvn_f32[0, :dim], out=out)
+            np.multiply(out, self.cmvn_f32[1, :dim], out=out)
+        else:
+            out[...] = windows
+        return out
+
+    @staticmethod
+    def apply_lfr(inputs: np.ndarray, lfr_m: int, lfr_n: int) -> np.ndarray:
+        T_lfr = int(np.ceil(inputs.shape[0] / lfr_n))
+        return WavFrontend.lfr_windows(
+            inputs, lfr_m, lfr_n, T_lfr, (lfr_m - 1) // 2
+        ).copy()
 
     def apply_cmvn(self, inputs: np.ndarray) -> np.ndarray:
         """
         Apply CMVN with mvn data
         """
-        frame, dim = inputs.shape
-        means = np.tile(self.cmvn[0:1, :dim], (frame, 1))
-        vars = np.tile(self.cmvn[1:2, :dim], (frame, 1))
-        inputs = (inputs + means) * vars
-        return inputs
+        dim = inputs.shape[1]
+        return (inputs + self.cmvn_f32[0, :dim]) * self.cmvn_f32[1, :dim]
 
     def load_cmvn(
         self,
@@ -152,9 +188,19 @@ class WavFrontend:
 
 
 class WavFrontendOnline(WavFrontend):
+    """Streaming frontend, one instance per stream.
+
+    The fbank extractor lives as long as the stream and is fed only the new
+    samples. The samples which are still needed (input cache and reserve
+    waveform) and the fbank frames which are still needed (lfr splice cache)
+    are kept at the front of two reused buffers, new data is appended behind
+    them instead of concatenated.
+    """
+
+    min_buffer_frames = 128
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        # self.fbank_fn = knf.OnlineFbank(self.opts)
         # add variables
         self.frame_sample_length = int(
             self.opts.frame_opts.frame_length_ms * self.opts.frame_opts.samp_freq / 1000
@@ -162,10 +208,105 @@ class WavFrontendOnline(WavFrontend):
         self.frame_shift_sample_length = int(
             self.opts.frame_opts.frame_shift_ms * self.opts.frame_opts.samp_freq / 1000
         )
-        self.waveform = None
-        self.reserve_waveforms = None
-        self.input_cache = None
+        self.waveforms = None
         self.lfr_splice_cache = []
+        # samples buffer, absolute sample index of its first column, number of
+        # samples received, start of the input cache and of the reserve waveform
+        self.wave_buffer = None
+        self.wave_offset = 0
+        self.wave_end = 0
+        self.input_cache_beg = 0
+        self.reserve_beg = None
+        # fbank frames buffer, the first `splice_len` frames are the lfr splice cache
+        self.feat_buffer = None
+        self.splice_len = 0
+
+    @property
+    def input_cache(self):
+        if self.wave_buffer is None:
+            return None
+        return self.wave_view(self.input_cache_beg, self.wave_end)
+
+    @property
+    def reserve_waveforms(self):
+        if self.reserve_beg is None:
+            return None
+        return self.wave_view(self.reserve_beg, self.input_cache_beg)
+
+    def wave_view(self, beg: int, end: int) -> np.ndarray:
+        """samples [beg, end) of the stream, a view valid until the next chunk"""
+        return self.wave_buffer[:, beg - self.wave_offset : end - self.wave_offset]
+
+    def accept_waveform(self, input: np.ndarray):
+        """append the new samples behind the ones still needed"""
+        keep_beg = (
+            self.input_cache_beg if self.reserve_beg is None else self.reserve_beg
+        )
+        keep_len = self.wave_end - keep_beg
+        num_samples = input.shape[-1]
+        capacity = 0 if self.wave_buffer is None else self.wave_buffer.shape[-1]
+        if self.wave_end - self.wave_offset + num_samples > capacity:
+            if keep_len + num_samples > capacity:
+                buffer = np.empty(
+                    (1, max(keep_len + num_samples, 2 * capacity)), dtype=np.float32
+                )
+            else:
+                buffer = self.wave_buffer
+            if keep_len:
+                buffer[:, :keep_len] = self.wave_view(keep_beg, self.wave_end)
+            self.wave_buffer = buffer
+            self.wave_offset = keep_beg
+        beg = self.wave_end - self.wave_offset
+        samples = self.wave_buffer[0, beg : beg + num_samples]
+        if input.dtype == np.int16:
+            np.true_divide(input[0], 1 << 15, out=samples)
+            # int16 pcm goes to knf as is
+            samples = input[0]
+        else:
+            samples[:] = input[0]
+        self.wave_end += num_samples
+        self.fbank_fn.accept_waveform(
+            self.opts.frame_opts.samp_freq, self.fbank_samples(samples)
+        )
+
+    def reserve_frames(self, num_frames: int) -> int:
+        """make room for new frames behind the splice cache, return where they start"""
+        # the splice cache is padded with the first frame, leave room for it
+        beg = self.splice_len if self.lfr_splice_cache else (self.lfr_m - 1) // 2
+        capacity = 0 if self.feat_buffer is None else self.feat_buffer.shape[0]
+        if beg + num_frames > capacity:
+            buffer = np.empty(
+                (
+                    max(beg + num_frames, 2 * capacity, self.min_buffer_frames),
+                    self.opts.mel_opts.num_bins,
+                ),
+                dtype=np.float32,
+            )
+            if self.splice_len:
+                buffer[: self.splice_len] = self.feat_buffer[: self.splice_len]
+            self.feat_buffer = buffer
+        return beg
+
+    def keep_splice_cache(self, splice_idx: int, end: int):
+        """move the frames from splice_idx to the front of the frames buffer"""
+        self.splice_len = end - splice_idx
+        if splice_idx:
+            self.feat_buffer[: self.splice_len] = self.feat_buffer[splice_idx:end]
+        self.lfr_splice_cache = [self.feat_buffer[: self.splice_len]]
+
+    @staticmethod
+    def lfr_splice(T: int, lfr_m: int, lfr_n: int, is_final: bool) -> Tuple[int, int]:
+        """
+        number of lfr frames to output and where the splice cache starts, inputs
+        have catted the cache
+        """
+        # minus the right context: (lfr_m - 1) // 2
+        T_lfr = int(np.ceil((T - (lfr_m - 1) // 2) / lfr_n))
+        if not is_final:
+            # the last lfr frames wait for their right context
+            T_lfr = min(T_lfr, (T - lfr_m) // lfr_n + 1 if T >= lfr_m else 0)
+        splice_idx = min(T - 1, T_lfr * lfr_n)
+        return T_lfr, splice_idx
 
     @staticmethod
     # inputs has catted the cache
@@ -175,33 +316,11 @@ class WavFrontendOnline(WavFrontend):
         """
         Apply lfr with data
         """
-
-        LFR_inputs = []
-        T = inputs.shape[0]  # include the right context
-        T_lfr = int(
-            np.ceil((T - (lfr_m - 1) // 2) / lfr_n)
-        )  # minus the right context: (lfr_m - 1) // 2
-        splice_idx = T_lfr
-        for i in range(T_lfr):
-            if lfr_m <= T - i * lfr_n:
-                LFR_inputs.append(
-                    (inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1)
-                )
-            else:  # process last LFR frame
-                if is_final:
-                    num_padding = lfr_m - (T - i * lfr_n)
-                    frame = (inputs[i * lfr_n :]).reshape(-1)
-                    for _ in range(num_padding):
-                        frame = np.hstack((frame, inputs[-1]))
-                    LFR_inputs.append(frame)
-                else:
-                    # update splice_idx and break the circle
-                    splice_idx = i
-                    break
-        splice_idx = min(T - 1, splice_idx * lfr_n)
-        lfr_splice_cache = inputs[splice_idx:, :]
-        LFR_outputs = np.vstack(LFR_inputs)
-        return LFR_outputs.astype(np.float32), lfr_splice_cache, splice_idx
+        T_lfr, splice_idx = WavFrontendOnline.lfr_splice(
+            inputs.shape[0], lfr_m, lfr_n, is_final
+        )
+        LFR_outputs = WavFrontend.lfr_windows(inputs, lfr_m, lfr_n, T_lfr, 0).copy()
+        return LFR_outputs, inputs[splice_idx:, :], splice_idx
 
     @staticmethod
     def compute_frame_num(
@@ -217,52 +336,34 @@ class WavFrontendOnline(WavFrontend):
     def fbank(
         self, input: np.ndarray, input_lengths: np.ndarray
     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        self.fbank_fn = knf.OnlineFbank(self.opts)
-        batch_size = input.shape[0]
-        if self.input_cache is None:
-            self.input_cache = np.empty((batch_size, 0), dtype=np.float32)
-        input = np.concatenate((self.input_cache, input), axis=1)
+        self.accept_waveform(input)
         frame_num = self.compute_frame_num(
-            input.shape[-1], self.frame_sample_length, self.frame_shift_sample_length
+            self.wave_end - self.input_cache_beg,
+            self.frame_sample_length,
+            self.frame_shift_sample_length,
         )
-        # update self.in_cache
-        self.input_cache = input[
-            :, -(input.shape[-1] - frame_num * self.frame_shift_sample_length) :
-        ]
         waveforms = np.empty(0, dtype=np.float32)
         feats_pad = np.empty(0, dtype=np.float32)
         feats_lens = np.empty(0, dtype=np.int32)
         if frame_num:
-            waveforms = []
-            feats = []
-            feats_lens = []
-            for i in range(batch_size):
-                waveform = input[i]
-                waveforms.append(
-                    waveform[
-                        : (
-                            (frame_num - 1) * self.frame_shift_sample_length
-                            + self.frame_sample_length
-                        )
-                    ]
-                )
-                waveform = waveform * (1 << 15)
-
-                self.fbank_fn.accept_waveform(
-                    self.opts.frame_opts.samp_freq, waveform.tolist()
+            waveforms = self.wave_view(
+                self.input_cache_beg,
+                self.input_cache_beg
+                + (frame_num - 1) * self.frame_shift_sample_length
+                + self.frame_sample_length,
+            )
+            # only the frames ready since the last chunk
+            beg = self.reserve_frames(frame_num)
+            for i in range(frame_num):
+                self.feat_buffer[beg + i] = self.fbank_fn.get_frame(
+                    self.fbank_beg_idx + i
                 )
-                frames = self.fbank_fn.num_frames_ready
-                mat = np.empty([frames, self.opts.mel_opts.num_bins])
-                for i in range(frames):
-                    mat[i, :] = self.fbank_fn.get_frame(i)
-                feat = mat.astype(np.float32)
-                feat_len = np.array(mat.shape[0]).astype(np.int32)
-                feats.append(feat)
-                feats_lens.append(feat_len)
-
-            waveforms = np.stack(waveforms)
-            feats_lens = np.array(feats_lens)
-            feats_pad = np.array(feats)
+            self.fbank_fn.pop(frame_num)
+            self.fbank_beg_idx += frame_num
+            feats_pad = self.feat_buffer[None, beg : beg + frame_num]
+            feats_lens = np.array([frame_num], dtype=np.int32)
+        # update self.in_cache
+        self.input_cache_beg += frame_num * self.frame_shift_sample_length
         self.fbanks = feats_pad
         self.fbanks_lens = copy.deepcopy(feats_lens)
         return waveforms, feats_pad, feats_lens
@@ -280,13 +381,14 @@ class WavFrontendOnline(WavFrontend):
         for i in range(batch_size):
             mat = input[i, : input_lengths[i], :]
             lfr_splice_frame_idx = -1
+            T_lfr = mat.shape[0]
             if self.lfr_m != 1 or self.lfr_n != 1:
-                # update self.lfr_splice_cache in self.apply_lfr
-                mat, self.lfr_splice_cache[i], lfr_splice_frame_idx = self.apply_lfr(
-                    mat, self.lfr_m, self.lfr_n, is_final
+                # update self.lfr_splice_cache
+                T_lfr, lfr_splice_frame_idx = self.lfr_splice(
+                    mat.shape[0], self.lfr_m, self.lfr_n, is_final
                 )
-            if self.cmvn_file is not None:
-                mat = self.apply_cmvn(mat)
+                self.lfr_splice_cache[i] = mat[lfr_splice_frame_idx:, :]
+            mat = self.apply_lfr_cmvn(mat, T_lfr, 0)
             feat_length = mat.shape[0]
             feats.append(mat)
             feats_lens.append(feat_length)
@@ -303,63 +405,59 @@ class WavFrontendOnline(WavFrontend):
         assert (
             batch_size == 1
         ), "we support to extract feature online only when the batch size is equal to 1 now"
+        input_cache_beg = self.input_cache_beg
+        waveforms_beg = (
+            input_cache_beg if self.reserve_beg is None else self.reserve_beg
+        )
         waveforms, feats, feats_lengths = self.fbank(
             input, input_lengths
         )  # input shape: B T D
         if feats.shape[0]:
-            self.waveforms = (
-                waveforms
-                if self.reserve_waveforms is None
-                else np.concatenate((self.reserve_waveforms, waveforms), axis=1)
+            # the reserve waveform ends where the new waveforms start
+            self.waveforms = self.wave_view(
+                waveforms_beg, input_cache_beg + waveforms.shape[1]
             )
             if not self.lfr_splice_cache:
-                for i in range(batch_size):
-                    self.lfr_splice_cache.append(
-                        np.expand_dims(feats[i][0, :], axis=0).repeat(
-                            (self.lfr_m - 1) // 2, axis=0
-                        )
-                    )
-
-            if feats_lengths[0] + self.lfr_splice_cache[0].shape[0] >= self.lfr_m:
-                lfr_splice_cache_np = np.stack(self.lfr_splice_cache)  # B T D
-                feats = np.concatenate((lfr_splice_cache_np, feats), axis=1)
-                feats_lengths += lfr_splice_cache_np[0].shape[0]
+                self.feat_buffer[: (self.lfr_m - 1) // 2] = feats[0][0]
+                self.splice_len = (self.lfr_m - 1) // 2
+                self.lfr_splice_cache = [self.feat_buffer[: self.splice_len]]
+
+            if feats_lengths[0] + self.splice_len >= self.lfr_m:
+                # the splice cache is right in front of the new frames
+                feats_lengths += self.splice_len
+                feats = self.feat_buffer[None, : feats_lengths[0]]
                 frame_from_waveforms = int(
                     (self.waveforms.shape[1] - self.frame_sample_length)
                     / self.frame_shift_sample_length
                     + 1
                 )
-                minus_frame = (
-                    (self.lfr_m - 1) // 2 if self.reserve_waveforms is None else 0
-                )
+                minus_frame = (self.lfr_m - 1) // 2 if self.reserve_beg is None else 0
+                end = feats_lengths[0]
                 feats, feats_lengths, lfr_splice_frame_idxs = self.lfr_cmvn(
                     feats, feats_lengths, is_final
                 )
+                if lfr_splice_frame_idxs[0] >= 0:
+                    self.keep_splice_cache(lfr_splice_frame_idxs[0], end)
                 if self.lfr_m == 1:
-                    self.reserve_waveforms = None
+                    self.reserve_beg = None
                 else:
                     reserve_frame_idx = lfr_splice_frame_idxs[0] - minus_frame
-                    # print('reserve_frame_idx:  ' + str(reserve_frame_idx))
-                    # print('frame_frame:  ' + str(frame_from_waveforms))
-                    self.reserve_waveforms = self.waveforms[
-                        :,
-                        reserve_frame_idx
-                        * self.frame_shift_sample_length : frame_from_waveforms
-                        * self.frame_shift_sample_length,
-                    ]
+                    # the reserve waveform is empty when the splice cache
+                    # starts beyond the waveforms
+                    self.reserve_beg = min(
+                        waveforms_beg
+                        + reserve_frame_idx * self.frame_shift_sample_length,
+                        self.input_cache_beg,
+                    )
                     sample_length = (
                         frame_from_waveforms - 1
                     ) * self.frame_shift_sample_length + self.frame_sample_length
                     self.waveforms = self.waveforms[:, :sample_length]
             else:
                 # update self.reserve_waveforms and self.lfr_splice_cache
-                self.reserve_waveforms = self.waveforms[
-                    :, : -(self.frame_sample_length - self.frame_shift_sample_length)
-                ]
-                for i in range(batch_size):
-                    self.lfr_splice_cache[i] = np.concatenate(
-                        (self.lfr_splice_cache[i], feats[i]), axis=0
-                    )
+                self.reserve_beg = waveforms_beg
+                self.splice_len += feats_lengths[0]
+                self.lfr_splice_cache = [self.feat_buffer[: self.splice_len]]
                 return np.empty(0, dtype=np.float32), feats_lengths
         else:
             if is_final:
@@ -378,16 +476,96 @@ class WavFrontendOnline(WavFrontend):
     def get_waveforms(self):
         return self.waveforms
 
+    def state_dict(self) -> dict:
+        """the samples and fbank frames the stream still needs"""
+        keep_beg = (
+            self.input_cache_beg if self.reserve_beg is None else self.reserve_beg
+        )
+        return {
+            "wave_end": self.wave_end,
+            "input_cache_beg": self.input_cache_beg,
+            "reserve_beg": self.reserve_beg,
+            "samples": (
+                None
+                if self.wave_buffer is None
+                else self.wave_view(keep_beg, self.wave_end)[0].copy()
+            ),
+            "splice_cache": (
+                self.feat_buffer[: self.splice_len].copy()
+                if self.lfr_splice_cache
+                else None
+            ),
+        }
+
+    def load_state_dict(self, state: dict):
+        """
+        continue the stream of state_dict, the fbank extractor is fed the input
+        cache again, its frames start at the input cache as they did before
+        """
+        self.reset_status()
+        self.wave_end = state["wave_end"]
+        self.input_cache_beg = state["input_cache_beg"]
+        self.reserve_beg = state["reserve_beg"]
+        samples = state["samples"]
+        if samples is None:
+            self.wave_buffer = None
+            self.wave_offset = 0
+        else:
+            self.wave_buffer = np.array(samples, dtype=np.float32)[None, :]
+            self.wave_offset = self.wave_end - samples.shape[-1]
+            input_cache = self.input_cache[0]
+            if input_cache.shape[0]:
+                self.fbank_fn.accept_waveform(
+                    self.opts.frame_opts.samp_freq, self.fbank_samples(input_cache)
+                )
+
+        splice_cache = state["splice_cache"]
+        if splice_cache is None:
+            self.splice_len = 0
+            self.lfr_splice_cache = []
+        else:
+            self.splice_len = splice_cache.shape[0]
+            self.feat_buffer = np.empty(
+                (
+                    max(self.splice_len, self.min_buffer_frames),
+                    self.opts.mel_opts.num_bins,
+                ),
+                dtype=np.float32,
+            )
+            self.feat_buffer[: self.splice_len] = splice_cache
+            self.lfr_splice_cache = [self.feat_buffer[: self.splice_len]]
+
     def cache_reset(self):
-        self.fbank_fn = knf.OnlineFbank(self.opts)
-        self.reserve_waveforms = None
-        self.input_cache = None
-        self.waveform = None
+        self.reset_status()
+        # keep the buffers for the next utterance
+        self.wave_offset = 0
+        self.wave_end = 0
+        self.input_cache_beg = 0
+        self.reserve_beg = None
+        self.splice_len = 0
         self.lfr_splice_cache = []
 
 
 class SinusoidalPositionEncoderOnline:
-    """Streaming Positional encoding."""
+    """Streaming Positional encoding.
+
+    The encoding of positions 1..n is cached in a table shared by all streams,
+    grown on demand by doubling, so a chunk only slices it. `max_cached_len`
+    caps the table (in positions, a 560 dim float32 table takes 2.2KB per
+    position), chunks beyond the cap are encoded on the fly.
+    """
+
+    max_cached_len = 8192
+    _tables = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def set_max_cached_len(cls, max_cached_len: int):
+        """change the cap of the shared tables, cached tables are trimmed to it"""
+        with cls._lock:
+            cls.max_cached_len = max_cached_len
+            for key, table in cls._tables.items():
+                cls._tables[key] = table[:, :max_cached_len].copy()
 
     def encode(
         self,
@@ -410,9 +588,30 @@ class SinusoidalPositionEncoderOnline:
         encoding = np.concatenate((np.sin(scaled_time), np.cos(scaled_time)), axis=2)
         return encoding.astype(dtype)
 
+    def get_encoding(
+        self, start_idx: int, timesteps: int, depth: int, dtype: np.dtype
+    ) -> np.ndarray:
+        """encoding of positions start_idx + 1 .. start_idx + timesteps"""
+        end_idx = start_idx + timesteps
+        if end_idx > self.max_cached_len:
+            positions = np.arange(start_idx + 1, end_idx + 1)[None, :]
+            return self.encode(positions, depth, dtype)
+
+        key = (depth, np.dtype(dtype))
+        table = self._tables.get(key)
+        if table is None or table.shape[1] < end_idx:
+            with self._lock:
+                table = self._tables.get(key)
+                cached_len = 0 if table is None else table.shape[1]
+                if cached_len < end_idx:
+                    cached_len = min(
+                        max(end_idx, 2 * cached_len, 256), self.max_cached_len
+                    )
+                    positions = np.arange(1, cached_len + 1)[None, :]
+                    table = self.encode(positions, depth, dtype)
+                    self._tables[key] = table
+        return table[:, start_idx:end_idx]
+
     def forward(self, x, start_idx=0):
         batch_size, timesteps, input_dim = x.shape
-        positions = np.arange(1, timesteps + 1 + start_idx)[None, :]
-        position_encoding = self.encode(positions, input_dim, x.dtype)
-
-        return x + position_encoding[:, start_idx : start_idx + timesteps]
+        return x + self.get_encoding(start_idx, timesteps, input_dim, x.dtype)
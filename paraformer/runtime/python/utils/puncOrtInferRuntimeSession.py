@@ -10,13 +10,17 @@ from typing import List, Union
 import numpy as np
 from onnxruntime import (
     GraphOptimizationLevel,
-    InferenceSession,
     SessionOptions,
     get_available_providers,
     get_device,
 )
 
+from paraformer.runtime.python.utils.modelCache import (
+    create_session,
+    merge_model_shards,
+)
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
 
 
 class ONNXRuntimeError(Exception):
@@ -25,10 +29,10 @@ class ONNXRuntimeError(Exception):
 
 @singleton
 class PuncOrtInferRuntimeSession:
-    def __init__(self, model_file, device_id=-1, intra_op_num_threads=4):
+    def __init__(self, model_file, device_id=-1, intra_op_num_threads=None):
         device_id = str(device_id)
         sess_opt = SessionOptions()
-        sess_opt.intra_op_num_threads = intra_op_num_threads
+        planner.apply(sess_opt, "punc", intra_op_num_threads)
         sess_opt.log_severity_level = 4
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
@@ -55,17 +59,11 @@ class PuncOrtInferRuntimeSession:
         EP_list.append((cpu_ep, cpu_provider_options))
 
         if isinstance(model_file, list):
-            merged_model_file = b""
-            for file in sorted(model_file):
-                with open(file, "rb") as onnx_file:
-                    merged_model_file += onnx_file.read()
-
-            model_file = merged_model_file
+            # split shards are merged once into a cached file
+            model_file = merge_model_shards(model_file)
         else:
             self._verify_model(model_file)
-        self.session = InferenceSession(
-            model_file, sess_options=sess_opt, providers=EP_list
-        )
+        self.session = create_session(model_file, sess_opt, EP_list)
 
         # del binary of model file to save memory
         del model_file
@@ -0,0 +1,396 @@
+# -*- coding:utf-8 -*-
+# @FileName  :sessionTuner.py
+# @Time      :2026/10/18 16:20
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, List, Union
+
+import numpy as np
+import onnxruntime
+from onnxruntime import ExecutionMode, GraphOptimizationLevel, SessionOptions
+
+from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.modelCache import (
+    create_session,
+    get_cache_dir,
+    merge_model_shards,
+    shards_fingerprint,
+)
+from paraformer.runtime.python.utils.threadPlanner import (
+    available_cores,
+    copy_session_options,
+    planner,
+)
+
+# set PARAFORMER_DISABLE_TUNED_PROFILE=1 to load every session with the defaults
+_TUNED_PROFILE_ENABLED = os.getenv("PARAFORMER_DISABLE_TUNED_PROFILE", "0") != "1"
+# the threads come from the core budget of the thread planner, set
+# PARAFORMER_USE_TUNED_THREADS=1 to tune and load the threads of each model alone
+_TUNED_THREADS_ENABLED = os.getenv("PARAFORMER_USE_TUNED_THREADS", "0") == "1"
+# the options of the caller a profile was measured with
+_KEYED_OPTIONS = (
+    "graph_optimization_level",
+    "execution_order",
+    "use_deterministic_compute",
+)
+_NUMPY_TYPES = {
+    "tensor(float)": np.float32,
+    "tensor(float16)": np.float16,
+    "tensor(double)": np.float64,
+    "tensor(int32)": np.int32,
+    "tensor(int64)": np.int64,
+    "tensor(bool)": np.bool_,
+}
+
+# the options the session wrappers used before tuning
+DEFAULT_PROFILE = {
+    "enable_cpu_mem_arena": False,
+    "enable_mem_pattern": True,
+    "execution_mode": "sequential",
+}
+# bundled models, the length of the dynamic dims is a typical request
+BUNDLED_MODELS = {
+    "online_encoder": ("asr", "asr_online", ["model.onnx", "model_quant_*.onnx"], 20),
+    "online_decoder": ("asr", "asr_online", ["decoder.onnx", "decoder_quant.onnx"], 20),
+    "offline": ("asr", "asr_offline", ["model.onnx", "model_quant*.onnx"], 200),
+    "contextual": ("asr", "asr_offline", ["model_eb.onnx"], 10),
+    "vad_online": ("vad", "vad", ["fsmnvad-online.onnx"], 60),
+    "vad_offline": ("vad", "vad", ["fsmnvad-offline.onnx"], 1000),
+    "punc": ("punc", "punc", ["model.onnx", "model_quant*.onnx"], 30),
+    "lm": ("lm", "asr_offline/lm", ["lm.onnx", "lm_quant.onnx"], 20),
+    "sv": (
+        "sv",
+        "sv",
+        ["campplus.onnx", "eres2net-aug-sv.onnx", "eres2net-aug-sv-quant.onnx"],
+        300,
+    ),
+}
+
+
+def apply_profile(
+    sess_opt: SessionOptions, profile: dict, use_tuned_threads: bool = None
+) -> SessionOptions:
+    """
+    a copy of sess_opt with the options of profile. the threads and spinning
+    of sess_opt are kept, unless use_tuned_threads is set and they were not
+    set explicitly nor come from the global thread pool
+    Args:
+        use_tuned_threads: defaults to $PARAFORMER_USE_TUNED_THREADS
+    """
+    if use_tuned_threads is None:
+        use_tuned_threads = _TUNED_THREADS_ENABLED
+    plan = planner.plan_of(sess_opt)
+    keep_threads = not use_tuned_threads
+    keep_threads = keep_threads or (plan is not None and plan["explicit"])
+    keep_threads = keep_threads or not sess_opt.use_per_session_threads
+    tuned = copy_session_options(
+        sess_opt, None if keep_threads else profile.get("allow_spinning")
+    )
+    tuned.enable_cpu_mem_arena = profile["enable_cpu_mem_arena"]
+    tuned.enable_mem_pattern = profile["enable_mem_pattern"]
+    parallel = profile["execution_mode"] == "parallel"
+    tuned.execution_mode = (
+        ExecutionMode.ORT_PARALLEL if parallel else ExecutionMode.ORT_SEQUENTIAL
+    )
+    if not keep_threads:
+        if profile.get("intra_op_num_threads"):
+            tuned.intra_op_num_threads = profile["intra_op_num_threads"]
+        tuned.inter_op_num_threads = min(2, available_cores()) if parallel else 1
+    return tuned
+
+
+def profile_key(
+    model: Union[str, os.PathLike],
+    providers=None,
+    sess_opt: SessionOptions = None,
+    use_tuned_threads: bool = None,
+) -> str:
+    """
+    the best options depend on the model file, onnxruntime, the machine, the
+    core budget of the thread planner and the other options of the session
+    """
+    if use_tuned_threads is None:
+        use_tuned_threads = _TUNED_THREADS_ENABLED
+    sess_opt = sess_opt or SessionOptions()
+    provider_names = [
+        p[0] if isinstance(p, tuple) else p
+        for p in providers or ["CPUExecutionProvider"]
+    ]
+    key = "\n".join(
+        [
+            shards_fingerprint([model]),
+            onnxruntime.__version__,
+            ",".join(provider_names),
+            str(available_cores()),
+            f"{planner.profile},{planner.total_threads},{planner.global_thread_pool}",
+            f"tuned threads {bool(use_tuned_threads)}",
+        ]
+        + [f"{name}={getattr(sess_opt, name)}" for name in _KEYED_OPTIONS]
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class ProfileStore:
+    """tuned profiles of the models, persisted as json in the cache directory"""
+
+    def __init__(self, path: str = None):
+        self._path = path
+        self._lock = threading.Lock()
+        self._profiles = None
+
+    @property
+    def path(self) -> str:
+        return self._path or os.path.join(get_cache_dir(), "tuning.json")
+
+    def _read(self) -> dict:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key: str):
+        with self._lock:
+            if self._profiles is None:
+                self._profiles = self._read()
+            return self._profiles.get(key)
+
+    def put(self, key: str, profile: dict):
+        with self._lock:
+            # merge with the profiles saved by other processes meanwhile
+            profiles = self._read()
+            profiles[key] = profile
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.path), suffix=".tmp"
+            )
+            with open(fd, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._profiles = profiles
+
+    def reload(self):
+        with self._lock:
+            self._profiles = None
+
+
+profiles = ProfileStore()
+
+
+def tuned_profile(
+    model: Union[str, os.PathLike], providers=None, sess_opt: SessionOptions = None
+):
+    """the saved profile of the model, None if it was not tuned"""
+    if not _TUNED_PROFILE_ENABLED:
+        return None
+    try:
+        return profiles.get(profile_key(model, providers, sess_opt))
+    except OSError:
+        return None
+
+
+def make_inputs(session, length: int) -> Dict[str, np.ndarray]:
+    """
+    random inputs of a representative shape, a dynamic batch dim is 1 and the
+    other dynamic dims are length, 1-d integer inputs are lengths
+    """
+    rng = np.random.default_rng(0)
+    inputs = {}
+    for node in session.get_inputs():
+        shape = [
+            dim if isinstance(dim, int) and dim > 0 else (1 if i == 0 else length)
+            for i, dim in enumerate(node.shape)
+        ]
+        dtype = _NUMPY_TYPES.get(node.type, np.float32)
+        if np.issubdtype(dtype, np.integer):
+            inputs[node.name] = np.full(shape, length if len(shape) == 1 else 1, dtype)
+        elif dtype is np.bool_:
+            inputs[node.name] = np.ones(shape, dtype)
+        else:
+            inputs[node.name] = rng.standard_normal(shape).astype(dtype)
+    return inputs
+
+
+def benchmark_options() -> SessionOptions:
+    """the options of the caller the profiles are measured with"""
+    sess_opt = SessionOptions()
+    sess_opt.log_severity_level = 4
+    sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+    return sess_opt
+
+
+def benchmark(
+    model, options: dict, inputs=None, length=20, runs=20, warmup=3, providers=None
+):
+    """median latency in milliseconds of a session created with options"""
+    session = create_session(
+        model,
+        apply_profile(benchmark_options(), options, use_tuned_threads=True),
+        providers,
+        use_tuned_profile=False,
+    )
+    inputs = inputs or make_inputs(session, length)
+    for _ in range(warmup):
+        session.run(None, inputs)
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session.run(None, inputs)
+        latencies.append(time.perf_counter() - start)
+    return float(np.median(latencies)) * 1000
+
+
+def tune_model(
+    model: Union[str, os.PathLike, List[str]],
+    role: str = "asr",
+    length: int = 20,
+    inputs: Dict[str, np.ndarray] = None,
+    runs: int = 20,
+    warmup: int = 3,
+    providers=None,
+    save: bool = True,
+    tune_threads: bool = None,
+) -> dict:
+    """
+    find the fastest options of one model by changing one option at a time
+    from the defaults and keeping the best value
+    Args:
+        model: onnx file path or the split shards
+        role: asr, vad, punc, sv or lm, the start value of the threads
+        length: size of the dynamic dims of the generated inputs
+        inputs: the inputs to benchmark with instead of generated ones
+        save: persist the profile for the sessions loaded later
+        tune_threads: also tune the threads and spinning, which the sessions
+            only use with use_tuned_threads, defaults to
+            $PARAFORMER_USE_TUNED_THREADS. otherwise they are the ones the
+            thread planner gives the role
+    Returns:
+        the profile, with its latency and the one of the defaults in ms
+    """
+    if isinstance(model, list):
+        model = merge_model_shards(model)
+    model = os.fspath(model)
+    cores = available_cores()
+    planned = planner.plan(role)
+    best = dict(
+        DEFAULT_PROFILE,
+        intra_op_num_threads=planned["intra_op_num_threads"],
+        allow_spinning=planned["allow_spinning"],
+    )
+    candidates = {
+        "enable_cpu_mem_arena": [False, True],
+        "enable_mem_pattern": [True, False],
+        "execution_mode": ["sequential", "parallel"],
+    }
+    if tune_threads is None:
+        tune_threads = _TUNED_THREADS_ENABLED
+    if tune_threads:
+        candidates["intra_op_num_threads"] = sorted({1, max(1, cores // 2), cores})
+        candidates["allow_spinning"] = [False, True]
+
+    def measure(options):
+        return benchmark(model, options, inputs, length, runs, warmup, providers)
+
+    default_latency = best_latency = measure(best)
+    for name, values in candidates.items():
+        for value in values:
+            if value == best[name]:
+                continue
+            options = dict(best, **{name: value})
+            latency = measure(options)
+            logger.debug(f"{os.path.basename(model)} {options}: {latency:.3f} ms")
+            if latency < best_latency:
+                best, best_latency = options, latency
+
+    profile = dict(
+        best,
+        latency_ms=round(best_latency, 3),
+        default_latency_ms=round(default_latency, 3),
+        model=os.path.basename(model),
+    )
+    if save:
+        profiles.put(
+            profile_key(model, providers, benchmark_options(), tune_threads), profile
+        )
+    logger.info(
+        f"tuned {os.path.basename(model)}: {default_latency:.3f} ms -> "
+        f"{best_latency:.3f} ms with {best}"
+    )
+    return profile
+
+
+def bundled_models(onnx_dir: str = None) -> Dict[str, tuple]:
+    """the bundled models found on disk, name -> (role, length, variants)"""
+    onnx_dir = onnx_dir or os.path.join(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(__file__)))),
+        "onnx",
+    )
+    found = {}
+    for name, (role, directory, patterns, length) in BUNDLED_MODELS.items():
+        variants = []
+        for pattern in patterns:
+            files = sorted(glob.glob(os.path.join(onnx_dir, directory, pattern)))
+            # shards of one model are tuned as the merged model
+            if len(files) > 1 and all("_quant_" in f for f in files):
+                variants.append(files)
+            else:
+                variants.extend(files)
+        if variants:
+            found[name] = (role, length, variants)
+    return found
+
+
+def autotune(
+    names: List[str] = None, onnx_dir: str = None, runs: int = 20, save=True
+) -> Dict[str, List[dict]]:
+    """
+    tune every variant (float, quantized) of the bundled models, each variant
+    keeps its own profile, the latencies tell which variant to load
+    """
+    results = {}
+    for name, (role, length, variants) in bundled_models(onnx_dir).items():
+        if names and name not in names:
+            continue
+        results[name] = []
+        for variant in variants:
+            try:
+                results[name].append(
+                    tune_model(variant, role, length, runs=runs, save=save)
+                )
+            except Exception as e:
+                logger.warning(f"can not tune {variant}: {e}")
+    return results
+
+
+def tuning_report(results: Dict[str, List[dict]]) -> str:
+    lines = [f"{'model':<16}{'file':<32}{'default (ms)':>14}{'tuned (ms)':>12}"]
+    for name, tuned in results.items():
+        for profile in sorted(tuned, key=lambda p: p["latency_ms"]):
+            lines.append(
+                f"{name:<16}{profile['model']:<32}"
+                f"{profile['default_latency_ms']:>14.3f}{profile['latency_ms']:>12.3f}"
+            )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="benchmark the session options of the bundled models and "
+        "save the fastest ones for the later loads"
+    )
+    parser.add_argument("models", nargs="*", help=f"of {list(BUNDLED_MODELS)}")
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--dry-run", action="store_true", help="do not save")
+    args = parser.parse_args()
+    print(
+        tuning_report(autotune(args.models, args.onnx_dir, args.runs, not args.dry_run))
+    )
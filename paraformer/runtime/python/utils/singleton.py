@@ -3,36 +3,263 @@
 # @Time      :2023/8/22 15:52
 # @Author    :lovemefan
 # @Email     :lovemefan@outlook.com
+import inspect
+import os
 import threading
+import time
+import weakref
+from collections import OrderedDict
 from functools import wraps
 
 from .logger import logger
+from .startupReport import timed
+
+
+class _Entry:
+    __slots__ = (
+        "key",
+        "name",
+        "instance",
+        "refcount",
+        "children",
+        "size",
+        "last_used",
+        "ready",
+        "error",
+    )
+
+    def __init__(self, key, name, size):
+        self.key = key
+        self.name = name
+        self.instance = None
+        self.refcount = 0
+        # instances acquired while constructing this one, released with it
+        self.children = []
+        self.size = size
+        self.last_used = time.monotonic()
+        self.ready = threading.Event()
+        self.error = None
+
+
+def _freeze(value):
+    """hashable form of a constructor argument"""
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return value
+    if isinstance(value, os.PathLike):
+        return os.fspath(value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = (_freeze(v) for v in value)
+        return tuple(sorted(items, key=repr) if isinstance(value, set) else items)
+    return repr(value)
+
+
+def _files_size(value) -> int:
+    """size of the model files among the arguments, a hint of the memory used"""
+    if isinstance(value, (str, os.PathLike)):
+        try:
+            return os.path.getsize(value) if os.path.isfile(value) else 0
+        except (OSError, ValueError):
+            return 0
+    if isinstance(value, dict):
+        return sum(_files_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_files_size(v) for v in value)
+    return 0
+
+
+class InstanceRegistry:
+    """
+    instances keyed by class and constructor arguments (model path,
+    quantization, provider options, thread settings ...), reference counted.
+    released instances are kept for reuse and evicted in lru order when
+    max_instances or max_bytes is exceeded, or after idle_timeout seconds.
+    """
+
+    def __init__(self, max_instances=None, max_bytes=None, idle_timeout=None):
+        self.max_instances = max_instances
+        self.max_bytes = max_bytes
+        self.idle_timeout = idle_timeout
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._by_id = {}
+        self._constructing = threading.local()
+
+    @staticmethod
+    def make_key(cls, args, kwargs):
+        try:
+            bound = inspect.signature(cls).bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+        except (TypeError, ValueError):
+            arguments = {"args": args, "kwargs": kwargs}
+        return f"{cls.__module__}.{cls.__qualname__}", _freeze(arguments)
+
+    def acquire(self, cls, *args, **kwargs):
+        key = self.make_key(cls, args, kwargs)
+        stack = self._constructing.__dict__.setdefault("stack", [])
+        with self._lock:
+            entry = self._entries.get(key)
+            creator = entry is None
+            if creator:
+                entry = _Entry(key, cls.__name__, _files_size([args, kwargs]))
+                self._entries[key] = entry
+            entry.refcount += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+            if stack:
+                stack[-1].children.append(entry)
+
+        if creator:
+            # other keys are constructed concurrently, same keys wait for it
+            logger.info(f"creating {entry.name} instance")
+            stack.append(entry)
+            try:
+                with timed(entry.name, "load"):
+                    entry.instance = cls(*args, **kwargs)
+            except BaseException as e:
+                entry.error = e
+                with self._lock:
+                    self._entries.pop(key, None)
+                    for child in entry.children:
+                        self._release_entry(child)
+                raise
+            finally:
+                stack.pop()
+                entry.ready.set()
+            with self._lock:
+                self._by_id[id(entry.instance)] = entry
+                self._evict()
+            logger.info(f"create {entry.name} instance finished")
+        else:
+            entry.ready.wait()
+            if entry.error is not None:
+                raise entry.error
+
+        return entry.instance
+
+    def release(self, instance):
+        """drop one reference, the instance may be evicted afterwards"""
+        with self._lock:
+            entry = self._by_id.get(id(instance))
+            if entry is None or entry.instance is not instance:
+                return
+            self._release_entry(entry)
+            self._evict()
+
+    def release_on_collect(self, owner, *instances):
+        """release the instances once the owner is garbage collected"""
+        for instance in instances:
+            weakref.finalize(owner, self.release, instance)
+
+    def _release_entry(self, entry):
+        entry.refcount = max(entry.refcount - 1, 0)
+        entry.last_used = time.monotonic()
+
+    def _evict_entry(self, entry):
+        self._entries.pop(entry.key, None)
+        self._by_id.pop(id(entry.instance), None)
+        logger.info(f"evict {entry.name} instance")
+        for child in entry.children:
+            self._release_entry(child)
+        entry.children = []
+
+    def _evict(self):
+        while True:
+            idle = [
+                e
+                for e in self._entries.values()
+                if e.refcount == 0 and e.ready.is_set()
+            ]
+            if not idle:
+                return
+            now = time.monotonic()
+            expired = [
+                e
+                for e in idle
+                if self.idle_timeout is not None
+                and now - e.last_used >= self.idle_timeout
+            ]
+            if expired:
+                for entry in expired:
+                    self._evict_entry(entry)
+                continue
+            over_count = (
+                self.max_instances is not None
+                and len(self._entries) > self.max_instances
+            )
+            over_bytes = (
+                self.max_bytes is not None
+                and sum(e.size for e in self._entries.values()) > self.max_bytes
+            )
+            if not (over_count or over_bytes):
+                return
+            # idle is in lru order
+            self._evict_entry(idle[0])
+
+    def evict_idle(self):
+        """apply idle_timeout and the limits now"""
+        with self._lock:
+            self._evict()
+
+    def set_limits(self, max_instances=None, max_bytes=None, idle_timeout=None):
+        with self._lock:
+            self.max_instances = max_instances
+            self.max_bytes = max_bytes
+            self.idle_timeout = idle_timeout
+            self._evict()
+
+    def clear(self):
+        """forget all instances, the ones in use stay alive with their owners"""
+        with self._lock:
+            self._entries.clear()
+            self._by_id.clear()
+
+    def stats(self):
+        with self._lock:
+            return [
+                {
+                    "name": e.name,
+                    "refcount": e.refcount,
+                    "size": e.size,
+                    "idle": time.monotonic() - e.last_used if e.refcount == 0 else 0,
+                }
+                for e in self._entries.values()
+            ]
+
+    def instances(self):
+        with self._lock:
+            return {
+                e.key: e.instance for e in self._entries.values() if e.ready.is_set()
+            }
+
 
-lock = threading.RLock()
 # instance container
-instances = {}
+registry = InstanceRegistry()
 
 
 def singleton(cls):
-    """this is decorator to decorate class , make the class singleton(修饰器实现单例模式)"""
+    """
+    this is decorator to decorate class, instances are shared by the calls
+    with the same arguments (修饰器实现单例模式, 相同参数共享实例)
+    """
 
     @wraps(cls)
     def get_instance(*args, **kwargs):
-        cls_name = cls.__name__
+        return registry.acquire(cls, *args, **kwargs)
 
-        if cls_name not in instances:
-            with lock:
-                if cls_name not in instances:
-                    logger.info(f"creating {cls_name} instance")
-                    instance = cls(*args, **kwargs)
-                    instances[cls_name] = instance
-                    logger.info(f"create {cls_name} instance finished")
+    return get_instance
 
-        return instances[cls_name]
 
-    return get_instance
+def release(instance):
+    registry.release(instance)
+
+
+def release_on_collect(owner, *instances):
+    registry.release_on_collect(owner, *instances)
 
 
 def get_all_instance():
     """return all instance in the container"""
-    return instances
+    return registry.instances()
@@ -0,0 +1,161 @@
+# -*- coding:utf-8 -*-
+# @FileName  :snapshot.py
+# @Time      :2026/10/18 18:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import abc
+import json
+import struct
+from enum import Enum
+
+import numpy as np
+
+# magic, format version, length of the json header
+MAGIC = b"PFSS"
+VERSION = 1
+_PREFIX = struct.Struct("<4sBI")
+_KIND = "__kind__"
+
+# classes whose instances may appear in a snapshot, by name
+_classes = {}
+
+
+def register(cls):
+    """
+    allow the enum or plain object class cls in snapshots, plain objects are
+    saved by their __dict__ and restored without calling __init__
+    """
+    _classes[cls.__name__] = cls
+    return cls
+
+
+def _same_scalars(values: list) -> bool:
+    if not values or not isinstance(values[0], np.generic):
+        return False
+    dtype = values[0].dtype
+    return not dtype.hasobject and all(
+        isinstance(v, np.generic) and v.dtype == dtype for v in values
+    )
+
+
+def _encode(value, arrays: list, offset: list):
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, int) and not isinstance(value, Enum):
+        return int(value)
+    if isinstance(value, float):
+        return float(value)
+    if isinstance(value, list) and _same_scalars(value):
+        # a history of numpy scalars (decibels, probabilities) as one array
+        ref = _encode(np.array(value), arrays, offset)
+        ref["scalars"] = True
+        return ref
+    if isinstance(value, (np.ndarray, np.generic)):
+        array = np.ascontiguousarray(value)
+        if array.dtype.hasobject:
+            raise TypeError("arrays of objects can not be snapshotted")
+        arrays.append(array)
+        ref = {
+            _KIND: "array",
+            "dtype": array.dtype.str,
+            "shape": list(array.shape),
+            "offset": offset[0],
+        }
+        if isinstance(value, np.generic):
+            ref["scalar"] = True
+        offset[0] += array.nbytes
+        return ref
+    if isinstance(value, (list, tuple)):
+        return [_encode(v, arrays, offset) for v in value]
+    if isinstance(value, dict):
+        if _KIND in value or not all(isinstance(k, str) for k in value):
+            raise TypeError(f"dict keys must be str and not {_KIND}")
+        return {k: _encode(v, arrays, offset) for k, v in value.items()}
+    name = type(value).__name__
+    if _classes.get(name) is not type(value):
+        raise TypeError(f"{name} is not registered for snapshots")
+    if isinstance(value, Enum):
+        return {_KIND: "enum", "class": name, "value": value.value}
+    return {
+        _KIND: "object",
+        "class": name,
+        "state": _encode(vars(value), arrays, offset),
+    }
+
+
+def _decode(value, payload: memoryview):
+    if isinstance(value, list):
+        return [_decode(v, payload) for v in value]
+    if not isinstance(value, dict):
+        return value
+    kind = value.get(_KIND)
+    if kind is None:
+        return {k: _decode(v, payload) for k, v in value.items()}
+    if kind == "array":
+        dtype = np.dtype(value["dtype"])
+        count = int(np.prod(value["shape"], dtype=np.int64))
+        array = np.frombuffer(payload, dtype, count, value["offset"])
+        # a writable copy, the stream keeps updating its buffers in place
+        array = array.reshape(value["shape"]).copy()
+        if value.get("scalars"):
+            return list(array)
+        return array[()] if value.get("scalar") else array
+    cls = _classes.get(value["class"])
+    if cls is None:
+        raise ValueError(f"{value['class']} is not registered for snapshots")
+    if kind == "enum":
+        return cls(value["value"])
+    instance = cls.__new__(cls)
+    instance.__dict__.update(_decode(value["state"], payload))
+    return instance
+
+
+def dumps(state) -> bytes:
+    """
+    serialize a tree of dicts, lists, scalars, numpy arrays and registered
+    classes, the arrays are stored as raw bytes behind a json header
+    """
+    arrays = []
+    header = _encode(state, arrays, [0])
+    header = json.dumps(header, ensure_ascii=False, separators=(",", ":"))
+    header = header.encode("utf-8")
+    parts = [_PREFIX.pack(MAGIC, VERSION, len(header)), header]
+    parts.extend(array.tobytes() for array in arrays)
+    return b"".join(parts)
+
+
+def loads(data: bytes):
+    """the tree saved by dumps, no code is run besides the registered classes"""
+    data = memoryview(data)
+    if len(data) < _PREFIX.size:
+        raise ValueError("snapshot is truncated")
+    magic, version, header_len = _PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("not a stream snapshot")
+    if version != VERSION:
+        raise ValueError(f"snapshot version {version} is not supported")
+    header_end = _PREFIX.size + header_len
+    header = json.loads(bytes(data[_PREFIX.size : header_end]).decode("utf-8"))
+    return _decode(header, data[header_end:])
+
+
+class Snapshotable(abc.ABC):
+    """
+    snapshot() and restore() of a stream over its state_dict() and
+    load_state_dict(), so that a live stream can move to another process.
+    the stream shares no buffer with the state it saved or loaded
+    """
+
+    @abc.abstractmethod
+    def state_dict(self) -> dict:
+        pass
+
+    @abc.abstractmethod
+    def load_state_dict(self, state: dict):
+        pass
+
+    def snapshot(self) -> bytes:
+        return dumps(self.state_dict())
+
+    def restore(self, data: bytes):
+        self.load_state_dict(loads(data))
@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+# @FileName  :startupReport.py
+# @Time      :2026/10/18 14:30
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+# (component, phase, seconds) in the order they finished
+_records = []
+
+
+def record(component: str, phase: str, seconds: float):
+    with _lock:
+        _records.append((component, phase, seconds))
+
+
+@contextmanager
+def timed(component: str, phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(component, phase, time.perf_counter() - start)
+
+
+def startup_records():
+    with _lock:
+        return list(_records)
+
+
+def startup_report() -> str:
+    """
+    import, load and warmup time of each component so far, the load time of
+    a model includes the sessions it creates
+    """
+    records = startup_records()
+    if not records:
+        return "nothing imported or loaded yet"
+    width = max(len(component) for component, _, _ in records)
+    lines = [f"{'component':<{width}}  phase   time (ms)"]
+    for component, phase, seconds in records:
+        lines.append(f"{component:<{width}}  {phase:<6}  {seconds * 1000:9.1f}")
+    for phase in ("import", "load", "warmup"):
+        total = sum(s for _, p, s in records if p == phase)
+        lines.append(f"{'total':<{width}}  {phase:<6}  {total * 1000:9.1f}")
+    return "\n".join(lines)
@@ -0,0 +1,178 @@
+# -*- coding:utf-8 -*-
+# @FileName  :threadPlanner.py
+# @Time      :2026/10/18 15:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import collections
+import os
+import threading
+import weakref
+
+import onnxruntime
+from onnxruntime import SessionOptions
+
+from paraformer.runtime.python.utils.logger import logger
+
+# share of the core budget given to the intra op threads of one session
+_ROLE_SHARES = {
+    # several components run side by side, asr gets 4 of 8 cores as before
+    "balanced": {"asr": 0.5, "vad": 0.125, "punc": 0.25, "sv": 0.25, "lm": 0.25},
+    # one big file, the stages run one after another and may use every core
+    "file": {"asr": 1.0, "vad": 0.25, "punc": 0.5, "sv": 0.5, "lm": 0.5},
+    # many concurrent streams, the parallelism comes from the streams
+    "streams": {"asr": 0.0, "vad": 0.0, "punc": 0.0, "sv": 0.0, "lm": 0.0},
+}
+# busy waiting threads only pay off when a session has the cores to itself
+_ALLOW_SPINNING = {"balanced": False, "file": True, "streams": False}
+
+PROFILES = tuple(_ROLE_SHARES)
+# plans kept for the report, the oldest are dropped
+_MAX_PLANS = 256
+_SPINNING_KEY = "session.intra_op.allow_spinning"
+_COPIED_OPTIONS = (
+    "log_severity_level",
+    "log_verbosity_level",
+    "logid",
+    "graph_optimization_level",
+    "enable_cpu_mem_arena",
+    "enable_mem_pattern",
+    "execution_mode",
+    "execution_order",
+    "intra_op_num_threads",
+    "inter_op_num_threads",
+    "use_per_session_threads",
+    "use_deterministic_compute",
+)
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ThreadPlanner:
+    """
+    assigns the threads of every onnxruntime session of the process from one
+    core budget and a workload profile, instead of 4 threads per session
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.plans = collections.deque(maxlen=_MAX_PLANS)
+        # the plan of each SessionOptions, looked up when a tuned profile is applied
+        self._applied = weakref.WeakKeyDictionary()
+        self.global_thread_pool = False
+        self.configure(
+            total_threads=int(os.getenv("PARAFORMER_NUM_THREADS", "0")) or None,
+            profile=os.getenv("PARAFORMER_THREAD_PROFILE", "balanced"),
+        )
+
+    def configure(
+        self, total_threads: int = None, profile="balanced", global_thread_pool=False
+    ):
+        """
+        Args:
+            total_threads: core budget, defaults to the cores of the process
+            profile: balanced, file (one big file) or streams (many streams)
+            global_thread_pool: let all sessions share one onnxruntime thread
+                pool of total_threads, must be set before the first session
+        """
+        if profile not in _ROLE_SHARES:
+            raise ValueError(f"{profile} is not support, only {PROFILES} is available")
+        with self._lock:
+            self.total_threads = total_threads or available_cores()
+            self.profile = profile
+            if global_thread_pool and not self.global_thread_pool:
+                if self.plans:
+                    logger.warning(
+                        "global thread pool is set after sessions were created, "
+                        "only the later sessions use it"
+                    )
+                onnxruntime.set_global_thread_pool_sizes(self.total_threads, 1)
+            self.global_thread_pool = global_thread_pool
+
+    def plan(self, role: str, intra_op_num_threads: int = None) -> dict:
+        share = _ROLE_SHARES[self.profile].get(role, 0.25)
+        planned = min(max(1, round(self.total_threads * share)), self.total_threads)
+        return {
+            "role": role,
+            "intra_op_num_threads": intra_op_num_threads or planned,
+            "inter_op_num_threads": 1,
+            "allow_spinning": _ALLOW_SPINNING[self.profile],
+            "global_thread_pool": self.global_thread_pool,
+            "explicit": intra_op_num_threads is not None,
+        }
+
+    def apply(
+        self, sess_opt: SessionOptions, role: str, intra_op_num_threads: int = None
+    ) -> SessionOptions:
+        """
+        set the threads of sess_opt, an explicit intra_op_num_threads wins
+        over the budget
+        """
+        with self._lock:
+            plan = self.plan(role, intra_op_num_threads)
+            self.plans.append(plan)
+            self._applied[sess_opt] = plan
+        if plan["global_thread_pool"]:
+            sess_opt.use_per_session_threads = False
+        else:
+            sess_opt.intra_op_num_threads = plan["intra_op_num_threads"]
+            sess_opt.inter_op_num_threads = plan["inter_op_num_threads"]
+            sess_opt.add_session_config_entry(
+                _SPINNING_KEY, "1" if plan["allow_spinning"] else "0"
+            )
+        logger.debug(f"threads of {role} session: {plan}")
+        return sess_opt
+
+    def conform(self, sess_opt: SessionOptions) -> SessionOptions:
+        """
+        sess_opt, or a copy of it without per session threads when the global
+        thread pool is set, onnxruntime rejects the other sessions then
+        """
+        if not self.global_thread_pool or not sess_opt.use_per_session_threads:
+            return sess_opt
+        return copy_session_options(sess_opt)
+
+    def plan_of(self, sess_opt: SessionOptions):
+        """the plan applied to sess_opt, None if it was not planned"""
+        with self._lock:
+            return self._applied.get(sess_opt)
+
+    def report(self):
+        """the plans of the sessions created so far"""
+        with self._lock:
+            return list(self.plans)
+
+
+def copy_session_options(sess_opt: SessionOptions, allow_spinning=None):
+    """
+    copy of sess_opt, config entries can not be overwritten without a warning.
+    the copy has no per session threads when the global thread pool is set
+    """
+    copied = SessionOptions()
+    for name in _COPIED_OPTIONS:
+        if hasattr(sess_opt, name):
+            setattr(copied, name, getattr(sess_opt, name))
+    if planner.global_thread_pool:
+        copied.use_per_session_threads = False
+    if allow_spinning is not None:
+        copied.add_session_config_entry(_SPINNING_KEY, "1" if allow_spinning else "0")
+        return copied
+    try:
+        copied.add_session_config_entry(
+            _SPINNING_KEY, sess_opt.get_session_config_entry(_SPINNING_KEY)
+        )
+    except RuntimeError:
+        pass
+    return copied
+
+
+planner = ThreadPlanner()
+
+
+def configure_threads(
+    total_threads: int = None, profile="balanced", global_thread_pool=False
+):
+    planner.configure(total_threads, profile, global_thread_pool)
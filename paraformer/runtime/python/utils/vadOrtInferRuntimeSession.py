@@ -15,13 +15,14 @@ from typing import List, Union
 import numpy as np
 from onnxruntime import (
     GraphOptimizationLevel,
-    InferenceSession,
     SessionOptions,
     get_available_providers,
     get_device,
 )
 
+from paraformer.runtime.python.utils.modelCache import create_session
 from paraformer.runtime.python.utils.singleton import singleton
+from paraformer.runtime.python.utils.threadPlanner import planner
 
 
 @singleton
@@ -29,6 +30,7 @@ class VadOrtInferRuntimeSession:
     def __init__(self, config, root_dir: Path):
         sess_opt = SessionOptions()
         sess_opt.log_severity_level = 4
+        planner.apply(sess_opt, "vad")
         sess_opt.enable_cpu_mem_arena = False
         sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
 
@@ -50,9 +52,7 @@ class VadOrtInferRuntimeSession:
         config["model_path"] = root_dir / str(config["model_path"])
         self._verify_model(config["model_path"])
         logging.info(f"Loading onnx model at {str(config['model_path'])}")
-        self.session = InferenceSession(
-            str(config["model_path"]), sess_options=sess_opt, providers=EP_list
-        )
+        self.session = create_session(str(config["model_path"]), sess_opt, EP_list)
 
         if config["use_cuda"] and cuda_ep not in self.session.get_providers():
             logging.warning(
@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+# @FileName  :warmup.py
+# @Time      :2026/10/18 17:20
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+from paraformer.runtime.python.utils.logger import logger
+from paraformer.runtime.python.utils.startupReport import record
+
+# common characters for the punctuation model
+WARMUP_TEXT = "今天天气很好我们一起去公园散步吧然后回家吃饭晚上看一会儿书"
+
+
+def synthetic_audio(seconds: float, sample_rate=16000, seed=0) -> np.ndarray:
+    """
+    float32 samples in [-1, 1), a tone with noise that makes the vad and asr
+    run their full path, the content does not matter
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate), dtype=np.float32) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * 220 * t) * (np.sin(2 * np.pi * 2 * t) > 0)
+    audio += 0.01 * rng.standard_normal(len(t))
+    return audio.astype(np.float32)
+
+
+def synthetic_text(length: int) -> str:
+    repeats = length // len(WARMUP_TEXT) + 1
+    return (WARMUP_TEXT * repeats)[:length]
+
+
+@contextmanager
+def warmup_case(timings: dict, component: str, case: str):
+    """
+    time one warmup call into timings and the startup report, a case timed
+    several times keeps the slowest
+    """
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    timings[case] = max(seconds, timings.get(case, 0))
+    record(f"{component} {case}", "warmup", seconds)
+    logger.info(f"warmup {component} {case} use {seconds * 1000:.1f} ms")
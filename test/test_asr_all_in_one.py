@@ -21,7 +21,10 @@ def start_asr():
         sv_threshold=0.75,
         sv_model_name="cam++",
         hot_words="任意热词 空格隔开",
+        parallel_load=True,
     )
+    logging.info(f"load times: {model.load_times}")
+    logging.info(f"warmup times: {model.warmup()}")
     logging.info("Testing online asr")
     wav_path = "test/P9_0002.wav"
     speech, sample_rate = AudioReader.read_wav_file(wav_path)
@@ -0,0 +1,229 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_async_api.py
+# @Time      :2026/10/18 20:20
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import asyncio
+import hashlib
+import logging
+import pickle
+import threading
+import time
+from pathlib import Path
+
+from paraformer import AsyncRunner, AudioReader, FSMNVadOnline
+from paraformer.runtime.python import asr_all_in_one
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+from paraformer.runtime.python.utils.preprocess import WavFrontend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def segments_of(vad, speech, step):
+    segments = []
+    for offset in range(0, len(speech), step):
+        segments.extend(
+            vad.segments_online(
+                speech[offset : offset + step], is_final=offset + step >= len(speech)
+            )
+        )
+    return segments
+
+
+async def stream_async(vad, speech, step, runner):
+    segments = []
+    for offset in range(0, len(speech), step):
+        segments.extend(
+            await vad.segments_online_async(
+                speech[offset : offset + step],
+                is_final=offset + step >= len(speech),
+                runner=runner,
+            )
+        )
+    return segments
+
+
+async def ticker(stop: asyncio.Event, gaps: list):
+    """the longest time the event loop did not run, the loop must not block"""
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(0.005)
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+
+
+def test_vad_streams(num_streams=16, step=9600):
+    speech, _ = AudioReader.read_wav_file("test/vad_example.wav")
+    expected = segments_of(FSMNVadOnline(), speech, step)
+    runner = AsyncRunner(max_workers=4, max_concurrency=2)
+
+    async def main():
+        stop = asyncio.Event()
+        gaps = []
+        tick = asyncio.ensure_future(ticker(stop, gaps))
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *[
+                stream_async(FSMNVadOnline(), speech, step, runner)
+                for _ in range(num_streams)
+            ]
+        )
+        seconds = time.perf_counter() - start
+        stop.set()
+        await tick
+        return results, seconds, max(gaps)
+
+    results, seconds, gap = asyncio.run(main())
+    runner.close()
+    logging.info(
+        f"{num_streams} vad streams of {len(speech) / 16000:.1f}s in "
+        f"{seconds:.2f}s, the event loop blocked at most {gap * 1000:.1f} ms"
+    )
+    assert all(segments == expected for segments in results)
+
+
+class FeatureOffline:
+    """
+    offline asr whose transcript is the digest of the features of the real
+    frontend, one model shared by the streams like the singleton
+    """
+
+    model = None
+
+    def __init__(self, *args, **kwargs):
+        if FeatureOffline.model is None:
+            model_dir = Path(__file__).resolve().parent.parent / "paraformer"
+            model_dir = model_dir / "onnx" / "asr_offline"
+            with open(model_dir / "config.pkl", "rb") as f:
+                config = pickle.load(f)
+            cls = ParaformerOfflineModel.__wrapped__
+            model = cls.__new__(cls)
+            model.frontend = WavFrontend(
+                cmvn_file=str(model_dir / "am.mvn"),
+                dither=0.0,
+                **config["frontend_conf"],
+            )
+            FeatureOffline.model = model
+
+    def infer_offline(self, audio, hot_words=""):
+        feats, _ = self.model.extract_feat(audio)
+        return hashlib.sha1(feats.tobytes()).hexdigest()[:12]
+
+
+class FakeOnline:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def infer_online(self, chunk, is_final=False):
+        return ""
+
+    def reset_cache(self):
+        pass
+
+
+class FakePunctuator:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def punctuate(self, text):
+        return (text,)
+
+
+def finals_of(results):
+    return [(r["seq"], r["final"], r["time_stamp"]) for r in results if "final" in r]
+
+
+def test_two_pass_streams(num_streams=8, step=9600):
+    """the synchronous finals of the streams run at once on the offline model"""
+    speech, _ = AudioReader.read_wav_file("test/vad_example.wav")
+    speech = speech[: 16000 * 30]
+    fakes = dict(
+        ParaformerOffline=FeatureOffline,
+        ParaformerOnline=FakeOnline,
+        CttPunctuator=FakePunctuator,
+    )
+    originals = {name: getattr(asr_all_in_one, name) for name in fakes}
+    for name, fake in fakes.items():
+        setattr(asr_all_in_one, name, fake)
+    runner = AsyncRunner(max_workers=4, max_concurrency=4)
+
+    async def stream(model):
+        results = []
+        for offset in range(0, len(speech), step):
+            results.append(
+                await model.two_pass_asr_async(
+                    speech[offset : offset + step],
+                    is_final=offset + step >= len(speech),
+                    runner=runner,
+                )
+            )
+        return results
+
+    async def main():
+        return await asyncio.gather(
+            *[stream(asr_all_in_one.AsrAllInOne("2pass")) for _ in range(num_streams)]
+        )
+
+    try:
+        model = asr_all_in_one.AsrAllInOne("2pass")
+        expected = finals_of(
+            model.two_pass_asr(
+                speech[offset : offset + step], is_final=offset + step >= len(speech)
+            )
+            for offset in range(0, len(speech), step)
+        )
+        results = asyncio.run(main())
+    finally:
+        runner.close()
+        for name, original in originals.items():
+            setattr(asr_all_in_one, name, original)
+    assert len(expected) > 1
+    assert all(finals_of(r) == expected for r in results)
+    logging.info(f"{num_streams} 2pass streams got the same {len(expected)} finals")
+
+
+def test_ordering_and_limit():
+    runner = AsyncRunner(max_workers=8, max_concurrency=3)
+    lock = threading.Lock()
+    running = [0, 0]
+    calls = {}
+
+    class Stream:
+        pass
+
+    def call(stream, index):
+        with lock:
+            running[0] += 1
+            running[1] = max(running)
+            # the calls of a stream never overlap
+            assert calls.get(stream, -1) == index - 1
+        time.sleep(0.002)
+        with lock:
+            calls[stream] = index
+            running[0] -= 1
+        return index
+
+    async def feed(stream):
+        # all calls are awaited at once, they still run in order
+        return await asyncio.gather(
+            *[runner.run(stream, call, stream, i) for i in range(20)]
+        )
+
+    async def main():
+        return await asyncio.gather(*[feed(Stream()) for _ in range(10)])
+
+    results = asyncio.run(main())
+    runner.close()
+    assert all(result == list(range(20)) for result in results)
+    assert running[1] <= 3
+
+
+if __name__ == "__main__":
+    test_ordering_and_limit()
+    test_vad_streams()
+    test_two_pass_streams()
+    logging.info("async api test passed")
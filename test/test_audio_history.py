@@ -0,0 +1,95 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_audio_history.py
+# @Time      :2026/10/18 19:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+
+import numpy as np
+
+from paraformer import AudioReader, FSMNVadOnline
+from paraformer.runtime.python.utils.audioHelper import AudioHistory
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def test_history():
+    history = AudioHistory(capacity=100)
+    samples = np.arange(1000, dtype=np.float32)
+    for start in range(0, 1000, 30):
+        history.append(samples[start : start + 30])
+        assert len(history) <= 100
+        assert np.array_equal(
+            history.view(history.begin, history.end),
+            samples[history.begin : history.end],
+        )
+    assert history.end == 1000 and history.begin == 900
+    # the buffer stays at twice the capacity
+    assert history.buffer.shape[0] == 200
+
+    # pinned samples are kept beyond the capacity
+    history.pin(950)
+    history.append(samples[:200])
+    assert history.begin == 950 and len(history) == 250
+    history.discard_before(1100)
+    history.pin(None)
+    assert history.begin == 1100
+
+    # a chunk longer than the capacity is kept whole
+    history.append(samples[:300])
+    assert len(history) == 300
+
+    history.reset()
+    history.append(np.array([-(1 << 15), 1 << 14], dtype=np.int16))
+    assert history.view(0, 2).tolist() == [-1.0, 0.5]
+
+
+def test_two_pass_segments(step=9600, max_length_ms=20000, lookback_ms=3000):
+    """the segments of the former list history and of AudioHistory are equal"""
+    speech, _ = AudioReader.read_wav_file("test/vad_example.wav")
+    vad = FSMNVadOnline()
+    vad.vad.vad_opts.max_single_segment_time = max_length_ms
+    history = AudioHistory((max_length_ms + lookback_ms) * 16)
+    frames = []
+    vad_pre_idx = 0
+    num_segments = 0
+    peak_samples = 0
+    for offset in range(0, len(speech), step):
+        chunk = speech[offset : offset + step]
+        is_final = offset + step >= len(speech)
+        frames.extend(chunk.tolist())
+        history.append(chunk)
+        vad_pre_idx += len(chunk)
+        peak_samples = max(peak_samples, len(frames))
+        for start, end in vad.segments_online(chunk, is_final=is_final):
+            if start != -1:
+                start_frame = start * 16
+                frames = frames[start_frame + len(frames) - vad_pre_idx :]
+                history.discard_before(start_frame)
+                history.pin(start_frame)
+            if end != -1:
+                end_frame = end * 16
+                end = end_frame + len(frames) - vad_pre_idx
+                expected = np.array(frames[:end])
+                frames = frames[end:]
+                data = history.view(history.begin, end_frame)
+                assert np.array_equal(data, expected)
+                history.discard_before(end_frame)
+                history.pin(None)
+                num_segments += 1
+        assert history.nbytes() <= (max_length_ms + lookback_ms) * 16 * 2 * 4
+    assert num_segments
+    # a list holds a pointer and a float object of 24 bytes per sample
+    logging.info(
+        f"{num_segments} segments, the history buffer holds {history.nbytes()} "
+        f"bytes, the list held up to {peak_samples * 32} bytes"
+    )
+
+
+if __name__ == "__main__":
+    test_history()
+    test_two_pass_segments()
+    logging.info("audio history test passed")
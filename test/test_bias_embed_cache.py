@@ -0,0 +1,92 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_bias_embed_cache.py
+# @Time      :2026/10/18 22:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+
+import numpy as np
+
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+class FakeConverter:
+    def tokens2ids(self, tokens):
+        return [ord(token) % 100 + 3 for token in tokens]
+
+
+class FakeContextualModel:
+    """embedding of each hot word prefix, counts the runs"""
+
+    def __init__(self):
+        self.runs = 0
+
+    def run(self, output_names, input_dict):
+        self.runs += 1
+        [hot_words] = input_dict.values()
+        # [max length, hot words, dim]
+        return [np.cumsum(hot_words.T[:, :, None] * np.ones(4), axis=0)]
+
+
+class FakeSession:
+    def __init__(self):
+        self.contextual_model = FakeContextualModel()
+
+    def get_contextual_model_input_names(self):
+        return ["hotword"]
+
+
+def fake_model(hot_words_cache_size=2):
+    """the hot word part of the offline model, without the model files"""
+    cls = ParaformerOfflineModel.__wrapped__
+    model = cls.__new__(cls)
+    model.converter = FakeConverter()
+    model.ort_infer = FakeSession()
+    model.reset_bias_embed_cache(hot_words_cache_size)
+    return model
+
+
+def test_bias_embed_cache():
+    model = fake_model(hot_words_cache_size=2)
+    contextual = model.ort_infer.contextual_model
+    # the embedding without hot words is computed once at init
+    assert contextual.runs == 1
+    empty = model.get_bias_embed("")
+    assert model.get_bias_embed(None) is empty
+    assert model.get_bias_embed("  ") is empty
+    assert empty.shape == (1, 2, 4) and not empty.flags.writeable
+    assert contextual.runs == 1
+
+    # hits return the same read only array
+    first = model.get_bias_embed("魔搭 阿里")
+    assert first.shape == (1, 3, 4) and not first.flags.writeable
+    assert model.get_bias_embed(" 魔搭 阿里 ") is first
+    assert contextual.runs == 2
+    assert model.bias_embed_cache.cache_info().hits == 1
+    assert np.array_equal(first, model.compute_bias_embed(("魔搭", "阿里")))
+    # the direct call is not a miss of the cache
+    contextual.runs -= 1
+
+    # the least recently used hot words are evicted at hot_words_cache_size
+    model.get_bias_embed("达摩")
+    model.get_bias_embed("魔搭 阿里")
+    model.get_bias_embed("通义")
+    assert contextual.runs == 4
+    assert model.bias_embed_cache.cache_info().currsize == 2
+    model.get_bias_embed("魔搭 阿里")
+    assert contextual.runs == 4
+    model.get_bias_embed("达摩")
+    assert contextual.runs == 5
+    # the empty entry is kept out of the lru
+    assert model.get_bias_embed("") is empty
+    assert contextual.runs == 5
+
+
+if __name__ == "__main__":
+    test_bias_embed_cache()
+    logging.info("bias embed cache test passed")
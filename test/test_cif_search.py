@@ -0,0 +1,149 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_cif_search.py
+# @Time      :2026/10/18 10:12
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import timeit
+
+import numpy as np
+
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOnlineModel
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def cif_search_loop(model, hidden, alphas, cache=None):
+    """reference frame by frame implementation of cif search"""
+    batch_size, len_time, hidden_size = hidden.shape
+    token_length = []
+    list_fires = []
+    list_frames = []
+    cache_alphas = []
+    cache_hiddens = []
+    alphas[:, : model.chunk_size[0]] = 0.0
+    alphas[:, sum(model.chunk_size[:2]) :] = 0.0
+    if cache is not None and "cif_alphas" in cache and "cif_hidden" in cache:
+        hidden = np.concatenate((cache["cif_hidden"], hidden), axis=1)
+        alphas = np.concatenate((cache["cif_alphas"], alphas), axis=1)
+    if cache is not None and "last_chunk" in cache and cache["last_chunk"]:
+        tail_hidden = np.zeros((batch_size, 1, hidden_size)).astype(np.float32)
+        tail_alphas = np.array([[model.tail_threshold]]).astype(np.float32)
+        tail_alphas = np.tile(tail_alphas, (batch_size, 1))
+        hidden = np.concatenate((hidden, tail_hidden), axis=1)
+        alphas = np.concatenate((alphas, tail_alphas), axis=1)
+
+    len_time = alphas.shape[1]
+    for b in range(batch_size):
+        integrate = 0.0
+        frames = np.zeros(hidden_size).astype(np.float32)
+        list_frame = []
+        list_fire = []
+        for t in range(len_time):
+            alpha = alphas[b][t]
+            if alpha + integrate < model.cif_threshold:
+                integrate += alpha
+                list_fire.append(integrate)
+                frames += alpha * hidden[b][t]
+            else:
+                frames += (model.cif_threshold - integrate) * hidden[b][t]
+                list_frame.append(frames)
+                integrate += alpha
+                list_fire.append(integrate)
+                integrate -= model.cif_threshold
+                frames = integrate * hidden[b][t]
+
+        cache_alphas.append(integrate)
+        if integrate > 0.0:
+            cache_hiddens.append(frames / integrate)
+        else:
+            cache_hiddens.append(frames)
+
+        token_length.append(len(list_frame))
+        list_fires.append(list_fire)
+        list_frames.append(list_frame)
+
+    max_token_len = max(token_length)
+    list_ls = []
+    for b in range(batch_size):
+        pad_frames = np.zeros((max_token_len - token_length[b], hidden_size)).astype(
+            np.float32
+        )
+        if token_length[b] == 0:
+            list_ls.append(pad_frames)
+        else:
+            list_ls.append(np.concatenate((list_frames[b], pad_frames), axis=0))
+
+    # carry-over laid out as [batch size, 1, ...] so that batches can be chained
+    cache["cif_alphas"] = np.stack(cache_alphas, axis=0)[:, None]
+    cache["cif_hidden"] = np.stack(cache_hiddens, axis=0)[:, None, :]
+
+    return np.stack(list_ls, axis=0).astype(np.float32), np.stack(
+        token_length, axis=0
+    ).astype(np.int32)
+
+
+def build_model(chunk_size=(5, 10, 5)):
+    # cif search only needs the predictor config, skip loading the onnx sessions
+    model = ParaformerOnlineModel.__new__(ParaformerOnlineModel)
+    model.chunk_size = list(chunk_size)
+    model.cif_threshold = 1.0
+    model.tail_threshold = 0.45
+    return model
+
+
+def random_chunks(batch_size, num_chunks, hidden_size=512, seed=0):
+    rng = np.random.default_rng(seed)
+    for _ in range(num_chunks):
+        hidden = rng.standard_normal((batch_size, 20, hidden_size)).astype(np.float32)
+        alphas = rng.uniform(0, 0.6, (batch_size, 20)).astype(np.float32)
+        yield hidden, alphas
+
+
+def test_equivalence(batch_size=4, num_chunks=50):
+    model = build_model()
+    cache_loop = {}
+    cache_vec = {}
+    for i, (hidden, alphas) in enumerate(random_chunks(batch_size, num_chunks)):
+        last_chunk = i == num_chunks - 1
+        cache_loop["last_chunk"] = last_chunk
+        cache_vec["last_chunk"] = last_chunk
+        embeds_loop, lens_loop = cif_search_loop(
+            model, hidden.copy(), alphas.copy(), cache_loop
+        )
+        embeds_vec, lens_vec = model.cif_search(hidden.copy(), alphas.copy(), cache_vec)
+        assert np.array_equal(lens_loop, lens_vec), f"token length differs at {i}"
+        assert np.array_equal(embeds_loop, embeds_vec), f"embeds differ at {i}"
+        assert np.array_equal(cache_loop["cif_alphas"], cache_vec["cif_alphas"])
+        assert np.array_equal(cache_loop["cif_hidden"], cache_vec["cif_hidden"])
+    logging.info(f"cif search is bit-compatible over {num_chunks} chunks")
+
+
+def benchmark(batch_size, number=200):
+    model = build_model()
+    hidden, alphas = next(random_chunks(batch_size, 1))
+    cache = {}
+    loop_time = timeit.timeit(
+        lambda: cif_search_loop(model, hidden.copy(), alphas.copy(), cache),
+        number=number,
+    )
+    cache = {}
+    vec_time = timeit.timeit(
+        lambda: model.cif_search(hidden.copy(), alphas.copy(), cache),
+        number=number,
+    )
+    logging.info(
+        f"batch size {batch_size}: loop {loop_time / number * 1000:.3f} ms, "
+        f"vectorized {vec_time / number * 1000:.3f} ms, "
+        f"speedup {loop_time / vec_time:.2f}x"
+    )
+
+
+if __name__ == "__main__":
+    test_equivalence(batch_size=1)
+    test_equivalence(batch_size=8)
+    for batch_size in (1, 8, 32):
+        benchmark(batch_size)
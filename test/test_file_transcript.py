@@ -5,7 +5,7 @@
 # @Email     :lovemefan@outlook.com
 import logging
 
-from paraformer import AsrAllInOne, AudioReader
+from paraformer import AsrAllInOne
 
 logging.basicConfig(
     level=logging.INFO,
@@ -15,8 +15,6 @@ logging.basicConfig(
 if __name__ == "__main__":
     logging.info("Testing online asr")
     wav_path = "test/vad_example.wav"
-    speech, sample_rate = AudioReader.read_wav_file(wav_path)
-
     model = AsrAllInOne(
         mode="file_transcription",
         speaker_verification=True,
@@ -26,7 +24,19 @@ if __name__ == "__main__":
         vad_speech_max_length=10000,
     )
 
-    results = model.file_transcript(speech)
+    # the wav file is memory-mapped and fed to vad block by block
+    results = model.file_transcript(wav_path)
 
+    results = list(results)
     for i in results:
         logging.info(i)
+
+    logging.info("Testing pipelined file transcription")
+    pipelined = list(
+        model.file_transcript_pipelined(
+            wav_path, asr_batch_size=4, asr_workers=2, punc_workers=2
+        )
+    )
+    assert [(r["text"], r["time_stamp"]) for r in pipelined] == [
+        (r["text"], r["time_stamp"]) for r in results
+    ]
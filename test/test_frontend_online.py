@@ -0,0 +1,66 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_frontend_online.py
+# @Time      :2026/10/18 14:05
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import timeit
+
+import numpy as np
+
+from paraformer.runtime.python.utils.audioHelper import AudioReader
+from paraformer.runtime.python.utils.preprocess import WavFrontendOnline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+# vad and online asr frontend config, no dither so that the features are deterministic
+frontend_confs = {
+    "vad": {"lfr_m": 5, "lfr_n": 1},
+    "asr": {"lfr_m": 7, "lfr_n": 6},
+}
+
+
+def extract_online(frontend, speech, step):
+    feats = []
+    waveform_len = 0
+    for offset in range(0, len(speech), step):
+        chunk = speech[None, offset : offset + step]
+        is_final = offset + step >= len(speech)
+        feat, feat_len = frontend.extract_fbank(
+            chunk, np.array([chunk.shape[1]]), is_final
+        )
+        if feat.size:
+            feats.append(feat[0])
+            waveform_len += frontend.get_waveforms().shape[1]
+    return np.concatenate(feats), waveform_len
+
+
+def test_chunk_size_invariance(speech):
+    for name, conf in frontend_confs.items():
+        frontend = WavFrontendOnline(dither=0.0, **conf)
+        whole, _ = extract_online(frontend, speech, len(speech))
+        for step in (160, 1600, 9600, 12345):
+            feats, waveform_len = extract_online(frontend, speech, step)
+            assert np.array_equal(whole, feats), f"{name} feats differ at step {step}"
+            assert waveform_len > 0
+        logging.info(f"{name} frontend gives the same features for any chunk size")
+
+
+def benchmark(speech, step=9600, number=5):
+    for name, conf in frontend_confs.items():
+        frontend = WavFrontendOnline(dither=0.0, **conf)
+        cost = timeit.timeit(
+            lambda: extract_online(frontend, speech, step), number=number
+        )
+        logging.info(
+            f"{name} frontend: rtf {cost / number / (len(speech) / 16000):.5f}"
+        )
+
+
+if __name__ == "__main__":
+    speech, sample_rate = AudioReader.read_wav_file("test/vad_example.wav")
+    test_chunk_size_invariance(speech)
+    benchmark(speech)
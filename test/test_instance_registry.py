@@ -0,0 +1,107 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_instance_registry.py
+# @Time      :2026/10/18 14:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import gc
+import logging
+import threading
+import time
+
+from paraformer.runtime.python.utils.singleton import InstanceRegistry
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+registry = InstanceRegistry()
+
+
+class Session:
+    created = 0
+
+    def __init__(self, model_file, intra_op_num_threads=4):
+        Session.created += 1
+        self.model_file = model_file
+        self.intra_op_num_threads = intra_op_num_threads
+        time.sleep(0.05)
+
+
+class Model:
+    def __init__(self, model_dir, intra_op_num_threads=4):
+        self.session = registry.acquire(
+            Session, f"{model_dir}/model.onnx", intra_op_num_threads
+        )
+
+
+class Client:
+    def __init__(self, model_dir):
+        self.model = registry.acquire(Model, model_dir)
+        registry.release_on_collect(self, self.model)
+
+
+def test_keys():
+    a = registry.acquire(Session, "a.onnx")
+    assert registry.acquire(Session, "a.onnx", intra_op_num_threads=4) is a
+    assert registry.acquire(Session, model_file="a.onnx") is a
+    assert registry.acquire(Session, "a.onnx", 2) is not a
+    assert registry.acquire(Session, "b.onnx") is not a
+
+
+def test_concurrent_construction():
+    created = Session.created
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda k=k: results.append(registry.acquire(Session, k))
+        )
+        for k in ["c.onnx", "c.onnx", "d.onnx", "d.onnx"]
+    ]
+    start = time.time()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Session.created - created == 2
+    # two keys are constructed in parallel
+    assert time.time() - start < 0.09
+    assert len({id(r) for r in results}) == 2
+
+
+def test_eviction():
+    registry.clear()
+    registry.set_limits(max_instances=2)
+    client = Client("x")
+    session = client.model.session
+    assert registry.stats()[0]["refcount"] == 1
+
+    del client
+    gc.collect()
+    # released instances stay for reuse while under the limit
+    model = registry.acquire(Model, "x")
+    assert model.session is session
+    registry.release(model)
+
+    # the idle model is evicted first, and releases its session
+    registry.acquire(Session, "y.onnx")
+    names = [s["name"] for s in registry.stats()]
+    assert names == ["Session", "Session"], names
+    registry.acquire(Session, "z.onnx")
+    assert all(s["refcount"] == 1 for s in registry.stats())
+    assert registry.acquire(Model, "x").session is not session
+
+    registry.clear()
+    registry.set_limits(idle_timeout=0.01)
+    registry.release(registry.acquire(Session, "t.onnx"))
+    time.sleep(0.02)
+    registry.evict_idle()
+    assert registry.stats() == []
+    registry.set_limits()
+
+
+if __name__ == "__main__":
+    test_keys()
+    test_concurrent_construction()
+    test_eviction()
+    logging.info("instance registry test passed")
@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_io_binding.py
+# @Time      :2026/10/18 15:50
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from paraformer.runtime.python.utils.asrOrtInferRuntimeSession import (
+    AsrOnlineBaseOrtInferRuntimeSession,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+# the streaming vad model carries caches from chunk to chunk like the online
+# asr decoder, and is small enough to ship with the repo
+model_path = (
+    Path(__file__).resolve().parent.parent
+    / "paraformer"
+    / "onnx"
+    / "vad"
+    / "fsmnvad-online.onnx"
+)
+
+
+def init_cache():
+    return [np.zeros((1, 128, 19, 1), dtype=np.float32) for _ in range(4)]
+
+
+def test_equivalence(session, num_chunks=30):
+    rng = np.random.default_rng(0)
+    cache_run = init_cache()
+    cache_binding = init_cache()
+    buffers = {}
+    for i in range(num_chunks):
+        frames = 10 if i % 4 else 6
+        speech = rng.standard_normal((1, frames, 400)).astype(np.float32)
+        expected = session([speech] + cache_run)
+        cache_run = expected[1:]
+        outputs = session.run_with_binding([speech] + cache_binding, buffers)
+        # the output buffers are overwritten by the next run, keep a copy
+        cache_binding = [item.copy() for item in outputs[1:]]
+        for a, b in zip(expected, outputs):
+            assert np.array_equal(a, b), f"outputs differ at chunk {i}"
+
+    # one set of buffers per input shape signature, reused afterwards
+    assert len(buffers["outputs"]) == 2
+    outputs = session.run_with_binding([speech] + cache_binding, buffers)
+    assert (
+        outputs is buffers["outputs"][tuple(x.shape for x in [speech] + cache_binding)]
+    )
+    logging.info(f"io binding is identical over {num_chunks} chunks")
+
+
+def test_bounded_buffers(session, max_signatures=3):
+    # like the decoder, whose outputs change shape with the token count
+    rng = np.random.default_rng(1)
+    cache = init_cache()
+    buffers = {}
+    for frames in [3, 4, 5, 6, 7, 3, 7, 4, 5, 3]:
+        speech = rng.standard_normal((1, frames, 400)).astype(np.float32)
+        expected = session([speech] + cache)
+        outputs = session.run_with_binding([speech] + cache, buffers, max_signatures)
+        for a, b in zip(expected, outputs):
+            assert np.array_equal(a, b), f"outputs differ at {frames} frames"
+        assert len(buffers["outputs"]) <= max_signatures
+    # the least recently used signatures were dropped
+    kept = [signature[0][1] for signature in buffers["outputs"]]
+    assert kept == [7, 4, 5, 3][-max_signatures:], kept
+
+
+def benchmark(session, number=1000):
+    speech = np.random.default_rng(0).standard_normal((1, 10, 400)).astype(np.float32)
+    inputs = [speech] + init_cache()
+    buffers = {}
+    run_time = timeit.timeit(lambda: session(inputs), number=number)
+    binding_time = timeit.timeit(
+        lambda: session.run_with_binding(inputs, buffers), number=number
+    )
+    logging.info(
+        f"run {run_time / number * 1e6:.1f} us, "
+        f"io binding {binding_time / number * 1e6:.1f} us per chunk"
+    )
+
+
+if __name__ == "__main__":
+    session = AsrOnlineBaseOrtInferRuntimeSession(str(model_path))
+    test_equivalence(session)
+    test_bounded_buffers(session)
+    benchmark(session)
@@ -0,0 +1,37 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_lazy_import.py
+# @Time      :2026/10/18 14:45
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import sys
+import time
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+heavy_modules = ["onnxruntime", "jieba", "kaldi_native_fbank"]
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    import paraformer
+
+    logging.info(f"import paraformer use {(time.perf_counter() - start) * 1000} ms")
+    for module in heavy_modules:
+        assert module not in sys.modules, f"{module} is imported by the package"
+
+    # speaker verification used to build a session at import time
+    from paraformer import AsrAllInOne, SpeakerVerificationInfer
+    from paraformer.runtime.python.utils.singleton import get_all_instance
+
+    assert not get_all_instance(), "models are constructed at import time"
+    assert "jieba" not in sys.modules
+
+    # vad only needs its own session
+    vad = paraformer.FSMNVad()
+    segments = vad.segments_offline("test/vad_example.wav")
+    assert "jieba" not in sys.modules
+    logging.info(f"vad segments: {segments}")
+    logging.info(f"startup report:\n{paraformer.startup_report()}")
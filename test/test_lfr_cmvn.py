@@ -0,0 +1,126 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_lfr_cmvn.py
+# @Time      :2026/10/18 15:20
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import timeit
+
+import numpy as np
+
+from paraformer.runtime.python.utils.audioHelper import AudioReader
+from paraformer.runtime.python.utils.preprocess import WavFrontend, WavFrontendOnline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+frontend_confs = {
+    "vad": ("paraformer/onnx/vad/am.mvn", 5, 1),
+    "asr": ("paraformer/onnx/asr_offline/am.mvn", 7, 6),
+}
+
+
+def apply_lfr_loop(inputs, lfr_m, lfr_n):
+    """reference frame by frame implementation of offline lfr"""
+    LFR_inputs = []
+    T = inputs.shape[0]
+    T_lfr = int(np.ceil(T / lfr_n))
+    left_padding = np.tile(inputs[0], ((lfr_m - 1) // 2, 1))
+    inputs = np.vstack((left_padding, inputs))
+    T = T + (lfr_m - 1) // 2
+    for i in range(T_lfr):
+        if lfr_m <= T - i * lfr_n:
+            LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
+        else:
+            num_padding = lfr_m - (T - i * lfr_n)
+            frame = inputs[i * lfr_n :].reshape(-1)
+            for _ in range(num_padding):
+                frame = np.hstack((frame, inputs[-1]))
+            LFR_inputs.append(frame)
+    return np.vstack(LFR_inputs).astype(np.float32)
+
+
+def apply_lfr_online_loop(inputs, lfr_m, lfr_n, is_final):
+    """reference frame by frame implementation of online lfr"""
+    LFR_inputs = []
+    T = inputs.shape[0]
+    T_lfr = int(np.ceil((T - (lfr_m - 1) // 2) / lfr_n))
+    splice_idx = T_lfr
+    for i in range(T_lfr):
+        if lfr_m <= T - i * lfr_n:
+            LFR_inputs.append((inputs[i * lfr_n : i * lfr_n + lfr_m]).reshape(1, -1))
+        elif is_final:
+            num_padding = lfr_m - (T - i * lfr_n)
+            frame = (inputs[i * lfr_n :]).reshape(-1)
+            for _ in range(num_padding):
+                frame = np.hstack((frame, inputs[-1]))
+            LFR_inputs.append(frame)
+        else:
+            splice_idx = i
+            break
+    splice_idx = min(T - 1, splice_idx * lfr_n)
+    return np.vstack(LFR_inputs).astype(np.float32), splice_idx
+
+
+def apply_cmvn_tile(cmvn, inputs):
+    """reference cmvn with float64 tiled mean and variance rows"""
+    frame, dim = inputs.shape
+    means = np.tile(cmvn[0:1, :dim], (frame, 1))
+    vars = np.tile(cmvn[1:2, :dim], (frame, 1))
+    return ((inputs + means) * vars).astype(np.float32)
+
+
+def test_equivalence(fbank):
+    for name, (cmvn_file, lfr_m, lfr_n) in frontend_confs.items():
+        frontend = WavFrontend(cmvn_file=cmvn_file, lfr_m=lfr_m, lfr_n=lfr_n)
+        for length in (1, 2, 7, 100, 1001, len(fbank)):
+            feat = fbank[:length]
+            lfr = apply_lfr_loop(feat, lfr_m, lfr_n)
+            assert np.array_equal(lfr, frontend.apply_lfr(feat, lfr_m, lfr_n))
+            expected = apply_cmvn_tile(frontend.cmvn, lfr)
+            fused, fused_len = frontend.lfr_cmvn(feat)
+            assert fused.dtype == np.float32 and fused_len == expected.shape[0]
+            np.testing.assert_allclose(fused, expected, rtol=1e-6, atol=1e-6)
+            # write into a larger caller-provided buffer
+            out = np.empty((len(fbank), lfr_m * fbank.shape[1]), dtype=np.float32)
+            fused_out, _ = frontend.lfr_cmvn(feat, out=out)
+            assert np.shares_memory(fused_out, out)
+            assert np.array_equal(fused_out, fused)
+
+            for is_final in (False, True):
+                if length < lfr_m:
+                    continue
+                lfr, splice_idx = apply_lfr_online_loop(feat, lfr_m, lfr_n, is_final)
+                lfr_online, _, splice_idx_online = WavFrontendOnline.apply_lfr(
+                    feat, lfr_m, lfr_n, is_final
+                )
+                assert np.array_equal(lfr, lfr_online)
+                assert splice_idx == splice_idx_online
+        logging.info(f"{name} lfr and cmvn match the reference implementation")
+
+
+def benchmark(fbank, number=10):
+    for name, (cmvn_file, lfr_m, lfr_n) in frontend_confs.items():
+        frontend = WavFrontend(cmvn_file=cmvn_file, lfr_m=lfr_m, lfr_n=lfr_n)
+        loop_time = timeit.timeit(
+            lambda: apply_cmvn_tile(frontend.cmvn, apply_lfr_loop(fbank, lfr_m, lfr_n)),
+            number=number,
+        )
+        out = np.empty((len(fbank), lfr_m * fbank.shape[1]), dtype=np.float32)
+        fused_time = timeit.timeit(
+            lambda: frontend.lfr_cmvn(fbank, out=out), number=number
+        )
+        logging.info(
+            f"{name} {len(fbank)} frames: loop {loop_time / number * 1000:.2f} ms, "
+            f"fused {fused_time / number * 1000:.2f} ms, "
+            f"speedup {loop_time / fused_time:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    speech, sample_rate = AudioReader.read_wav_file("test/vad_example.wav")
+    fbank, _ = WavFrontend(dither=0.0).fbank(speech)
+    test_equivalence(fbank)
+    benchmark(fbank)
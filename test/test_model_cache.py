@@ -0,0 +1,169 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_model_cache.py
+# @Time      :2026/10/18 13:55
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from onnxruntime import GraphOptimizationLevel, InferenceSession, SessionOptions
+
+import paraformer.runtime.python.utils.modelCache as model_cache
+from paraformer.runtime.python.utils.modelCache import (
+    cpu_signature,
+    create_session,
+    find_model_shards,
+    merge_model_shards,
+    prune_cache,
+    read_model_shards,
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+model_path = (
+    Path(__file__).resolve().parent.parent
+    / "paraformer"
+    / "onnx"
+    / "vad"
+    / "fsmnvad-offline.onnx"
+)
+online_model_path = model_path.parent / "fsmnvad-online.onnx"
+
+
+def split_model(model: bytes, directory, num_shards=4):
+    shard_size = len(model) // num_shards + 1
+    files = []
+    for i in range(num_shards):
+        file = os.path.join(directory, f"model_quant_{i}.onnx")
+        with open(file, "wb") as f:
+            f.write(model[i * shard_size : (i + 1) * shard_size])
+        files.append(file)
+    # the loader sorts the shards
+    return files[::-1]
+
+
+def test_merge_model_shards():
+    model = model_path.read_bytes()
+    with tempfile.TemporaryDirectory() as directory:
+        shards = split_model(model, directory)
+        assert read_model_shards(shards) == model
+
+        cache_dir = os.path.join(directory, "cache")
+        time_start = time.time()
+        merged = merge_model_shards(shards, cache_dir)
+        logging.info(f"first merge use {time.time() - time_start} s")
+        assert isinstance(merged, str)
+        assert Path(merged).read_bytes() == model
+
+        time_start = time.time()
+        assert merge_model_shards(shards, cache_dir) == merged
+        logging.info(f"cached merge use {time.time() - time_start} s")
+
+        # a changed shard is merged again
+        with open(shards[0], "ab") as f:
+            f.write(b"\x00")
+        remerged = merge_model_shards(shards, cache_dir)
+        assert remerged != merged
+        assert Path(remerged).read_bytes() == model + b"\x00"
+
+        # the onnxruntime session loads the merged file
+        session = InferenceSession(merged, providers=["CPUExecutionProvider"])
+        logging.info(
+            f"inputs of merged model: {[i.name for i in session.get_inputs()]}"
+        )
+
+        # only the latest merged files and their refs are kept
+        merged_dir = os.path.join(cache_dir, "merged")
+        max_merged = model_cache._MAX_MERGED_MODELS
+        model_cache._MAX_MERGED_MODELS = 1
+        try:
+            with open(shards[0], "ab") as f:
+                f.write(b"\x00")
+            latest = merge_model_shards(shards, cache_dir)
+        finally:
+            model_cache._MAX_MERGED_MODELS = max_merged
+        entries = os.listdir(merged_dir)
+        assert [f for f in entries if f.endswith(".onnx")] == [os.path.basename(latest)]
+        assert len([f for f in entries if f.endswith(".ref")]) == 1
+        assert merge_model_shards(shards, cache_dir) == latest
+
+        # no shards is an error naming the model directory
+        empty_dir = os.path.join(directory, "empty")
+        os.makedirs(empty_dir)
+        try:
+            find_model_shards(empty_dir)
+            raise AssertionError("missing shards must be an error")
+        except FileNotFoundError as e:
+            assert empty_dir in str(e)
+        assert find_model_shards(directory) == sorted(shards)
+        try:
+            merge_model_shards([], cache_dir)
+            raise AssertionError("missing shards must be an error")
+        except FileNotFoundError:
+            pass
+
+
+def test_session_cache():
+    rng = np.random.default_rng(0)
+    inputs = {"speech": rng.standard_normal((1, 50, 400)).astype(np.float32)}
+    for i in range(4):
+        inputs[f"in_cache{i}"] = np.zeros((1, 128, 19, 1), dtype=np.float32)
+
+    sess_opt = SessionOptions()
+    sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+    expected = InferenceSession(str(online_model_path), sess_opt).run(None, inputs)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        time_start = time.time()
+        session = create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+        logging.info(f"first session use {time.time() - time_start} s")
+        assert sess_opt.optimized_model_filepath == ""
+        optimized = os.listdir(os.path.join(cache_dir, "optimized"))
+        assert len([f for f in optimized if f.endswith(".onnx")]) == 1
+
+        time_start = time.time()
+        cached = create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+        logging.info(f"cached session use {time.time() - time_start} s")
+        assert sess_opt.graph_optimization_level == (
+            GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+
+        for result in (session.run(None, inputs), cached.run(None, inputs)):
+            for a, b in zip(expected, result):
+                assert np.allclose(a, b, atol=1e-5)
+
+        # another optimization level or other options are another entry
+        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_BASIC
+        create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+        sess_opt.enable_mem_pattern = not sess_opt.enable_mem_pattern
+        create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+        optimized_dir = os.path.join(cache_dir, "optimized")
+        entries = [f for f in os.listdir(optimized_dir) if f.endswith(".onnx")]
+        assert len(entries) == 3
+        logging.info(f"cpu signature: {cpu_signature()[:60]}")
+
+        # a broken entry is dropped and saved again
+        broken = os.path.join(optimized_dir, max(entries))
+        for entry in entries:
+            with open(os.path.join(optimized_dir, entry), "wb") as f:
+                f.write(b"broken")
+        create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+        create_session(online_model_path, sess_opt, cache_dir=cache_dir)
+
+        # the least recently used entries are removed
+        os.utime(broken, (0, 0))
+        prune_cache(optimized_dir, ".onnx", 2)
+        entries = [f for f in os.listdir(optimized_dir) if f.endswith(".onnx")]
+        assert len(entries) == 2 and os.path.basename(broken) not in entries
+
+
+if __name__ == "__main__":
+    test_merge_model_shards()
+    test_session_cache()
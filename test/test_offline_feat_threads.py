@@ -0,0 +1,65 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_offline_feat_threads.py
+# @Time      :2026/10/18 23:10
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+from paraformer.runtime.python.utils.preprocess import WavFrontend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+# the cmvn and frontend config ship with the repo, the onnx models do not
+model_dir = (
+    Path(__file__).resolve().parent.parent / "paraformer" / "onnx" / "asr_offline"
+)
+
+
+def frontend_model():
+    """the feature part of the offline model, without the onnx sessions"""
+    with open(model_dir / "config.pkl", "rb") as f:
+        config = pickle.load(f)
+    cls = ParaformerOfflineModel.__wrapped__
+    model = cls.__new__(cls)
+    # no dither, so that the features of a waveform are always the same
+    model.frontend = WavFrontend(
+        cmvn_file=str(model_dir / "am.mvn"), dither=0.0, **config["frontend_conf"]
+    )
+    return model
+
+
+def test_extract_feat_threads(num_threads=8, num_audios=64):
+    model = frontend_model()
+    rng = np.random.default_rng(0)
+    # lengths differ so that a swapped extractor gives another frame count
+    audios = [
+        rng.standard_normal(int(rng.integers(4000, 48000))).astype(np.float32) * 0.1
+        for _ in range(num_audios)
+    ]
+    expected = [model.extract_feat(audio) for audio in audios]
+
+    with ThreadPoolExecutor(num_threads) as pool:
+        for _ in range(4):
+            results = list(pool.map(model.extract_feat, audios))
+            for (feats, feats_len), (expected_feats, expected_len) in zip(
+                results, expected
+            ):
+                assert feats_len == expected_len
+                assert np.array_equal(feats, expected_feats)
+    logging.info(
+        f"features of {num_audios} utterances from {num_threads} threads "
+        f"are identical to the serial run"
+    )
+
+
+if __name__ == "__main__":
+    test_extract_feat_threads()
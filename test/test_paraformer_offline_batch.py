@@ -0,0 +1,114 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_paraformer_offline_batch.py
+# @Time      :2026/10/18 17:30
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import time
+
+import numpy as np
+
+from paraformer import AudioReader, FSMNVad, ParaformerOffline
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+class FakeSession:
+    """
+    am scores of every utterance from its own frames only, so any padding
+    leaking into a result changes it, one token per 4 frames
+    """
+
+    vocab_size = 32
+
+    def run(self, feats, feats_length, bias_embed):
+        token_nums = (feats_length // 4).astype(np.int32)
+        am_scores = np.zeros(
+            (len(feats), token_nums.max(), self.vocab_size), np.float32
+        )
+        for row, length in enumerate(feats_length):
+            for k in range(token_nums[row]):
+                token = int(feats[row, k * 4 : (k + 1) * 4].sum() * 100)
+                am_scores[row, k, token % self.vocab_size] = 1
+        return [am_scores, token_nums]
+
+    def __call__(self, feats, feats_length, bias_embed):
+        return self.run(feats, feats_length, bias_embed)[0]
+
+
+def fake_model():
+    """the offline model over FakeSession, without the model files"""
+    cls = ParaformerOfflineModel.__wrapped__
+    model = cls.__new__(cls)
+    model.max_batch_frames = 6000
+    model.max_batch_size = 16
+    model.ort_infer = FakeSession()
+    model.no_hot_words_bias_embed = np.zeros((1, 1, 8), dtype=np.float32)
+    model.extract_feat = lambda audio: (
+        audio[: len(audio) // 160 * 160].reshape(-1, 160)[:, :8],
+        np.array(len(audio) // 160, dtype=np.int32),
+    )
+    model.decoder_with_greedy_search = lambda am_score: [
+        " ".join(str(token) for token in am_score.argmax(axis=-1))
+    ]
+    return model
+
+
+def test_fake_session():
+    model = fake_model()
+    rng = np.random.default_rng(0)
+    # an empty utterance, a short one without tokens and mixed lengths
+    lengths = [0, 320, 16000, 4000, 64000, 800, 24000, 16000, 9600, 48000]
+    audios = [rng.standard_normal(n).astype(np.float32) for n in lengths]
+    expected = [model.infer(audio)[0] for audio in audios]
+    for max_batch_size, max_batch_frames in ((1, 6000), (3, 6000), (16, 800)):
+        results = model.infer_batch(
+            audios, max_batch_size=max_batch_size, max_batch_frames=max_batch_frames
+        )
+        assert results == expected, (max_batch_size, max_batch_frames)
+
+    frames = [n // 160 for n in lengths]
+    batches = model.bucket_by_length(frames, 800, 3)
+    assert sorted(i for batch in batches for i in batch) == list(range(1, 10))
+    for batch in batches:
+        assert len(batch) <= 3
+        assert len(batch) == 1 or len(batch) * frames[batch[0]] <= 800
+        assert frames[batch[0]] == max(frames[i] for i in batch)
+
+
+def test_offline_batch():
+    logging.info("Testing batched offline asr")
+    wav_path = "test/vad_example.wav"
+    speech, sample_rate = AudioReader.read_wav_file(wav_path)
+    model = ParaformerOffline()
+    vad = FSMNVad()
+
+    segments = [
+        speech[start * 16 : end * 16] for start, end in vad.segments_offline(speech)
+    ]
+
+    start = time.time()
+    expected = [model.infer_offline(segment) for segment in segments]
+    logging.info(f"{len(segments)} segments one by one use {time.time() - start} s")
+
+    for max_batch_size in (4, 16):
+        start = time.time()
+        results = model.infer_offline_batch(segments, max_batch_size=max_batch_size)
+        logging.info(
+            f"{len(segments)} segments in batches of {max_batch_size} "
+            f"use {time.time() - start} s"
+        )
+        for one, batched in zip(expected, results):
+            assert one == batched, f"batched result differs: {one} / {batched}"
+
+    for text in results:
+        logging.info(text)
+
+
+if __name__ == "__main__":
+    test_fake_session()
+    test_offline_batch()
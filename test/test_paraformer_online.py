@@ -12,27 +12,26 @@ logging.basicConfig(
     format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
 )
 
-if __name__ == "__main__":
-    logging.info("Testing online asr")
-    wav_path = "test/P9_0002.wav"
-    speech, sample_rate = AudioReader.read_wav_file(wav_path)
-    speech_length = speech.shape[0]
-    sample_offset = 0
-    step = 10 * 960
-    model = ParaformerOnline()
+
+def stream(model, speech, step=10 * 960, warmup_at=None):
     final_result = ""
-    for sample_offset in range(
-        0, speech_length, min(step, speech_length - sample_offset)
-    ):
-        if sample_offset + step >= speech_length - 1:
-            step = speech_length - sample_offset
-            is_final = True
-        else:
-            is_final = False
+    for i, offset in enumerate(range(0, len(speech), step)):
+        if i == warmup_at:
+            # a warmup during the stream keeps its state
+            logging.info(f"warmup times: {model.warmup()}")
         rec_result = model.infer_online(
-            speech[sample_offset : sample_offset + step], is_final=is_final
+            speech[offset : offset + step], is_final=offset + step >= len(speech)
         )
         if len(rec_result) > 0:
             final_result += rec_result
         logging.info(rec_result)
+    return final_result
+
+
+if __name__ == "__main__":
+    logging.info("Testing online asr")
+    wav_path = "test/P9_0002.wav"
+    speech, sample_rate = AudioReader.read_wav_file(wav_path)
+    final_result = stream(ParaformerOnline(), speech)
     logging.info(final_result)
+    assert stream(ParaformerOnline(), speech, warmup_at=3) == final_result
@@ -0,0 +1,127 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_paraformer_online_batch.py
+# @Time      :2026/10/18 14:05
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from paraformer import AudioReader, ParaformerOnline, ParaformerOnlineMultiplexer
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOnlineModel
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def split_chunks(speech, step=10 * 960):
+    speech_length = speech.shape[0]
+    for sample_offset in range(0, speech_length, step):
+        is_final = sample_offset + step >= speech_length - 1
+        if is_final:
+            yield speech[sample_offset:], True
+            break
+        yield speech[sample_offset : sample_offset + step], False
+
+
+def fake_model(name, encoder, decoder, chunk_size=(5, 10, 5), fail=False):
+    """online model without sessions, infer_batch tags each result with `name`"""
+    model = ParaformerOnlineModel.__new__(ParaformerOnlineModel)
+    model.ort_encoder_infer = encoder
+    model.ort_decoder_infer = decoder
+    model.name = name
+    model.chunk_size = list(chunk_size)
+    model.batches = []
+
+    def infer_batch(feats_list, caches):
+        if fail:
+            raise RuntimeError(f"{name} failed")
+        model.batches.append(len(feats_list))
+        return [[{"preds": name}] for _ in feats_list]
+
+    model.infer_batch = infer_batch
+    return model
+
+
+def test_mixed_models():
+    encoder, decoder = object(), object()
+    first = fake_model("first", encoder, decoder)
+    # same sessions, batched with the first one
+    shared = fake_model("shared", encoder, decoder)
+    other = fake_model("other", object(), decoder)
+    chunk = fake_model("chunk", encoder, decoder, chunk_size=(0, 10, 5))
+    broken = fake_model("broken", object(), object(), fail=True)
+    assert first.batch_key == shared.batch_key
+    assert len({m.batch_key for m in (first, other, chunk, broken)}) == 4
+
+    # all jobs reach the worker within one wait window
+    multiplexer = ParaformerOnlineMultiplexer(max_batch_size=16, max_wait_ms=200)
+    models = [first, shared, other, chunk, broken] * 2
+    futures = [
+        multiplexer.submit(model, (np.zeros((1, 20, 4)), False), SimpleNamespace())
+        for model in models
+    ]
+    for model, future in zip(models, futures):
+        if model is broken:
+            # a failing model only fails its own streams
+            assert isinstance(future.exception(timeout=5), RuntimeError)
+        else:
+            expected = "first" if model is shared else model.name
+            assert future.result(timeout=5) == [{"preds": expected}]
+    assert first.batches == [4] and shared.batches == []
+    assert other.batches == [2] and chunk.batches == [2]
+
+
+def transcribe(model, speech):
+    result = ""
+    for chunk, is_final in split_chunks(speech):
+        result += model.infer_online(chunk, is_final=is_final)
+    return result
+
+
+if __name__ == "__main__":
+    test_mixed_models()
+
+    wav_path = "test/P9_0002.wav"
+    speech, sample_rate = AudioReader.read_wav_file(wav_path)
+    num_streams = 8
+
+    start = time.time()
+    expected = transcribe(ParaformerOnline(), speech)
+    logging.info(f"single stream: {expected}, use {time.time() - start} s")
+
+    # streams driven by their own threads, chunks are batched by the worker
+    multiplexer = ParaformerOnlineMultiplexer(
+        max_batch_size=num_streams, max_wait_ms=20
+    )
+    results = [None] * num_streams
+
+    def run(idx):
+        results[idx] = transcribe(ParaformerOnline(multiplexer=multiplexer), speech)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(num_streams)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    logging.info(f"{num_streams} threaded streams use {time.time() - start} s")
+
+    # streams driven from one thread
+    streams = [ParaformerOnline(multiplexer=multiplexer) for _ in range(num_streams)]
+    texts = [""] * num_streams
+    start = time.time()
+    for chunk, is_final in split_chunks(speech):
+        partials = multiplexer.infer_online_batch(
+            streams, [chunk] * num_streams, is_final
+        )
+        texts = [text + partial for text, partial in zip(texts, partials)]
+    logging.info(f"{num_streams} batched streams use {time.time() - start} s")
+
+    for text in results + texts:
+        logging.info(text)
@@ -0,0 +1,120 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_parallel_load.py
+# @Time      :2026/10/18 22:30
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import time
+from types import SimpleNamespace
+
+from paraformer.runtime.python import asr_all_in_one
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+LOAD_SECONDS = 0.2
+
+
+class SlowComponent:
+    """stands for a model, loading takes LOAD_SECONDS"""
+
+    def __init__(self, *args, **kwargs):
+        time.sleep(LOAD_SECONDS)
+        self.kwargs = kwargs
+
+
+class SlowVad(SlowComponent):
+    def __init__(self):
+        super().__init__()
+        self.vad = SimpleNamespace(vad_opts=SimpleNamespace())
+
+
+class BrokenComponent:
+    def __init__(self, *args, **kwargs):
+        time.sleep(LOAD_SECONDS / 2)
+        raise FileNotFoundError("model.onnx is not exist")
+
+
+def patch_loaders(**loaders):
+    """replace the component classes of asr_all_in_one, return the originals"""
+    originals = {name: getattr(asr_all_in_one, name) for name in loaders}
+    for name, loader in loaders.items():
+        setattr(asr_all_in_one, name, loader)
+    return originals
+
+
+SLOW_LOADERS = dict(
+    ParaformerOffline=SlowComponent,
+    ParaformerOnline=SlowComponent,
+    FSMNVadOnline=SlowVad,
+    CttPunctuator=SlowComponent,
+    SpeakerVerificationInfer=SlowComponent,
+)
+COMPONENTS = {"asr_offline", "asr_online", "vad", "punc", "sv"}
+
+
+def test_parallel_load():
+    originals = patch_loaders(**SLOW_LOADERS)
+    try:
+        start = time.perf_counter()
+        model = asr_all_in_one.AsrAllInOne("2pass", speaker_verification=True)
+        sequential = time.perf_counter() - start
+        assert set(model.load_times) == COMPONENTS
+        assert model.ready.done() and model.wait_ready() is model
+
+        start = time.perf_counter()
+        model = asr_all_in_one.AsrAllInOne(
+            "2pass", speaker_verification=True, parallel_load=True, wait_ready=False
+        )
+        returned = time.perf_counter() - start
+        assert not model.ready.done()
+        assert model.wait_ready(timeout=10) is model
+        parallel = time.perf_counter() - start
+        logging.info(
+            f"sequential load {sequential:.2f}s, parallel load {parallel:.2f}s, "
+            f"__init__ returned after {returned:.3f}s"
+        )
+        assert set(model.load_times) == COMPONENTS
+        assert all(t >= LOAD_SECONDS * 0.9 for t in model.load_times.values())
+        assert sequential >= len(COMPONENTS) * LOAD_SECONDS
+        assert parallel < 3 * LOAD_SECONDS
+        assert returned < LOAD_SECONDS
+        assert model.vad.vad.vad_opts.max_single_segment_time == 20000
+        assert model.punc.kwargs == {"online": True}
+    finally:
+        patch_loaders(**originals)
+
+
+def test_load_error():
+    originals = patch_loaders(**dict(SLOW_LOADERS, CttPunctuator=BrokenComponent))
+    try:
+        # the first load error is raised by __init__ when it waits
+        try:
+            asr_all_in_one.AsrAllInOne("2pass", parallel_load=True)
+            raise AssertionError("the load error must be raised")
+        except FileNotFoundError as e:
+            logging.info(f"expected error: {e}")
+
+        # or by the entry points, which wait for the components themselves
+        model = asr_all_in_one.AsrAllInOne(
+            "2pass", parallel_load=True, wait_ready=False
+        )
+        try:
+            model.online(None)
+            raise AssertionError("the load error must be raised")
+        except FileNotFoundError:
+            pass
+        assert isinstance(model.ready.exception(), FileNotFoundError)
+        # the other components are loaded
+        assert {"asr_offline", "asr_online", "vad"} <= set(model.load_times)
+        assert "punc" not in model.load_times
+    finally:
+        patch_loaders(**originals)
+
+
+if __name__ == "__main__":
+    test_parallel_load()
+    test_load_error()
+    logging.info("parallel load test passed")
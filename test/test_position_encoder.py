@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_position_encoder.py
+# @Time      :2026/10/18 22:20
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+
+import numpy as np
+
+from paraformer.runtime.python.utils.preprocess import SinusoidalPositionEncoderOnline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def forward_uncached(encoder, x, start_idx=0):
+    """the former implementation, encodes every position up to the chunk"""
+    batch_size, timesteps, input_dim = x.shape
+    positions = np.arange(1, timesteps + 1 + start_idx)[None, :]
+    position_encoding = encoder.encode(positions, input_dim, x.dtype)
+    return x + position_encoding[:, start_idx : start_idx + timesteps]
+
+
+def shared_table():
+    return SinusoidalPositionEncoderOnline._tables[(560, np.dtype(np.float32))]
+
+
+def test_position_encoder():
+    SinusoidalPositionEncoderOnline._tables.clear()
+    SinusoidalPositionEncoderOnline.set_max_cached_len(1024)
+    encoder = SinusoidalPositionEncoderOnline()
+    rng = np.random.default_rng(0)
+    try:
+        # the first table holds 256 positions, it doubles to 512 and 1024, the
+        # chunks past 1024 are encoded on the fly
+        for start_idx in (0, 10, 246, 250, 256, 500, 510, 1000, 1014, 1020, 4000):
+            for timesteps in (1, 10, 20):
+                x = rng.standard_normal((1, timesteps, 560)).astype(np.float32)
+                expected = forward_uncached(encoder, x, start_idx)
+                assert np.array_equal(encoder.forward(x, start_idx), expected), (
+                    start_idx,
+                    timesteps,
+                )
+        table = shared_table()
+        assert table.shape[1] == 1024
+
+        # the table is shared by the streams
+        other = SinusoidalPositionEncoderOnline()
+        other.forward(np.zeros((1, 10, 560), dtype=np.float32), 100)
+        assert shared_table() is table
+
+        # a lower cap trims the cached tables
+        SinusoidalPositionEncoderOnline.set_max_cached_len(300)
+        x = rng.standard_normal((1, 10, 560)).astype(np.float32)
+        for start_idx in (280, 295, 300):
+            expected = forward_uncached(encoder, x, start_idx)
+            assert np.array_equal(encoder.forward(x, start_idx), expected)
+        table = shared_table()
+        assert table.shape[1] == 300
+    finally:
+        SinusoidalPositionEncoderOnline.set_max_cached_len(8192)
+
+
+if __name__ == "__main__":
+    test_position_encoder()
+    logging.info("position encoder test passed")
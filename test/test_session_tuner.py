@@ -0,0 +1,117 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_session_tuner.py
+# @Time      :2026/10/18 16:50
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+from onnxruntime import GraphOptimizationLevel, InferenceSession, SessionOptions
+
+from paraformer.runtime.python.utils.modelCache import create_session
+from paraformer.runtime.python.utils.sessionTuner import (
+    apply_profile,
+    make_inputs,
+    profile_key,
+    profiles,
+    tune_model,
+    tuned_profile,
+)
+from paraformer.runtime.python.utils.threadPlanner import planner
+
+SPINNING_KEY = "session.intra_op.allow_spinning"
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+model_path = (
+    Path(__file__).resolve().parent.parent
+    / "paraformer"
+    / "onnx"
+    / "vad"
+    / "fsmnvad-online.onnx"
+)
+
+
+def test_make_inputs():
+    session = InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+    inputs = make_inputs(session, 60)
+    assert inputs["speech"].shape == (1, 60, 400)
+    assert inputs["in_cache0"].shape == (1, 128, 19, 1)
+    session.run(None, inputs)
+
+
+def test_tune_and_load():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["PARAFORMER_CACHE_DIR"] = cache_dir
+        profiles.reload()
+        assert tuned_profile(model_path) is None
+
+        profile = tune_model(model_path, "vad", length=60, runs=5, warmup=1)
+        logging.info(f"tuned profile: {profile}")
+        assert profile["latency_ms"] <= profile["default_latency_ms"]
+        # the threads are the share of the planner, not tuned alone
+        plan = planner.plan("vad")
+        assert profile["intra_op_num_threads"] == plan["intra_op_num_threads"]
+        assert profile["allow_spinning"] == plan["allow_spinning"]
+        profiles.reload()
+        assert tuned_profile(model_path) == profile
+
+        # the sessions loaded later use the saved profile
+        profiles.put(
+            profile_key(model_path),
+            dict(
+                profile,
+                intra_op_num_threads=2,
+                allow_spinning=True,
+                enable_mem_pattern=False,
+            ),
+        )
+        sess_opt = planner.apply(SessionOptions(), "vad")
+        sess_opt.graph_optimization_level = GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = sess_opt.intra_op_num_threads
+        options = create_session(model_path, sess_opt).get_session_options()
+        assert not options.enable_mem_pattern
+        # the planner keeps its threads and spinning
+        assert options.intra_op_num_threads == threads
+        assert options.get_session_config_entry(SPINNING_KEY) == "0"
+        # the options of the caller are left unchanged
+        assert sess_opt.enable_mem_pattern
+
+        # the tuned threads are used on request only
+        options = apply_profile(
+            sess_opt, profiles.get(profile_key(model_path)), use_tuned_threads=True
+        )
+        assert options.intra_op_num_threads == 2
+        assert options.get_session_config_entry(SPINNING_KEY) == "1"
+
+        # explicit threads win over the profile
+        sess_opt = planner.apply(SessionOptions(), "vad", 1)
+        options = apply_profile(
+            sess_opt, profiles.get(profile_key(model_path)), use_tuned_threads=True
+        )
+        assert options.intra_op_num_threads == 1
+        assert not options.enable_mem_pattern
+
+        # a profile is tuned for one core budget of the planner
+        planner.configure(profile="file")
+        assert tuned_profile(model_path) is None
+        planner.configure(profile="balanced")
+        assert tuned_profile(model_path) is not None
+
+        options = create_session(
+            model_path, SessionOptions(), use_tuned_profile=False
+        ).get_session_options()
+        assert options.enable_mem_pattern
+    del os.environ["PARAFORMER_CACHE_DIR"]
+    profiles.reload()
+
+
+if __name__ == "__main__":
+    test_make_inputs()
+    test_tune_and_load()
+    logging.info("session tuner test passed")
@@ -13,7 +13,7 @@ import time
 from jiwer import cer
 from tqdm import tqdm
 
-from paraformer import AudioReader, ParaformerOffline
+from paraformer import ParaformerOffline, WavReader
 
 _LOG_FILE_DIR = "logs"
 
@@ -69,9 +69,9 @@ def cal_cer(config):
     audio_time_total = 0
     transcript_time_total = 0
     for id, info in tqdm(transcripts.items()):
-        audio, sample_rate = AudioReader.read_wav_file(
-            os.path.join(input, info["path"])
-        )
+        # the wav is memory-mapped, only the float32 samples are held
+        with WavReader(os.path.join(input, info["path"])) as reader:
+            audio = reader[:]
         audio_time_total += len(audio) / 16000
 
         text = info["text"].replace(" ", "")
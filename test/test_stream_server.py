@@ -0,0 +1,168 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_stream_server.py
+# @Time      :2026/10/18 21:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import asyncio
+import hashlib
+import logging
+import pickle
+from pathlib import Path
+
+from paraformer import AudioReader
+from paraformer.runtime.python import asr_all_in_one
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+from paraformer.runtime.python.streamClient import (
+    StreamClient,
+    load_test,
+    load_test_report,
+    stream_audio,
+)
+from paraformer.runtime.python.streamServer import StreamServer
+from paraformer.runtime.python.utils.preprocess import WavFrontend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def finals_of(result):
+    return [(f["seq"], f["final"]) for f in result]
+
+
+class FeatureOffline:
+    """
+    offline asr whose transcript is the digest of the features of the real
+    frontend, the finals of concurrent streams share the one model
+    """
+
+    model = None
+
+    def __init__(self, *args, **kwargs):
+        if FeatureOffline.model is None:
+            model_dir = (
+                Path(__file__).resolve().parent.parent
+                / "paraformer"
+                / "onnx"
+                / "asr_offline"
+            )
+            with open(model_dir / "config.pkl", "rb") as f:
+                config = pickle.load(f)
+            cls = ParaformerOfflineModel.__wrapped__
+            model = cls.__new__(cls)
+            model.frontend = WavFrontend(
+                cmvn_file=str(model_dir / "am.mvn"),
+                dither=0.0,
+                **config["frontend_conf"],
+            )
+            FeatureOffline.model = model
+
+    def infer_offline(self, audio, hot_words=""):
+        feats, _ = self.model.extract_feat(audio)
+        return hashlib.sha1(feats.tobytes()).hexdigest()[:12]
+
+    def warmup(self):
+        return {}
+
+
+class FakeOnline:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def infer_online(self, chunk, is_final=False):
+        return ""
+
+    def reset_cache(self):
+        pass
+
+    def warmup(self):
+        return {}
+
+
+class FakePunctuator:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def punctuate(self, text):
+        return (text,)
+
+    def warmup(self):
+        return {}
+
+
+def test_concurrent_finals(connections=8, port=10097):
+    """the default final_workers run the finals of many connections at once"""
+    speech, _ = AudioReader.read_wav_file("test/vad_example.wav")
+    speech = speech[: 16000 * 30]
+    fakes = dict(
+        ParaformerOffline=FeatureOffline,
+        ParaformerOnline=FakeOnline,
+        CttPunctuator=FakePunctuator,
+    )
+    originals = {name: getattr(asr_all_in_one, name) for name in fakes}
+    for name, fake in fakes.items():
+        setattr(asr_all_in_one, name, fake)
+
+    async def main():
+        server = StreamServer(warmup=False)
+        await server.start(port=port)
+        serving = asyncio.ensure_future(server.serve_forever())
+        try:
+            expected = await stream_audio(speech, realtime=False, port=port)
+            report = await load_test(speech, connections, port=port)
+            return expected, report
+        finally:
+            serving.cancel()
+            await server.close()
+
+    try:
+        expected, report = asyncio.run(main())
+    finally:
+        for name, original in originals.items():
+            setattr(asr_all_in_one, name, original)
+    expected = finals_of(expected["finals"])
+    assert len(expected) > 1
+    assert all(finals_of(finals) == expected for finals in report["finals"])
+    logging.info(f"{connections} connections got the same {len(expected)} finals")
+
+
+def test_stream_server(connections=4, port=10096):
+    speech, _ = AudioReader.read_wav_file("test/P9_0002.wav")
+
+    async def main():
+        server = StreamServer(max_pending_chunks=2)
+        await server.start(port=port)
+        serving = asyncio.ensure_future(server.serve_forever())
+        try:
+            expected = await stream_audio(speech, realtime=False, port=port)
+            report = await load_test(speech, connections, port=port)
+            client = await StreamClient.connect(port=port)
+            await client.end()
+            try:
+                async for _ in client.results():
+                    pass
+                raise AssertionError("a stream without START must fail")
+            except RuntimeError as e:
+                logging.info(f"expected error: {e}")
+            finally:
+                await client.close()
+            return expected, report, dict(server.stats)
+        finally:
+            serving.cancel()
+            await server.close()
+
+    expected, report, stats = asyncio.run(main())
+    logging.info(load_test_report(report))
+    logging.info(stats)
+    expected = finals_of(expected["finals"])
+    assert expected and [seq for seq, _ in expected] == list(range(len(expected)))
+    # the batched streams get the finals of the single one
+    assert all(finals_of(finals) == expected for finals in report["finals"])
+    assert stats["finals"] == len(expected) * (connections + 1)
+
+
+if __name__ == "__main__":
+    test_concurrent_finals()
+    test_stream_server()
+    logging.info("stream server test passed")
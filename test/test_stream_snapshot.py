@@ -0,0 +1,235 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_stream_snapshot.py
+# @Time      :2026/10/18 18:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from paraformer import AsrAllInOne, AudioReader, FSMNVadOnline
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOnlineModel
+from paraformer.runtime.python.utils import snapshot
+from paraformer.runtime.python.utils.audioHelper import AudioHistory
+from paraformer.runtime.python.utils.preprocess import WavFrontendOnline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+asr_online_dir = os.path.join(project_dir, "paraformer", "onnx", "asr_online")
+
+
+def chunks_of(speech, step):
+    for start in range(0, len(speech), step):
+        yield speech[start : start + step], start + step >= len(speech)
+
+
+def test_format():
+    state = {
+        "array": np.arange(6, dtype=np.float32).reshape(2, 3),
+        "scalar": np.int64(7),
+        "list": [1, 2.5, None, True, "文本"],
+        "empty": np.zeros((1, 0), dtype=np.float32),
+        "decibel": [np.float32(-20.5), np.float32(3)],
+    }
+    restored = snapshot.loads(snapshot.dumps(state))
+    assert np.array_equal(restored["array"], state["array"])
+    assert restored["array"].flags.writeable
+    assert restored["scalar"] == 7 and restored["scalar"].dtype == np.int64
+    assert restored["list"] == state["list"]
+    assert restored["empty"].shape == (1, 0)
+    # numpy scalars keep their type
+    assert restored["decibel"] == state["decibel"]
+    assert all(v.dtype == np.float32 for v in restored["decibel"])
+
+    for data in (b"", b"PKL0" + bytes(16)):
+        try:
+            snapshot.loads(data)
+            raise AssertionError("a bad snapshot must be rejected")
+        except ValueError:
+            pass
+    try:
+        snapshot.dumps({"object": object()})
+        raise AssertionError("unregistered classes must be rejected")
+    except TypeError:
+        pass
+
+
+def test_vad_online(step=1600):
+    speech, _ = AudioReader.read_wav_file("test/vad_example.wav")
+    expected = []
+    vad = FSMNVadOnline()
+    for chunk, is_final in chunks_of(speech, step):
+        expected.extend(vad.segments_online(chunk, is_final=is_final))
+    assert expected
+
+    num_chunks = (len(speech) + step - 1) // step
+    for split in (1, num_chunks // 3, num_chunks // 2):
+        vad = FSMNVadOnline()
+        segments = []
+        for i, (chunk, is_final) in enumerate(chunks_of(speech, step)):
+            if i == split:
+                # move the live stream to a new instance
+                start = time.perf_counter()
+                data = vad.snapshot()
+                dump_time = time.perf_counter() - start
+                vad = FSMNVadOnline()
+                start = time.perf_counter()
+                vad.restore(data)
+                load_time = time.perf_counter() - start
+                logging.info(
+                    f"vad snapshot after {split * step / 16000:.1f}s: "
+                    f"{len(data)} bytes, dump {dump_time * 1000:.2f} ms, "
+                    f"restore {load_time * 1000:.2f} ms"
+                )
+            segments.extend(vad.segments_online(chunk, is_final=is_final))
+        assert segments == expected, split
+
+    # a stream loaded from the state of a live one runs on its own
+    source = FSMNVadOnline()
+    chunks = list(chunks_of(speech, step))
+    for chunk, is_final in chunks[: num_chunks // 2]:
+        source.segments_online(chunk, is_final=is_final)
+    copied = FSMNVadOnline()
+    copied.load_state_dict(source.state_dict())
+    rest = chunks[num_chunks // 2 :]
+    segments = [copied.segments_online(c, is_final=f) for c, f in rest]
+    assert segments == [source.segments_online(c, is_final=f) for c, f in rest]
+
+
+def test_frontend_online(step=9600):
+    with open(os.path.join(asr_online_dir, "config.pkl"), "rb") as file:
+        config = pickle.load(file)
+    cmvn_file = os.path.join(asr_online_dir, "am.mvn")
+    speech, _ = AudioReader.read_wav_file("test/a_cn_16k.wav")
+    speech = speech[: 16000 * 3]
+
+    def run(split=None):
+        frontend = WavFrontendOnline(
+            cmvn_file=cmvn_file, dither=0.0, **config["frontend_conf"]
+        )
+        outputs = []
+        for i, (chunk, is_final) in enumerate(chunks_of(speech, step)):
+            if i == split:
+                data = snapshot.dumps(frontend.state_dict())
+                frontend = WavFrontendOnline(
+                    cmvn_file=cmvn_file, dither=0.0, **config["frontend_conf"]
+                )
+                frontend.load_state_dict(snapshot.loads(data))
+            feats, _ = frontend.extract_fbank(
+                chunk[None, :], np.array([len(chunk)]), is_final
+            )
+            outputs.append(np.array(feats))
+            waveforms = frontend.get_waveforms()
+            outputs.append(None if waveforms is None else np.array(waveforms))
+        return outputs
+
+    expected = run()
+    for split in (1, 2, 3):
+        for output, target in zip(run(split), expected):
+            assert (output is None and target is None) or np.array_equal(
+                output, target
+            ), split
+
+
+def test_asr_stream_state():
+    # the stream state only needs the model dims, skip loading the onnx sessions
+    model = ParaformerOnlineModel.__new__(ParaformerOnlineModel)
+    model.chunk_size = [5, 10, 5]
+    model.feats_dims = 560
+    model.encoder_output_size = 512
+    model.fsmn_layer = 16
+    model.fsmn_dims = 512
+    model.fsmn_lorder = 10
+    rng = np.random.default_rng(0)
+    state = model.new_state()
+    state.start_idx = 30
+    state.feats[:] = rng.standard_normal(state.feats.shape)
+    for cache in state.decoder_fsmn:
+        cache[:] = rng.standard_normal(cache.shape)
+    state.io_buffers = {"binding": object()}
+
+    start = time.perf_counter()
+    data = snapshot.dumps(state.state_dict())
+    dump_time = time.perf_counter() - start
+    restored = model.new_state()
+    start = time.perf_counter()
+    restored.load_state_dict(snapshot.loads(data))
+    load_time = time.perf_counter() - start
+    logging.info(
+        f"asr online snapshot: {len(data)} bytes for {state.nbytes()} bytes of "
+        f"state, dump {dump_time * 1000:.2f} ms, restore {load_time * 1000:.2f} ms"
+    )
+    assert restored.start_idx == 30 and restored.io_buffers is None
+    assert np.array_equal(restored.feats, state.feats)
+    for cache, target in zip(restored.decoder_fsmn, state.decoder_fsmn):
+        assert np.array_equal(cache, target)
+
+    # a state loaded directly shares no buffer with its source
+    copied = model.new_state()
+    buffers = copied.decoder_fsmn[0]
+    copied.load_state_dict(state.state_dict())
+    assert copied.feats is not state.feats
+    assert copied.decoder_fsmn[0] is buffers
+    copied.feats[:] = 0
+    copied.decoder_fsmn[0][:] = 0
+    assert np.array_equal(restored.feats, state.feats)
+    assert np.array_equal(restored.decoder_fsmn[0], state.decoder_fsmn[0])
+
+    model.chunk_size = [8, 8, 4]
+    try:
+        model.new_state().load_state_dict(snapshot.loads(data))
+        raise AssertionError("a state of another chunk size must be rejected")
+    except ValueError:
+        pass
+
+
+def fake_dialogue_stream():
+    """the 2pass buffers of an AsrAllInOne without its models"""
+    model = AsrAllInOne.__new__(AsrAllInOne)
+    model.ready = Future()
+    model.ready.set_result(None)
+    model.mode = "2pass"
+    model.audio_history = AudioHistory(16000)
+    model.start_frame = model.end_frame = model.vad_pre_idx = model.offset = 0
+    model.speech_start = False
+    model.final_seq = 0
+    model.frames = []
+    model.frames_asr_online = []
+    model.frames_asr_offline = []
+    model._final_tail = None
+    model._final_lock = threading.Lock()
+    return model
+
+
+def test_dialogue_state():
+    rng = np.random.default_rng(0)
+    model = fake_dialogue_stream()
+    chunks = [rng.standard_normal(960).astype(np.float32) for _ in range(5)]
+    model.frames = list(chunks)
+    model.frames_asr_online = chunks[-1:]
+    model.frames_asr_offline = chunks[2:]
+
+    restored = fake_dialogue_stream()
+    restored.restore(model.snapshot())
+    for name in ("frames", "frames_asr_online", "frames_asr_offline"):
+        saved, loaded = getattr(model, name), getattr(restored, name)
+        assert len(saved) == len(loaded), name
+        assert all(np.array_equal(a, b) for a, b in zip(saved, loaded)), name
+
+
+if __name__ == "__main__":
+    test_format()
+    test_vad_online()
+    test_frontend_online()
+    test_asr_stream_state()
+    test_dialogue_state()
+    logging.info("stream snapshot test passed")
@@ -0,0 +1,142 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_stream_state.py
+# @Time      :2026/10/18 17:50
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+
+import numpy as np
+
+from paraformer.runtime.python.model.asr.paraformer import (
+    OnlineStreamState,
+    ParaformerOnlineModel,
+)
+from paraformer.runtime.python.utils.preprocess import SinusoidalPositionEncoderOnline
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def build_model(chunk_size=(5, 10, 5)):
+    # the stream state only needs the model dims, skip loading the onnx sessions
+    model = ParaformerOnlineModel.__new__(ParaformerOnlineModel)
+    model.chunk_size = list(chunk_size)
+    model.feats_dims = 560
+    model.encoder_output_size = 512
+    model.fsmn_layer = 16
+    model.fsmn_dims = 512
+    model.fsmn_lorder = 10
+    return model
+
+
+def add_overlap_chunk_concat(model, feats, cache):
+    """the former implementation over the cache dict"""
+    overlap_feats = np.concatenate((cache["feats"], feats), axis=1)
+    if cache["is_final"]:
+        cache["feats"] = overlap_feats[:, -model.chunk_size[0] :, :]
+        if not cache["last_chunk"]:
+            padding_length = sum(model.chunk_size) - overlap_feats.shape[1]
+            overlap_feats = np.pad(overlap_feats, ((0, 0), (0, padding_length), (0, 0)))
+    else:
+        cache["feats"] = overlap_feats[
+            :, -(model.chunk_size[0] + model.chunk_size[2]) :, :
+        ]
+    return overlap_feats
+
+
+def test_overlap_chunk():
+    model = build_model()
+    rng = np.random.default_rng(0)
+    state = model.new_state()
+    cache = {"feats": state.feats.copy(), "last_chunk": False}
+    buffer = state.feats
+    for length in [10, 10, 5, 3, 10, 17, 10]:
+        feats = rng.standard_normal((1, length, 560)).astype(np.float32)
+        state.is_final = cache["is_final"] = False
+        expected = add_overlap_chunk_concat(model, feats, cache)
+        assert np.array_equal(model.add_overlap_chunk(feats, state), expected)
+        assert np.array_equal(state.feats, cache["feats"])
+        # the overlap is kept in the same buffer
+        assert state.feats is buffer
+
+    feats = rng.standard_normal((1, 4, 560)).astype(np.float32)
+    state.is_final = cache["is_final"] = True
+    expected = add_overlap_chunk_concat(model, feats, cache)
+    assert np.array_equal(model.add_overlap_chunk(feats, state), expected)
+    assert np.array_equal(state.feats, cache["feats"])
+
+
+def test_state():
+    model = build_model()
+    state = model.new_state()
+    assert isinstance(state, OnlineStreamState)
+    assert not state.started
+    assert state["decoder_fsmn"] is state.decoder_fsmn
+    assert "cif_alphas" in state and "preds" not in state
+    assert state.get("preds", 1) == 1
+    try:
+        state["preds"] = 1
+        raise AssertionError("unknown keys must be rejected")
+    except KeyError:
+        pass
+    try:
+        state.preds = 1
+        raise AssertionError("the state has fixed slots")
+    except AttributeError:
+        pass
+
+    expected = (10 * 560 + 16 * 512 * 10 + 512 + 1) * 4
+    assert state.nbytes() == expected
+    logging.info(f"state of one stream holds {state.nbytes() / 1024:.1f} KiB")
+
+    # a missing cache is created, a cache dict keeps the state inside
+    param_dict = {}
+    state = model.stream_state(param_dict)
+    assert param_dict["cache"] is state
+    assert model.stream_state(param_dict) is state
+    cache = dict()
+    state = model.stream_state({"cache": cache})
+    assert cache["state"] is state
+    assert model.stream_state({"cache": cache}) is state
+    try:
+        model.stream_state({"cache": []})
+        raise AssertionError("a cache of another type must be rejected")
+    except TypeError:
+        pass
+
+
+def test_external_cache_dict():
+    """the former pattern, one cache dict and a new param_dict every chunk"""
+    model = build_model()
+    model.pe = SinusoidalPositionEncoderOnline()
+    model.io_binding = False
+    seen = []
+
+    def extract_feat(waveforms, is_final=False):
+        frames = waveforms.shape[1] // 960
+        return np.ones((1, frames, 560), dtype=np.float32), np.array([frames])
+
+    def infer(feats, feats_len, cache):
+        seen.append((id(cache), cache.start_idx))
+        return [{"preds": ["", []]}]
+
+    model.extract_feat = extract_feat
+    model.infer = infer
+    cache = {}
+    for is_final in (False, False, True):
+        model(
+            np.zeros(9600, dtype=np.float32),
+            param_dict={"cache": cache, "is_final": is_final},
+        )
+    # one stream across the calls, its features go on
+    assert len({key for key, _ in seen}) == 1
+    assert [start for _, start in seen][:3] == [10, 20, 30]
+
+
+if __name__ == "__main__":
+    test_overlap_chunk()
+    test_state()
+    test_external_cache_dict()
+    logging.info("stream state test passed")
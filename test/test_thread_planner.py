@@ -0,0 +1,99 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_thread_planner.py
+# @Time      :2026/10/18 15:30
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+
+from onnxruntime import SessionOptions
+
+from paraformer import FSMNVad
+from paraformer.runtime.python.utils.threadPlanner import ThreadPlanner, planner
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def test_profiles():
+    plans = ThreadPlanner()
+    plans.configure(total_threads=8, profile="balanced")
+    assert plans.plan("asr")["intra_op_num_threads"] == 4
+    assert plans.plan("vad")["intra_op_num_threads"] == 1
+    assert plans.plan("punc")["intra_op_num_threads"] == 2
+    # an explicit thread number wins over the budget
+    assert plans.plan("asr", 6)["intra_op_num_threads"] == 6
+
+    plans.configure(total_threads=8, profile="file")
+    assert plans.plan("asr")["intra_op_num_threads"] == 8
+    assert plans.plan("asr")["allow_spinning"]
+
+    plans.configure(total_threads=8, profile="streams")
+    for role in ("asr", "vad", "punc", "sv", "lm"):
+        plan = plans.plan(role)
+        assert plan["intra_op_num_threads"] == 1 and not plan["allow_spinning"]
+
+    sess_opt = plans.apply(SessionOptions(), "asr")
+    assert sess_opt.intra_op_num_threads == 1
+    assert sess_opt.get_session_config_entry("session.intra_op.allow_spinning") == "0"
+    assert len(plans.report()) == 1
+    # the report keeps the latest plans only
+    for _ in range(300):
+        plans.apply(SessionOptions(), "vad")
+    assert len(plans.report()) == 256
+
+    try:
+        plans.configure(profile="unknown")
+    except ValueError as e:
+        logging.info(e)
+    else:
+        raise AssertionError("unknown profile is accepted")
+
+
+GLOBAL_POOL_SESSIONS = """
+from onnxruntime import SessionOptions
+
+from paraformer import FSMNVad
+from paraformer.runtime.python.utils.modelCache import create_session
+from paraformer.runtime.python.utils.sessionTuner import DEFAULT_PROFILE, benchmark
+from paraformer.runtime.python.utils.threadPlanner import configure_threads, planner
+
+model = "paraformer/onnx/vad/fsmnvad-online.onnx"
+configure_threads(global_thread_pool=True)
+sess_opt = SessionOptions()
+create_session(model, sess_opt)
+# the options of the caller are left unchanged
+assert sess_opt.use_per_session_threads
+create_session(model)
+create_session(model, planner.apply(SessionOptions(), "vad"))
+benchmark(model, dict(DEFAULT_PROFILE, intra_op_num_threads=2), length=60, runs=1)
+assert FSMNVad().segments_offline("test/vad_example.wav")[0] == [70, 2340]
+"""
+
+
+def test_global_thread_pool():
+    # the global thread pool must be set before the first session of a process
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, PARAFORMER_CACHE_DIR=cache_dir)
+        subprocess.run(
+            [sys.executable, "-c", GLOBAL_POOL_SESSIONS], check=True, env=env
+        )
+
+
+def test_vad_session():
+    planner.configure(profile="streams")
+    vad = FSMNVad()
+    segments = vad.segments_offline("test/vad_example.wav")
+    assert segments[0] == [70, 2340], segments
+    logging.info(f"thread plans: {planner.report()}")
+
+
+if __name__ == "__main__":
+    test_profiles()
+    test_global_thread_pool()
+    test_vad_session()
@@ -0,0 +1,182 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_two_pass_async.py
+# @Time      :2026/10/18 19:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import hashlib
+import logging
+import pickle
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from paraformer import AsrAllInOne, AudioReader
+from paraformer.runtime.python.model.asr.paraformer import ParaformerOfflineModel
+from paraformer.runtime.python.utils.preprocess import WavFrontend
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def stream(model, speech, step=9600):
+    """results of two_pass_asr and the slowest call"""
+    results = []
+    slowest = 0
+    for offset in range(0, len(speech), step):
+        start = time.perf_counter()
+        results.append(
+            model.two_pass_asr(
+                speech[offset : offset + step], is_final=offset + step >= len(speech)
+            )
+        )
+        slowest = max(slowest, time.perf_counter() - start)
+    return results, slowest
+
+
+def fake_stream(final_executor=None, asr_offline=None):
+    """
+    the finals of an AsrAllInOne without its models, second_pass runs on
+    asr_offline if given
+    """
+    model = AsrAllInOne.__new__(AsrAllInOne)
+    model.on_final = None
+    model.finals = queue.Queue()
+    model._final_executor = final_executor
+    model._own_final_executor = False
+    model._final_tail = None
+    model._final_lock = threading.Lock()
+    if asr_offline is None:
+        model.second_pass = lambda data, hot_words, time_stamp, seq: {
+            "seq": seq,
+            "final": str(len(data)),
+        }
+    else:
+        model.asr_offline = asr_offline
+        model.speaker_verification = False
+        model.punc = SimpleNamespace(punctuate=lambda text: (text,))
+    return model
+
+
+def feature_offline():
+    """
+    offline asr whose transcript is the digest of the features of the real
+    frontend, without the onnx models
+    """
+    model_dir = Path(__file__).resolve().parent.parent / "paraformer" / "onnx"
+    model_dir = model_dir / "asr_offline"
+    with open(model_dir / "config.pkl", "rb") as f:
+        config = pickle.load(f)
+    cls = ParaformerOfflineModel.__wrapped__
+    model = cls.__new__(cls)
+    model.frontend = WavFrontend(
+        cmvn_file=str(model_dir / "am.mvn"), dither=0.0, **config["frontend_conf"]
+    )
+
+    def infer_offline(audio, hot_words=""):
+        feats, _ = model.extract_feat(audio)
+        return hashlib.sha1(feats.tobytes()).hexdigest()[:12]
+
+    return SimpleNamespace(infer_offline=infer_offline)
+
+
+def test_final_executor():
+    threads = threading.active_count()
+    for _ in range(20):
+        model = fake_stream()
+        for seq in range(3):
+            model._submit_final([0] * seq, None, {}, seq)
+        model.close()
+        assert [model.finals.get_nowait()["seq"] for _ in range(3)] == [0, 1, 2]
+    time.sleep(0.1)
+    # the thread of each stream stops with it
+    assert threading.active_count() <= threads + 1, threading.enumerate()
+
+    # a shared executor shut down fails the finals instead of hanging
+    executor = ThreadPoolExecutor(1)
+    model = fake_stream(executor)
+    model._submit_final([0], None, {}, 0)
+    model.wait_finals(timeout=5)
+    executor.shutdown()
+    model._submit_final([0], None, {}, 1)
+    model._submit_final([0], None, {}, 2)
+    try:
+        model.wait_finals(timeout=5)
+        raise AssertionError("the finals of a shut down executor must fail")
+    except RuntimeError as e:
+        logging.info(f"expected error: {e}")
+
+
+def test_shared_offline_model(num_streams=4, num_finals=16):
+    """the finals of several streams run at once on the one offline model"""
+    asr_offline = feature_offline()
+    rng = np.random.default_rng(0)
+    segments = [
+        [
+            rng.standard_normal(int(rng.integers(8000, 48000))).astype(np.float32) * 0.1
+            for _ in range(num_finals)
+        ]
+        for _ in range(num_streams)
+    ]
+    expected = [
+        [(seq, asr_offline.infer_offline(data)) for seq, data in enumerate(datas)]
+        for datas in segments
+    ]
+
+    def finals_of(executor):
+        streams = [fake_stream(executor, asr_offline) for _ in segments]
+        for seq in range(num_finals):
+            for model, datas in zip(streams, segments):
+                model._submit_final(datas[seq], None, {}, seq)
+        for model in streams:
+            model.wait_finals(timeout=30)
+            model.close()
+        finals = []
+        for model in streams:
+            results = [model.finals.get_nowait() for _ in range(num_finals)]
+            assert model.finals.empty()
+            finals.append([(r["seq"], r["final"]) for r in results])
+        return finals
+
+    # a final thread per stream, then one executor shared by the streams
+    assert finals_of(None) == expected
+    with ThreadPoolExecutor(num_streams) as executor:
+        assert finals_of(executor) == expected
+    logging.info(f"finals of {num_streams} streams on the shared model are unchanged")
+
+
+def test_two_pass_async():
+    speech, _ = AudioReader.read_wav_file("test/P9_0002.wav")
+    model = AsrAllInOne(mode="2pass")
+    model.warmup()
+    results, slowest = stream(model, speech)
+    expected = [
+        (r["seq"], r["final"], r["time_stamp"]) for r in results if "final" in r
+    ]
+    logging.info(f"synchronous finals, slowest chunk {slowest * 1000:.1f} ms")
+
+    model = AsrAllInOne(mode="2pass", async_final=True)
+    results, slowest = stream(model, speech)
+    model.wait_finals()
+    finals = []
+    while not model.finals.empty():
+        finals.append(model.finals.get())
+    logging.info(f"asynchronous finals, slowest chunk {slowest * 1000:.1f} ms")
+    # the partials do not wait for the finals, which keep their order
+    assert all("final" not in r for r in results)
+    seqs = [seq for r in results for seq in r.get("final_seqs", [])]
+    assert seqs == [f["seq"] for f in finals] == list(range(len(finals)))
+    assert [(f["seq"], f["final"], f["time_stamp"]) for f in finals] == expected
+
+
+if __name__ == "__main__":
+    test_final_executor()
+    test_shared_offline_model()
+    test_two_pass_async()
+    logging.info("two pass async test passed")
@@ -13,7 +13,10 @@ speech_length = speech.shape[0]
 
 sample_offset = 0
 step = 1600
+segments = []
 vad_online = FSMNVadOnline()
+# the stream state is restored after the warmup
+print(f"warmup times: {vad_online.warmup()}")
 print(f"The audio total has {len(speech)} frames")
 for sample_offset in range(0, speech_length, min(step, speech_length - sample_offset)):
     if sample_offset + step >= speech_length - 1:
@@ -24,6 +27,7 @@ for sample_offset in range(0, speech_length, min(step, speech_length - sample_of
     segments_result = vad_online.segments_online(
         speech[sample_offset : sample_offset + step], is_final=is_final
     )
+    segments.extend(segments_result)
     if segments_result:
         buffer = vad_online.vad.data_buf_size
         if buffer is not None:
@@ -34,3 +38,19 @@ for sample_offset in range(0, speech_length, min(step, speech_length - sample_of
             )
             print(frame_start, vad_online.vad.data_buf_size)
         print(segments_result)
+
+# a warmup during a stream keeps its fsmn cache, detection state and frontend
+vad_online.reset_cache()
+warmed = []
+for i, sample_offset in enumerate(range(0, speech_length, 1600)):
+    if i == 20:
+        vad_online.warmup()
+    is_final = sample_offset + 1600 >= speech_length - 1
+    end = speech_length if is_final else sample_offset + 1600
+    warmed.extend(
+        vad_online.segments_online(speech[sample_offset:end], is_final=is_final)
+    )
+    if is_final:
+        break
+assert warmed == segments, (warmed, segments)
+print("the stream is unchanged by a warmup")
@@ -0,0 +1,79 @@
+# -*- coding:utf-8 -*-
+# @FileName  :test_wav_reader.py
+# @Time      :2026/10/18 16:40
+# @Author    :lovemefan
+# @Email     :lovemefan@outlook.com
+import logging
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from paraformer.runtime.python.utils.audioHelper import AudioReader, WavReader
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="[%(asctime)s %(levelname)s] [%(filename)s:%(lineno)d %(module)s.%(funcName)s] %(message)s",
+)
+
+
+def build_wav(pcm: np.ndarray, channels=1, extensible=False, data_size=None):
+    """wav with a LIST chunk of odd size before the data chunk"""
+    data = pcm.astype("<i2").tobytes()
+    if extensible:
+        fmt = struct.pack(
+            "<HHLLHH", 0xFFFE, channels, 16000, 32000 * channels, 2 * channels, 16
+        )
+        fmt += struct.pack("<HHL", 22, 16, 0) + struct.pack("<H", 1) + b"\x00" * 14
+    else:
+        fmt = struct.pack(
+            "<HHLLHH", 1, channels, 16000, 32000 * channels, 2 * channels, 16
+        )
+    body = b"WAVE" + b"fmt " + struct.pack("<L", len(fmt)) + fmt
+    body += b"LIST" + struct.pack("<L", 3) + b"abc\x00"
+    size = len(data) if data_size is None else data_size
+    body += b"data" + struct.pack("<L", size) + data
+    return b"RIFF" + struct.pack("<L", len(body)) + body
+
+
+def test_parse():
+    pcm = np.arange(-1000, 1000, 7, dtype=np.int16)
+    for extensible in (False, True):
+        # an unset data size is clipped to the end of the file
+        for data_size in (None, 0xFFFFFFFF):
+            audio, sample_rate = AudioReader.read_wav_bytes(
+                build_wav(pcm, extensible=extensible, data_size=data_size)
+            )
+            assert sample_rate == 16000
+            assert np.array_equal(audio, pcm / np.float32(1 << 15))
+
+    stereo = np.stack((pcm, -pcm), axis=1)
+    audio, _ = AudioReader.read_wav_bytes(build_wav(stereo, channels=2))
+    assert np.array_equal(audio, np.zeros(len(pcm), dtype=np.float32))
+    logging.info("RIFF chunks are parsed")
+
+
+def test_reader(wav_path="test/vad_example.wav", block_size=9600):
+    with open(wav_path, "rb") as f:
+        audio, sample_rate = AudioReader.read_wav_bytes(f.read())
+    with WavReader(wav_path) as reader:
+        assert reader.sample_rate == sample_rate and len(reader) == len(audio)
+        assert np.array_equal(reader[1000:2000], audio[1000:2000])
+        blocks = list(reader.blocks(block_size))
+    assert all(len(block) == block_size for block in blocks[:-1])
+    assert np.array_equal(np.concatenate(blocks), audio)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "stereo.wav")
+        pcm = np.arange(-1000, 1000, dtype=np.int16)
+        with open(path, "wb") as f:
+            f.write(build_wav(np.stack((pcm, pcm), axis=1), channels=2))
+        with WavReader(path) as reader:
+            assert np.array_equal(reader[:], pcm / np.float32(1 << 15))
+    logging.info(f"{wav_path} is read block by block")
+
+
+if __name__ == "__main__":
+    test_parse()
+    test_reader()